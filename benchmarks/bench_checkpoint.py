@@ -0,0 +1,64 @@
+"""
+Benchmark of checkpointed reverse mode against a single Node graph
+
+Differentiates a damped pendulum integrated over a growing number of steps, once by recording the whole
+iteration as a Node graph and once with checkpointed_gradient, and reports the peak memory (tracemalloc)
+and the run time of both.
+
+Usage
+-----------------
+python benchmarks/bench_checkpoint.py [steps ...]
+"""
+import os
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+from autodiff import checkpointed_gradient, gradient
+
+
+def step(x, k):
+    return [x[0] + 0.01 * x[1], x[1] - 0.01 * (np.sin(x[0]) + x[2] * x[1]), x[2]]
+
+
+def loss(x):
+    return x[0] ** 2 + x[1] ** 2
+
+
+def full(nsteps):
+    def f(x):
+        for k in range(nsteps):
+            x = step(x, k)
+        return loss(x)
+    return lambda x0: gradient(f, x0, mode='reverse')
+
+
+def checkpointed(nsteps):
+    return lambda x0: checkpointed_gradient(step, x0, nsteps, loss=loss)
+
+
+def measure(run, x0):
+    """
+    returns (peak bytes, seconds) of run(x0)
+    """
+    tracemalloc.start()
+    start = time.perf_counter()
+    run(x0)
+    seconds = time.perf_counter() - start
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return peak, seconds
+
+
+if __name__ == '__main__':
+    lengths = [int(a) for a in sys.argv[1:]] or [1000, 4000, 16000]
+    x0 = [0.8, -0.3, 0.2]
+    print('{:>8} {:>14} {:>14} {:>10} {:>10}'.format('steps', 'graph MiB', 'checkpt MiB', 'graph s', 'checkpt s'))
+    for nsteps in lengths:
+        graph = measure(full(nsteps), x0)
+        chk = measure(checkpointed(nsteps), x0)
+        print('{:>8} {:>14.2f} {:>14.2f} {:>10.2f} {:>10.2f}'.format(
+            nsteps, graph[0] / 2 ** 20, chk[0] / 2 ** 20, graph[1], chk[1]))
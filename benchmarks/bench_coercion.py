@@ -0,0 +1,38 @@
+"""
+Micro-benchmark of DualNum and Node operators with constant operands
+
+Times expressions mixing one DualNum or Node with plain numbers, the most common pattern in user
+functions, and reports the time per evaluation of each expression.
+
+Usage
+-----------------
+python benchmarks/bench_coercion.py [repeat]
+"""
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+from autodiff import DualNum, Node
+
+EXPRESSIONS = ['x*2+3', '2*x-1', 'x/4', '1/x', 'x**2', '2**x', 'cls.sin(x)', 'x*y+y']
+
+
+def bench(cls, repeat):
+    results = {}
+    for expr in EXPRESSIONS:
+        env = {'cls': cls,
+               'x': cls(1.5, 1.0) if cls is DualNum else cls(1.5),
+               'y': cls(0.5, 1.0) if cls is DualNum else cls(0.5)}
+        timer = timeit.Timer(expr, globals=env)
+        number, _ = timer.autorange()
+        results[expr] = min(timer.repeat(repeat, number)) / number
+    return results
+
+
+if __name__ == '__main__':
+    repeat = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+    print('{:>10} {:>12} {:>12}'.format('expr', 'DualNum ns', 'Node ns'))
+    dual, node = bench(DualNum, repeat), bench(Node, repeat)
+    for expr in EXPRESSIONS:
+        print('{:>10} {:>12.0f} {:>12.0f}'.format(expr.replace('cls.', ''), 1e9 * dual[expr], 1e9 * node[expr]))
@@ -0,0 +1,41 @@
+"""
+Benchmark of grad_map against a loop of reverse-mode gradients
+
+Computes the gradient of the extended Rosenbrock function at N random points with a plain loop around
+gradient, and with grad_map on thread and process pools, and reports the time of each.
+
+Usage
+-----------------
+python benchmarks/bench_grad_map.py [N] [n] [workers]
+"""
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+from autodiff import grad_map, gradient
+
+
+def rosenbrock(x):
+    return np.sum(100 * (x[1:] - x[:-1] ** 2) ** 2 + (1 - x[:-1]) ** 2)
+
+
+if __name__ == '__main__':
+    N = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    n = int(sys.argv[2]) if len(sys.argv) > 2 else 10
+    workers = int(sys.argv[3]) if len(sys.argv) > 3 else os.cpu_count() or 1
+    X = np.random.default_rng(0).normal(size=(N, n))
+    runs = {'loop': lambda: np.array([gradient(rosenbrock, x, mode='reverse') for x in X]),
+            'threads': lambda: grad_map(rosenbrock, X, workers=workers, pool='thread'),
+            'processes': lambda: grad_map(rosenbrock, X, workers=workers, pool='process')}
+    print('{} points, {} inputs, {} workers on {} CPUs'.format(N, n, workers, os.cpu_count()))
+    reference = None
+    for name, run in runs.items():
+        start = time.perf_counter()
+        G = run()
+        seconds = time.perf_counter() - start
+        reference = G if reference is None else reference
+        assert np.allclose(G, reference)
+        print('{:>10}: {:>8.2f} s {:>10.1f} us/point'.format(name, seconds, 1e6 * seconds / N))
@@ -0,0 +1,55 @@
+"""
+Benchmark of Hessian-vector products
+
+Compares, on the extended Rosenbrock function, one forward-over-reverse hvp(f, x, v) with the alternatives
+available before: central differences of two reverse-mode gradients, and building the full Hessian from n
+passes (one per unit vector) before multiplying it by v. Reports the time of each and the error against
+the full Hessian product.
+
+Usage
+-----------------
+python benchmarks/bench_hvp.py [n ...]
+"""
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+from autodiff import gradient, hvp
+
+
+def rosenbrock(x):
+    return np.sum(100 * (x[1:] - x[:-1] ** 2) ** 2 + (1 - x[:-1]) ** 2)
+
+
+def finite_differences(f, x, v, eps=1e-6):
+    return (gradient(f, x + eps * v, mode='reverse') - gradient(f, x - eps * v, mode='reverse')) / (2 * eps)
+
+
+def n_pass(f, x, v):
+    return np.array([hvp(f, x, e) for e in np.eye(len(x))]).T @ v
+
+
+def timed(run, repeat=3):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        out = run()
+        best = min(best, time.perf_counter() - start)
+    return out, best
+
+
+if __name__ == '__main__':
+    sizes = [int(a) for a in sys.argv[1:]] or [10, 50, 200]
+    rng = np.random.default_rng(0)
+    print('{:>6} {:>12} {:>12} {:>12} {:>12}'.format('n', 'hvp ms', 'fd ms', 'n-pass ms', 'fd error'))
+    for n in sizes:
+        x, v = rng.normal(size=n), rng.normal(size=n)
+        exact, t_full = timed(lambda: n_pass(rosenbrock, x, v), repeat=1)
+        hv, t_hvp = timed(lambda: hvp(rosenbrock, x, v))
+        fd, t_fd = timed(lambda: finite_differences(rosenbrock, x, v))
+        assert np.allclose(hv, exact)
+        print('{:>6} {:>12.2f} {:>12.2f} {:>12.2f} {:>12.1e}'.format(
+            n, 1e3 * t_hvp, 1e3 * t_fd, 1e3 * t_full, np.max(np.abs(fd - exact)) / np.max(np.abs(exact))))
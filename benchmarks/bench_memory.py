@@ -0,0 +1,76 @@
+"""
+Benchmark of the memory held across the iterations of an optimizer in reverse mode
+
+Runs gradient descent on the Rosenbrock function with Nodes, keeping only the last gradient but logging the
+loss Node of every iteration, a common pattern: with the default reverse() every logged loss keeps its whole
+graph alive, with reverse(retain_graph=False) it is a lone Node. Each mode runs in a fresh process, which
+reports its resident set size (RSS) every tenth of the iterations.
+
+The growth of RSS after the first tenth is reported for both modes. The script exits with status 1 unless it
+stays flat, below 2 MiB, with the graphs released and grows with the default. What is left with the graphs
+released is the log itself, one Node per iteration, about 1.3 MiB over 10k iterations against about 156 MiB.
+
+Usage
+-----------------
+python benchmarks/bench_memory.py [iterations] [n]
+"""
+import multiprocessing
+import os
+import sys
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+from autodiff import Node
+
+FLAT_MIB = 2.0
+
+
+def rosenbrock(x):
+    return sum(100 * (x[i + 1] - x[i] ** 2) ** 2 + (1 - x[i]) ** 2 for i in range(len(x) - 1))
+
+
+def rss():
+    """
+    resident set size of this process in MiB, from /proc
+    """
+    with open('/proc/self/statm') as fh:
+        return int(fh.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') / 2 ** 20
+
+
+def descend(retain_graph, iterations, n, queue):
+    x = np.full(n, -1.0)
+    losses = []
+    samples = []
+    for it in range(1, iterations + 1):
+        xs = Node.variables(x)
+        y = rosenbrock(xs)
+        grad = y.reverse(retain_graph=retain_graph, variables=xs)
+        losses.append(y)
+        x = x - 1e-4 * grad
+        if it % max(iterations // 10, 1) == 0:
+            samples.append(rss())
+    queue.put(samples)
+
+
+if __name__ == '__main__':
+    iterations = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+    n = int(sys.argv[2]) if len(sys.argv) > 2 else 10
+    results = {}
+    for retain_graph in (True, False):
+        queue = multiprocessing.Queue()
+        proc = multiprocessing.Process(target=descend, args=(retain_graph, iterations, n, queue))
+        proc.start()
+        results[retain_graph] = queue.get()
+        proc.join()
+    step = max(iterations // 10, 1)
+    print('{:>10} {:>16} {:>16}'.format('iteration', 'retain MiB', 'release MiB'))
+    for k, (kept, freed) in enumerate(zip(results[True], results[False])):
+        print('{:>10} {:>16.1f} {:>16.1f}'.format((k + 1) * step, kept, freed))
+    kept = results[True][-1] - results[True][0]
+    freed = results[False][-1] - results[False][0]
+    print('growth after iteration %d: retain %.1f MiB, release %.1f MiB' % (step, kept, freed))
+    if freed > FLAT_MIB or kept <= FLAT_MIB:
+        print('FAILED: expected flat RSS with retain_graph=False and growth with the default')
+        sys.exit(1)
+    print('RSS is flat with retain_graph=False')
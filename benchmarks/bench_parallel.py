@@ -0,0 +1,46 @@
+"""
+Benchmark of parallel_jacobian scaling with the number of worker processes
+
+Computes the dense Jacobian of a coupled nonlinear map with n inputs and outputs with 1, 2, 4, ... worker
+processes and reports the time and the speedup over a single process. Scaling is only expected up to
+the number of physical cores, and only for the share of a pass spent on tangent arithmetic: every block
+repeats the interpreter overhead of evaluating f, which does not shrink with the block size.
+
+Usage
+-----------------
+python benchmarks/bench_parallel.py [n] [max workers]
+"""
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+from autodiff import parallel_jacobian
+
+
+def coupled(x):
+    y = list(x)
+    for _ in range(10):
+        mean = sum(y) / len(y)
+        y = [np.tanh(v * 0.9 + mean) + np.sin(u) * 0.1 for u, v in zip(x, y)]
+    return y
+
+
+if __name__ == '__main__':
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    most = int(sys.argv[2]) if len(sys.argv) > 2 else os.cpu_count() or 1
+    x = np.linspace(-1, 1, n)
+    print('{} CPUs'.format(os.cpu_count()))
+    print('{:>8} {:>10} {:>10}'.format('workers', 'seconds', 'speedup'))
+    workers, base, reference = 1, None, None
+    while workers <= most:
+        start = time.perf_counter()
+        J = parallel_jacobian(coupled, x, workers=workers)
+        seconds = time.perf_counter() - start
+        if base is None:
+            base, reference = seconds, J
+        assert np.allclose(J, reference)
+        print('{:>8} {:>10.2f} {:>10.2f}'.format(workers, seconds, base / seconds))
+        workers *= 2
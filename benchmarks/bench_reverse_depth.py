@@ -0,0 +1,65 @@
+"""
+Benchmark of the reverse pass of Node on long computation chains
+
+Builds a chain y = sin(y)*0.5 + y of increasing length, runs Node.reverse() on it and reports
+wall time and peak traced memory (tracemalloc) for graph construction and for the reverse pass.
+Both columns divided by the chain length should stay roughly constant, i.e. scale linearly.
+
+Usage
+-----------------
+python benchmarks/bench_reverse_depth.py [max_length]
+"""
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+from autodiff import Node
+
+
+def build_chain(length):
+    """
+    builds a chain of 2*length Nodes, each depending on the previous one
+    """
+    x = Node(0.1)
+    y = x
+    for _ in range(length):
+        y = Node.sin(y) * 0.5 + y
+    return x, y
+
+
+def run(length):
+    """
+    times and measures construction and reverse pass for a chain of the given length
+
+    Returns
+    ---------------------
+    dict with construction time, reverse time and peak memory in bytes for both phases
+    """
+    tracemalloc.start()
+    start = time.perf_counter()
+    x, y = build_chain(length)
+    build_time = time.perf_counter() - start
+    build_mem = tracemalloc.get_traced_memory()[0]
+    tracemalloc.reset_peak()
+    start = time.perf_counter()
+    y.reverse()
+    reverse_time = time.perf_counter() - start
+    reverse_peak = tracemalloc.get_traced_memory()[1] - build_mem
+    tracemalloc.stop()
+    return {'length': length, 'build_s': build_time, 'reverse_s': reverse_time,
+            'graph_bytes': build_mem, 'reverse_peak_bytes': reverse_peak}
+
+
+if __name__ == '__main__':
+    max_length = int(sys.argv[1]) if len(sys.argv) > 1 else 10**6
+    print('{:>10} {:>10} {:>12} {:>14} {:>16} {:>16}'.format(
+        'length', 'build s', 'reverse s', 'reverse us/op', 'graph B/op', 'reverse B/op'))
+    length = 1000
+    while length <= max_length:
+        r = run(length)
+        print('{:>10} {:>10.3f} {:>12.3f} {:>14.3f} {:>16.1f} {:>16.1f}'.format(
+            length, r['build_s'], r['reverse_s'], 1e6 * r['reverse_s'] / length,
+            r['graph_bytes'] / length, r['reverse_peak_bytes'] / length))
+        length *= 10
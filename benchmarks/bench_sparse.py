@@ -0,0 +1,46 @@
+"""
+Benchmark of sparse Jacobians against dense forward mode
+
+Differentiates a discretized reaction-diffusion operator, whose Jacobian is tridiagonal, with the dense
+forward mode (one seed direction per input) and with sparse_jacobian (one seed direction per color),
+with the sparsity pattern detected once and reused, and reports the time of both.
+
+Usage
+-----------------
+python benchmarks/bench_sparse.py [n ...]
+"""
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+from autodiff import color_columns, jacobian, jacobian_sparsity, sparse_jacobian
+
+
+def banded(x):
+    y = [2 * x[0] - x[1] + np.exp(x[0])]
+    for i in range(1, len(x) - 1):
+        y.append(-x[i - 1] + 2 * x[i] - x[i + 1] + np.exp(x[i]) * np.sin(x[i + 1]))
+    y.append(-x[-2] + 2 * x[-1] + np.exp(x[-1]))
+    return y
+
+
+def timed(run):
+    start = time.perf_counter()
+    out = run()
+    return out, time.perf_counter() - start
+
+
+if __name__ == '__main__':
+    sizes = [int(a) for a in sys.argv[1:]] or [100, 400, 1600]
+    print('{:>6} {:>8} {:>12} {:>12} {:>12}'.format('n', 'colors', 'dense ms', 'detect ms', 'sparse ms'))
+    for n in sizes:
+        x = np.linspace(-1, 1, n)
+        J, t_dense = timed(lambda: jacobian(banded, x, mode='forward'))
+        pattern, t_detect = timed(lambda: jacobian_sparsity(banded, x))
+        (rows, cols, vals), t_sparse = timed(lambda: sparse_jacobian(banded, x, sparsity=pattern))
+        assert np.allclose(J[rows, cols], vals)
+        print('{:>6} {:>8} {:>12.1f} {:>12.1f} {:>12.1f}'.format(
+            n, color_columns(rows, cols, n).max() + 1, 1e3 * t_dense, 1e3 * t_detect, 1e3 * t_sparse))
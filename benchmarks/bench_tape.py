@@ -0,0 +1,59 @@
+"""
+Benchmark of the array backed Tape against Node graphs
+
+Records the same chain y = sin(y)*0.5 + y*y on a Tape and as a Node graph and reports, per recorded
+operation, the memory held by the graph (tracemalloc) and the time of the reverse sweep.
+
+Usage
+-----------------
+python benchmarks/bench_tape.py [length]
+"""
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+from autodiff import Node, Tape, TapeNode
+
+
+def chain(x, sin, length):
+    y = x
+    for _ in range(length):
+        y = sin(y) * 0.5 + y * y * 0.1
+    return y
+
+
+def measure(build, length):
+    """
+    builds a graph with build(), returns (bytes held, number of operations, reverse pass seconds)
+    """
+    tracemalloc.start()
+    y, ops = build(length)
+    held = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    start = time.perf_counter()
+    y.reverse()
+    return held, ops, time.perf_counter() - start
+
+
+def build_node(length):
+    y = chain(Node(0.1), Node.sin, length)
+    return y, 7 * length
+
+
+def build_tape(length):
+    tape = Tape()
+    y = chain(tape.var(0.1), TapeNode.sin, length)
+    return y, len(tape)
+
+
+if __name__ == '__main__':
+    length = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    results = {}
+    for name, build in (('Node', build_node), ('Tape', build_tape)):
+        held, ops, seconds = measure(build, length)
+        results[name] = (held / ops, 1e9 * seconds / ops)
+        print('{:>6}: {:>8.1f} bytes/op {:>8.1f} ns/op reverse'.format(name, *results[name]))
+    print('ratio : {:>8.1f}x memory {:>8.1f}x reverse time'.format(
+        results['Node'][0] / results['Tape'][0], results['Node'][1] / results['Tape'][1]))
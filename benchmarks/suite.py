@@ -0,0 +1,232 @@
+"""
+Throughput benchmark suite of the forward (DualNum, DualNumVec) and reverse (Node, NodeVec) modes
+
+Every case is a standard function, differentiated in each of the four classes while one size parameter
+is swept: the input dimension, the width of a layer or the number of unrolled steps. For each case and
+class the suite records the time of one derivative evaluation at every size, and the slope of log(time)
+against log(size), which exposes changes in the complexity of a pass independently of the machine.
+
+Results are stored as JSON. Comparing against a baseline reports, and exits with status 1 on, every time
+that grew by more than the tolerance factor and every slope that grew by more than 0.25. Baselines are
+machine dependent: record one on the machine the comparison runs on. baselines/reference.json holds the
+results of the full suite on the machine the suite was written on, for orders of magnitude.
+
+Usage
+-----------------
+python benchmarks/suite.py                                    # print the results
+python benchmarks/suite.py --save benchmarks/baselines/local.json
+python benchmarks/suite.py --compare benchmarks/baselines/local.json [--tolerance 2]
+python benchmarks/suite.py --quick --filter rosenbrock
+"""
+import argparse
+import json
+import os
+import platform
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+import autodiff
+from autodiff import DualNum, DualNumVec, Node, NodeVec
+
+SLOPE_TOLERANCE = 0.25
+
+
+# functions, each with a scalar version for DualNum and Node and a vector version for DualNumVec and NodeVec
+
+def documented(x):
+    return x[0] * x[1] + np.exp(x[0] * x[1])
+
+
+def documented_vec(x):
+    return [x[0] * x[1] + np.exp(x[0] * x[1]), x[0] + x[1] ** 2, x[0] / x[1] + 15]
+
+
+def rosenbrock(x):
+    return sum(100 * (x[i + 1] - x[i] ** 2) ** 2 + (1 - x[i]) ** 2 for i in range(len(x) - 1))
+
+
+def rosenbrock_vec(x):
+    return [10 * (x[i + 1] - x[i] ** 2) for i in range(len(x) - 1)] + [1 - x[i] for i in range(len(x) - 1)]
+
+
+_FEATURES = np.array([[0.5, -1.0, 0.25], [1.5, 0.3, -0.7], [-0.2, 0.8, 1.1], [0.9, -0.4, 0.6]])
+_TARGETS = np.array([0.3, -0.5, 0.8, 0.1])
+
+
+def _mlp_residuals(w):
+    """
+    one hidden tanh layer, w holds the hidden weights and biases followed by the output weights and bias
+    """
+    d = _FEATURES.shape[1]
+    hidden = (len(w) - 1) // (d + 2)
+    residuals = []
+    for features, target in zip(_FEATURES, _TARGETS):
+        out = w[-1]
+        for h in range(hidden):
+            row = w[h * (d + 1):(h + 1) * (d + 1)]
+            pre = row[d] + sum(row[k] * features[k] for k in range(d))
+            out = out + w[hidden * (d + 1) + h] * np.tanh(pre)
+        residuals.append(out - target)
+    return residuals
+
+
+def mlp(w):
+    return sum(r * r for r in _mlp_residuals(w)) / len(_TARGETS)
+
+
+def mlp_vec(w):
+    return _mlp_residuals(w)
+
+
+def _pendulum(x, steps):
+    theta, omega, damping = x[0], x[1], x[2]
+    for _ in range(steps):
+        theta, omega = theta + 0.01 * omega, omega - 0.01 * (np.sin(theta) + damping * omega)
+    return theta, omega
+
+
+def ode(x, steps):
+    theta, omega = _pendulum(x, steps)
+    return 0.5 * omega ** 2 + (1 - np.cos(theta))
+
+
+def ode_vec(x, steps):
+    return list(_pendulum(x, steps))
+
+
+# cases: name -> (size parameter, sizes, quick sizes, point of a given size, scalar function, vector function)
+CASES = {
+    'documented': ('n', [2], [2], lambda n: np.array([1.0, 2.0]), lambda s: documented, lambda s: documented_vec),
+    'rosenbrock': ('n', [2, 8, 32, 128], [2, 8, 32], lambda n: np.linspace(-1.2, 1.0, n),
+                   lambda s: rosenbrock, lambda s: rosenbrock_vec),
+    'mlp': ('hidden', [2, 4, 8, 16], [2, 4, 8], lambda h: np.sin(np.arange(h * (_FEATURES.shape[1] + 2) + 1)),
+            lambda s: mlp, lambda s: mlp_vec),
+    'ode': ('steps', [10, 100, 1000], [10, 100], lambda s: np.array([0.8, -0.3, 0.2]),
+            lambda s: (lambda x: ode(x, s)), lambda s: (lambda x: ode_vec(x, s))),
+}
+
+
+def dualnum(f, x):
+    return f(DualNum.variables(x)).der
+
+
+def dualnumvec(f, x):
+    return DualNumVec(f(DualNum.variables(x))).getjacobian()
+
+
+def node(f, x):
+    xs = [Node(v) for v in x]
+    y = f(xs)
+    y.reverse()
+    return [y.getgrad(v) for v in xs]
+
+
+def nodevec(f, x):
+    xs = [Node(v) for v in x]
+    y = NodeVec(f(xs))
+    y.reverse()
+    return y.jacobian
+
+
+# classes: name -> (runner, uses the vector function)
+MODES = {'DualNum': (dualnum, False), 'DualNumVec': (dualnumvec, True), 'Node': (node, False),
+         'NodeVec': (nodevec, True)}
+
+
+def measure(run, min_time, repeat):
+    """
+    best time of one call of run over repeat rounds of at least min_time seconds
+    """
+    number = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(number):
+            run()
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_time:
+            break
+        number *= 2
+    best = elapsed / number
+    for _ in range(repeat - 1):
+        start = time.perf_counter()
+        for _ in range(number):
+            run()
+        best = min(best, (time.perf_counter() - start) / number)
+    return best
+
+
+def slope(sizes, seconds):
+    """
+    least squares slope of log(seconds) against log(sizes), None for a single size
+    """
+    if len(sizes) < 2:
+        return None
+    return float(np.polyfit(np.log(sizes), np.log(seconds), 1)[0])
+
+
+def run_suite(quick=False, selected=None, min_time=0.05, repeat=5):
+    results = {}
+    for case, (param, sizes, quick_sizes, point, scalar, vector) in CASES.items():
+        for mode, (runner, vec) in MODES.items():
+            key = '%s/%s' % (case, mode)
+            if selected and selected not in key:
+                continue
+            sizes_run = quick_sizes if quick else sizes
+            seconds = []
+            for size in sizes_run:
+                f = (vector if vec else scalar)(size)
+                x = point(size)
+                seconds.append(measure(lambda: runner(f, x), min_time, repeat))
+            results[key] = {'param': param, 'sizes': sizes_run, 'seconds': seconds, 'slope': slope(sizes_run, seconds)}
+            print('{:<24} {:>7} {}  slope {}'.format(
+                key, param, ' '.join('{}:{:.3g}ms'.format(s, 1e3 * t) for s, t in zip(sizes_run, seconds)),
+                '-' if results[key]['slope'] is None else '{:.2f}'.format(results[key]['slope'])))
+    return {'meta': {'autodiff': autodiff.__version__, 'python': platform.python_version(),
+                     'numpy': np.__version__, 'machine': platform.platform(), 'time': time.strftime('%Y-%m-%d %H:%M:%S')},
+            'results': results}
+
+
+def compare(current, baseline, tolerance):
+    """
+    regressions of current against baseline, as a list of messages
+    """
+    regressions = []
+    for key, base in baseline['results'].items():
+        if key not in current['results']:
+            continue
+        new = current['results'][key]
+        measured = dict(zip(new['sizes'], new['seconds']))
+        for size, before in zip(base['sizes'], base['seconds']):
+            after = measured.get(size)
+            if after is not None and after > tolerance * before:
+                regressions.append('%s %s=%s: %.3g ms -> %.3g ms (x%.2f)' % (
+                    key, base['param'], size, 1e3 * before, 1e3 * after, after / before))
+        # slopes are only comparable over the same sweep
+        if base['sizes'] == new['sizes'] and base['slope'] is not None and new['slope'] > base['slope'] + SLOPE_TOLERANCE:
+            regressions.append('%s: slope %.2f -> %.2f' % (key, base['slope'], new['slope']))
+    return regressions
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.strip().split('\n')[0])
+    parser.add_argument('--quick', action='store_true', help='smaller sweeps')
+    parser.add_argument('--filter', help='only run the cases whose case/class name contains this string')
+    parser.add_argument('--save', help='write the results to this JSON file')
+    parser.add_argument('--compare', help='JSON baseline to compare the results with')
+    parser.add_argument('--tolerance', type=float, default=2.0, help='allowed slowdown factor, default 2')
+    args = parser.parse_args()
+    current = run_suite(args.quick, args.filter)
+    if args.save:
+        with open(args.save, 'w') as fh:
+            json.dump(current, fh, indent=1)
+    if args.compare:
+        with open(args.compare) as fh:
+            regressions = compare(current, json.load(fh), args.tolerance)
+        for message in regressions:
+            print('REGRESSION', message)
+        if regressions:
+            sys.exit(1)
+        print('no regression against', args.compare)
@@ -1,3 +1,12 @@
 __version__ = "0.1.1"
 
 from .autodiff import *
+from .tape import *
+from .drivers import *
+from .plan import *
+from .codegen import *
+from .checkpoint import *
+from .taylor import *
+from .sparse import *
+from .parallel import *
+from .profiler import *
@@ -1,5 +1,101 @@
+# imported under a private name, this module has no __all__ and is star imported by the package
+from sys import getsizeof as _getsizeof
+
 import numpy as np
 
+from .tape import _sweep
+
+# NumPy ufuncs supported by DualNum and Node, so that functions written with np.exp, np.sin, ...
+# work on numbers, DualNum and Node alike. Unary ufuncs map to the elementary function of the class,
+# binary ufuncs to the operator and its reflected version
+_UNARY_UFUNCS = {'exp': 'exp', 'log': 'log', 'sin': 'sin', 'cos': 'cos', 'tan': 'tan', 'arcsin': 'arcsin',
+                 'arccos': 'arccos', 'arctan': 'arctan', 'sinh': 'sinh', 'cosh': 'cosh', 'tanh': 'tanh',
+                 'sqrt': 'sqrt', 'negative': '__neg__'}
+_BINARY_UFUNCS = {'add': ('__add__', '__radd__'), 'subtract': ('__sub__', '__rsub__'),
+                  'multiply': ('__mul__', '__rmul__'), 'divide': ('__truediv__', '__rtruediv__'),
+                  'true_divide': ('__truediv__', '__rtruediv__'), 'power': ('__pow__', '__rpow__')}
+
+
+# operands that the DualNum and Node operators treat as constants. They are recognised with isinstance:
+# letting other.val raise an AttributeError and catching it costs several times the arithmetic on a number.
+# Arrays of dtype object are not constants: they hold DualNum or Node entries, see _is_object_array
+_CONSTANTS = (int, float, np.number, np.ndarray)
+
+
+def _is_object_array(other):
+    """
+    whether other is an array of dtype object, e.g. the input vector of the drivers holding DualNum or Node
+    entries. Operators return NotImplemented for them, so that NumPy applies the operation elementwise
+    """
+    return isinstance(other, np.ndarray) and other.dtype.hasobject
+
+
+def _retry(method, self, other):
+    """
+    Operand other that is neither of the class of self nor a constant: lists and tuples are used as np.arrays,
+    anything else is left to the reflected operator of its own class
+
+    Attributes
+    ----------------------------------
+    method: function
+      operator of the class of self
+    self, other:
+      operands
+
+    Returns
+    ---------------------------------
+      result of method on the converted operand, or NotImplemented
+    """
+    if isinstance(other, (list, tuple)):
+        try:
+            other = np.asarray(other, dtype=float)
+        except (TypeError, ValueError):
+            # entries that are not numbers, e.g. DualNum
+            return NotImplemented
+        return method(self, other)
+    return NotImplemented
+
+
+def _box(x):
+    """
+    0-d array of dtype object holding x
+    """
+    box = np.empty((), dtype=object)
+    box[()] = x
+    return box
+
+
+def _array_ufunc(cls, ufunc, method, inputs, kwargs):
+    """
+    Implementation of __array_ufunc__ shared by DualNum and Node
+
+    Attributes
+    ----------------------------------
+    cls: DualNum or Node
+      class whose operations are used
+    ufunc, method, inputs, kwargs:
+      arguments NumPy passes to __array_ufunc__
+
+    Returns
+    ---------------------------------
+      result of the matching operation, NotImplemented for the ufuncs that are not supported
+    """
+    if method != '__call__' or kwargs:
+        return NotImplemented
+    if any(_is_object_array(x) for x in inputs):
+        # e.g. x[0]+x on the input vector of the drivers: the operation applies to every entry of the array,
+        # which NumPy does on object arrays once the operand of cls is boxed in one
+        return ufunc(*[_box(x) if isinstance(x, cls) else x for x in inputs])
+    if len(inputs) == 1 and ufunc.__name__ in _UNARY_UFUNCS:
+        return getattr(cls, _UNARY_UFUNCS[ufunc.__name__])(inputs[0])
+    if len(inputs) == 2 and ufunc.__name__ in _BINARY_UFUNCS:
+        name, reflected = _BINARY_UFUNCS[ufunc.__name__]
+        if isinstance(inputs[0], cls):
+            return getattr(inputs[0], name)(inputs[1])
+        return getattr(inputs[1], reflected)(inputs[0])
+    return NotImplemented
+
+
 class DualNum:
     '''
     Creates a Dual Class that supports Auto Differentiation custom operations
@@ -17,7 +113,7 @@ class DualNum:
     Methods
     ======
     __add__, __radd__, __mul__, __rmul__, __sub__, __rsub__, __neg__, __pow__, __rpow__, __truediv__, __rtruediv__, 
-    __eq__, __ne__, __sqrt__, __sin__, __cos__, __tan__, __arcsin__, __arccos__, __arctan__, __sinh__, __cosh__, 
+    __eq__, __ne__, __lt__, __le__, __gt__, __ge__, __mod__, __sqrt__, __sin__, __cos__, __tan__, __arcsin__, __arccos__, __arctan__, __sinh__, __cosh__, 
     __tanh__, __logistic__, __log__, __exp__
     
     Dunder methods are overloaded to operate on DualNum objects
@@ -40,9 +136,30 @@ class DualNum:
     >>> print(x3.val, x3.der)
     20.0 0.0
 
+    Batched Input: one pass evaluates the function at every point of the array
+    >>> x=DualNum(np.array([0, 0.5, 1]), 1)
+    >>> y=DualNum.sin(x)*x
+    >>> print(y.val, y.der)
+    [0.         0.23971277 0.84147098] [0.         0.91821682 1.38177329]
+
+    Multi-directional Input: der holds one tangent per seed direction, the full gradient comes out of one pass
+    >>> x1, x2=DualNum.variables([1, 2])
+    >>> y=x1*x2+DualNum.exp(x1*x2)
+    >>> print(y.der)
+    [16.7781122   8.3890561]
     
     '''
-    def __init__(self, val, der, seed = np.array([1])):
+    __slots__ = ('val', 'der')
+
+    def __array_ufunc__(self, ufunc, method, *inputs, **kwargs):
+        '''
+        Lets np.exp, np.sin, ... apply the DualNum elementary functions, and makes NumPy arrays on the
+        left of an operator defer to the DualNum operators instead of looping over their entries,
+        so that a DualNum can hold a whole batch of values
+        '''
+        return _array_ufunc(DualNum, ufunc, method, inputs, kwargs)
+
+    def __init__(self, val, der, seed = None):
         '''
         Constructs attributes of a DualNum object to represent a variable or function
         
@@ -53,11 +170,66 @@ class DualNum:
         der: int or float; value of the initialized derivative/gradient/Jacobian of user defined function(s) f
             der is an np.array for scalar functions and a list for vector functions
         seed: int, list, or array; the seed vector/derivative from parents
+            if given, der becomes one tangent per entry of seed, der * seed[j], stacked along a new first axis
 
+        val and der may also be np.arrays (lists are converted), in which case operations are applied
+        elementwise and broadcast following the NumPy rules
+        Tangent directions are always along the first axis of der, so that der broadcasts against val
         '''
+        if isinstance(val, (list, tuple)):
+            val = np.asarray(val, dtype=float)
+        if isinstance(der, (list, tuple)):
+            der = np.asarray(der, dtype=float)
+        if seed is not None:
+            der = np.multiply.outer(np.asarray(seed, dtype=float), der * np.ones(np.shape(val)))
         self.val = val
         self.der = der
 
+    @staticmethod
+    def variables(vals, seeds=None):
+        """
+        Creates one DualNum per input variable, seeded so that a single forward pass computes derivatives
+        along all the seed directions at once
+
+        Attributes
+        ----------------------------------
+        vals: list or np.array
+          values of the input variables, entries may themselves be np.arrays of batched values
+        seeds: np.array of shape (n, k)
+          row i is the seed of variable i for each of the k directions, defaults to the identity so that
+          der of an output is its gradient
+
+        Returns
+        ---------------------------------
+          list of DualNum objects whose der has shape (k,) + shape of the value
+        """
+        n = len(vals)
+        seeds = np.eye(n) if seeds is None else np.asarray(seeds, dtype=float).reshape(n, -1)
+        return [DualNum(vals[i], 1, seed=seeds[i]) for i in range(n)]
+
+    def _tangents(self, shape):
+        """
+        der laid out for a value of the broadcast shape of val and shape: the directions stacked in front of
+        der stay in front, and the value axes are broadcast, so that batched values of different shapes
+        never mix with the directions
+
+        Attributes
+        ----------------------------------
+        shape: tuple
+          shape of the other operand of an operation
+
+        Returns
+        ---------------------------------
+          der, unchanged when it has no direction axis
+        """
+        directions = np.ndim(self.der) - np.ndim(self.val)
+        if directions <= 0:
+            return self.der
+        shape = np.broadcast_shapes(np.shape(self.val), shape)
+        lead = np.shape(self.der)[:directions]
+        der = np.reshape(self.der, lead + (1,) * (len(shape) - np.ndim(self.val)) + np.shape(self.val))
+        return np.broadcast_to(der, lead + shape)
+
     # Overload addition
     def __add__(self, other): 
         """
@@ -72,11 +244,19 @@ class DualNum:
         ---------------------------------
           DualNum object with updated value and derivative
         """
-        try:
-            return DualNum(self.val + other.val, self.der + other.der) 
-        except:
-            other = DualNum(other, 0)
-            return DualNum(self.val + other.val, self.der + other.der)
+        if isinstance(other, _CONSTANTS):
+            der = self.der
+            if isinstance(other, np.ndarray):
+                if other.dtype.hasobject:
+                    return NotImplemented
+                der = self._tangents(other.shape)
+            return DualNum(self.val + other, der)
+        if isinstance(other, DualNum):
+            der, other_der = self.der, other.der
+            if isinstance(self.val, np.ndarray) or isinstance(other.val, np.ndarray):
+                der, other_der = self._tangents(np.shape(other.val)), other._tangents(np.shape(self.val))
+            return DualNum(self.val + other.val, der + other_der)
+        return _retry(DualNum.__add__, self, other)
 
     # Overload radd
     def __radd__(self, other):
@@ -108,11 +288,19 @@ class DualNum:
         ---------------------------------
           DualNum object with updated value and derivative
         """
-        try:
-            return DualNum(self.val * other.val, self.val * other.der + other.val * self.der)
-        except:
-            other = DualNum(other, 0)
-            return DualNum(self.val * other.val, self.val * other.der + other.val * self.der)
+        if isinstance(other, _CONSTANTS):
+            der = self.der
+            if isinstance(other, np.ndarray):
+                if other.dtype.hasobject:
+                    return NotImplemented
+                der = self._tangents(other.shape)
+            return DualNum(self.val * other, other * der)
+        if isinstance(other, DualNum):
+            der, other_der = self.der, other.der
+            if isinstance(self.val, np.ndarray) or isinstance(other.val, np.ndarray):
+                der, other_der = self._tangents(np.shape(other.val)), other._tangents(np.shape(self.val))
+            return DualNum(self.val * other.val, self.val * other_der + other.val * der)
+        return _retry(DualNum.__mul__, self, other)
 
     # Overload rmul
     def __rmul__(self, other):
@@ -143,8 +331,20 @@ class DualNum:
         Returns
         ---------------------------------
           DualNum object with updated value and derivative
-        """        
-        return self.__add__(-other)
+        """
+        if isinstance(other, _CONSTANTS):
+            der = self.der
+            if isinstance(other, np.ndarray):
+                if other.dtype.hasobject:
+                    return NotImplemented
+                der = self._tangents(other.shape)
+            return DualNum(self.val - other, der)
+        if isinstance(other, DualNum):
+            der, other_der = self.der, other.der
+            if isinstance(self.val, np.ndarray) or isinstance(other.val, np.ndarray):
+                der, other_der = self._tangents(np.shape(other.val)), other._tangents(np.shape(self.val))
+            return DualNum(self.val - other.val, der - other_der)
+        return _retry(DualNum.__sub__, self, other)
 
     # Overload rsub
     def __rsub__(self, other):
@@ -160,7 +360,14 @@ class DualNum:
         ---------------------------------
           DualNum object with updated value and derivative
         """
-        return (-self).__add__(other)
+        if isinstance(other, _CONSTANTS):
+            der = self.der
+            if isinstance(other, np.ndarray):
+                if other.dtype.hasobject:
+                    return NotImplemented
+                der = self._tangents(other.shape)
+            return DualNum(other - self.val, -der)
+        return _retry(DualNum.__rsub__, self, other)
 
     # Overload division
     def __truediv__(self, other):
@@ -176,11 +383,19 @@ class DualNum:
         ---------------------------------
           DualNum object with updated value and derivative
         """
-        try:
-            return DualNum(self.val / other.val, (self.der * other.val - self.val * other.der)/(other.val**2))
-        except:
-            other=DualNum(other,0)
-            return DualNum(self.val / other.val, (self.der * other.val - self.val * other.der)/(other.val**2))
+        if isinstance(other, _CONSTANTS):
+            der = self.der
+            if isinstance(other, np.ndarray):
+                if other.dtype.hasobject:
+                    return NotImplemented
+                der = self._tangents(other.shape)
+            return DualNum(self.val / other, der / other)
+        if isinstance(other, DualNum):
+            der, other_der = self.der, other.der
+            if isinstance(self.val, np.ndarray) or isinstance(other.val, np.ndarray):
+                der, other_der = self._tangents(np.shape(other.val)), other._tangents(np.shape(self.val))
+            return DualNum(self.val / other.val, (der * other.val - self.val * other_der)/(other.val**2))
+        return _retry(DualNum.__truediv__, self, other)
 
     # Overload rdiv
     def __rtruediv__(self, other):
@@ -196,11 +411,15 @@ class DualNum:
         ---------------------------------
           DualNum object with updated value and derivative
         """
-        try:
-            return DualNum(other.val / self.val, (other.der * self.val - other.val * self.der)/(self.val**2))
-        except:
-            other=DualNum(other,0)
-            return DualNum(other.val / self.val, (other.der * self.val - other.val * self.der)/(self.val**2))
+        if isinstance(other, _CONSTANTS):
+            der = self.der
+            if isinstance(other, np.ndarray):
+                if other.dtype.hasobject:
+                    return NotImplemented
+                der = self._tangents(other.shape)
+            val = other / self.val
+            return DualNum(val, -val / self.val * der)
+        return _retry(DualNum.__rtruediv__, self, other)
 
     # Overload negation
     def __neg__(self):
@@ -228,12 +447,20 @@ class DualNum:
         ---------------------------------
           DualNum object with updated value and derivative
         """
-        try:
-            return DualNum(self.val ** exponent.val, np.exp(exponent.val * np.log(self.val)) * (exponent.der * np.log(self.val) + (exponent.val / self.val) * self.der))
-        except:
-            exponent=DualNum(exponent,0)
-            return DualNum(self.val ** exponent.val, np.exp(exponent.val * np.log(self.val)) * (exponent.der * np.log(self.val) + (exponent.val / self.val) * self.der))
-
+        if isinstance(exponent, _CONSTANTS):
+            der = self.der
+            if isinstance(exponent, np.ndarray):
+                if exponent.dtype.hasobject:
+                    return NotImplemented
+                der = self._tangents(exponent.shape)
+            # constant exponent: no log of the base is needed, so negative bases are fine
+            return DualNum(self.val ** exponent, exponent * self.val ** (exponent - 1) * der)
+        if isinstance(exponent, DualNum):
+            der, other_der = self.der, exponent.der
+            if isinstance(self.val, np.ndarray) or isinstance(exponent.val, np.ndarray):
+                der, other_der = self._tangents(np.shape(exponent.val)), exponent._tangents(np.shape(self.val))
+            return DualNum(self.val ** exponent.val, np.exp(exponent.val * np.log(self.val)) * (other_der * np.log(self.val) + (exponent.val / self.val) * der))
+        return _retry(DualNum.__pow__, self, exponent)
 
     # Overload rpow
     def __rpow__(self, exponent):
@@ -249,12 +476,15 @@ class DualNum:
         ---------------------------------
           DualNum object with updated value and derivative
         """
-        try:
-            return DualNum(exponent.val ** self.val, np.exp(self.val * np.log(exponent.val)) * (self.der * np.log(exponent.val) + (self.val / exponent.val) * exponent.der))
-        except:
-            exponent=DualNum(exponent,0)
-            return DualNum(exponent.val ** self.val, np.exp(self.val * np.log(exponent.val)) * (self.der * np.log(exponent.val) + (self.val / exponent.val) * exponent.der))
-
+        if isinstance(exponent, _CONSTANTS):
+            der = self.der
+            if isinstance(exponent, np.ndarray):
+                if exponent.dtype.hasobject:
+                    return NotImplemented
+                der = self._tangents(exponent.shape)
+            val = exponent ** self.val
+            return DualNum(val, val * np.log(exponent) * der)
+        return _retry(DualNum.__rpow__, self, exponent)
         
     # Overload equal
     def __eq__(self, other):
@@ -271,12 +501,15 @@ class DualNum:
           DualNum object with updated value and derivative
         
         '''
-        try:
-            output = (self.val == other.val) and np.array_equal(self.der, other.der)
-        except AttributeError:
+        if not isinstance(other, DualNum):
             # output is false because scalars are not equal to variables
-            output = False
-        return output
+            return False
+        # a scalar derivative stands for the same derivative at every batched value, so der is compared
+        # after broadcasting, like values
+        try:
+            return bool(np.all(np.equal(self.val, other.val)) and np.all(np.equal(self.der, other.der)))
+        except ValueError:
+            return False
 
     # Overload not equal
     def __ne__(self, other):
@@ -295,6 +528,61 @@ class DualNum:
         '''
         return not self.__eq__(other)
 
+    # Overload ordering, derivatives do not take part in it
+    @staticmethod
+    def _value(other):
+        return other.val if isinstance(other, DualNum) else other
+
+    def __lt__(self, other):
+        '''
+        Compares the value of self with the value of other, so that DualNum can flow through code
+        that branches on values, e.g. the domain checks of Node
+
+        Attributes
+        ----------------------------------
+        other: int, float, np.array, or DualNum
+          value to compare with self
+
+        Returns
+        ---------------------------------
+          bool, or np.array of bool for batched values
+        '''
+        return self.val < DualNum._value(other)
+
+    def __le__(self, other):
+        '''
+        Compares the value of self with the value of other, see __lt__
+        '''
+        return self.val <= DualNum._value(other)
+
+    def __gt__(self, other):
+        '''
+        Compares the value of self with the value of other, see __lt__
+        '''
+        return self.val > DualNum._value(other)
+
+    def __ge__(self, other):
+        '''
+        Compares the value of self with the value of other, see __lt__
+        '''
+        return self.val >= DualNum._value(other)
+
+    # Overload modulo
+    def __mod__(self, other):
+        '''
+        remainder of self divided by a number, whose derivative is the derivative of self
+
+        Attributes
+        ----------------------------------
+        other: int or float
+          divisor
+
+        Returns
+        ---------------------------------
+          DualNum object with updated value and derivative
+        '''
+        return DualNum(self.val % other, self.der)
+
     # Overload sin
     @staticmethod  
     def sin(other):
@@ -310,11 +598,9 @@ class DualNum:
         ---------------------------------
           DualNum object with updated value and derivative
         """
-        try:
-            return DualNum(np.sin(other.val), np.cos(other.val)*other.der)
-        except:
-            other=DualNum(other,0)
-            return DualNum(np.sin(other.val), np.cos(other.val)*other.der)
+        if not isinstance(other, DualNum):
+            other = DualNum(other, 0)
+        return DualNum(np.sin(other.val), np.cos(other.val)*other.der)
 
     # Overload cos
     @staticmethod
@@ -331,11 +617,9 @@ class DualNum:
         ---------------------------------
           DualNum object with updated value and derivative
         """
-        try:
-            return DualNum(np.cos(other.val), -np.sin(other.val)*other.der)
-        except:
-            other=DualNum(other,0)
-            return DualNum(np.cos(other.val), -np.sin(other.val)*other.der)
+        if not isinstance(other, DualNum):
+            other = DualNum(other, 0)
+        return DualNum(np.cos(other.val), -np.sin(other.val)*other.der)
         
     # Overload tan
     @staticmethod
@@ -352,20 +636,18 @@ class DualNum:
         ---------------------------------
           DualNum object with updated value and derivative
         """
-        try:
-            checkdomain = other.val % np.pi == (np.pi/2)
-            if checkdomain:
-                raise ValueError('Cannot take tangents of multiples of pi/2 + (pi * n), where n is a positive integer')
-            new_other = np.tan(other.val)
-            tan_deriv = 1 / np.power(np.cos(other.der), 2)
-            new_der = other.der * tan_deriv
-        
-            tan = DualNum(new_other, new_der)
-        
-            return tan
-
-        except AttributeError:
+        if not isinstance(other, DualNum):
             return np.tan(other)
+        checkdomain = np.any(other.val % np.pi == (np.pi/2))
+        if checkdomain:
+            raise ValueError('Cannot take tangents of multiples of pi/2 + (pi * n), where n is a positive integer')
+        new_other = np.tan(other.val)
+        tan_deriv = 1 / np.power(np.cos(other.val), 2)
+        new_der = other.der * tan_deriv
+    
+        tan = DualNum(new_other, new_der)
+    
+        return tan
 
     # Overload exp
     @staticmethod
@@ -384,11 +666,9 @@ class DualNum:
         ---------------------------------
           DualNum object with updated value and derivative
         """
-        try:
-            return DualNum(base**other.val, base**other.val*other.der)
-        except:
-            other=DualNum(other,0)
-            return DualNum(base**other.val, base**other.val*other.der)
+        if not isinstance(other, DualNum):
+            other = DualNum(other, 0)
+        return DualNum(base**other.val, base**other.val*other.der)
 
     # Overload log
     @staticmethod
@@ -407,11 +687,9 @@ class DualNum:
         ---------------------------------
           DualNum object with updated value and derivative, parents of this new node is other
         """
-        try:
-            return DualNum(np.log(other.val)/np.log(base), 1/other.val*other.der/np.log(base))
-        except:
-            other=DualNum(other,0)
-            return DualNum(np.log(other.val)/np.log(base), 1/other.val*other.der/np.log(base))
+        if not isinstance(other, DualNum):
+            other = DualNum(other, 0)
+        return DualNum(np.log(other.val)/np.log(base), 1/other.val*other.der/np.log(base))
     
     # Overload logistic
     @staticmethod
@@ -445,18 +723,16 @@ class DualNum:
         ---------------------------------
           DualNum object with updated value and derivative
         """
-        try:
-            if other.val > 1 or other.val <-1:
-                raise ValueError('please use value between -1 and 1, inclusive')
-            else:
-                new_other = np.arcsin(other.val)
-                new_der = 1 / np.sqrt(1 - other.val**2)
-        
-            arcsin = DualNum(new_other, new_der)
-            return arcsin
-    
-        except AttributeError:
+        if not isinstance(other, DualNum):
             return np.arcsin(other)
+        if np.any((other.val > 1) | (other.val < -1)):
+            raise ValueError('please use value between -1 and 1, inclusive')
+        else:
+            new_other = np.arcsin(other.val)
+            new_der = other.der / np.sqrt(1 - other.val**2)
+    
+        arcsin = DualNum(new_other, new_der)
+        return arcsin
     
     # Overload arccos
     @staticmethod
@@ -473,18 +749,16 @@ class DualNum:
         ---------------------------------
           DualNum object with updated value and derivative
         """
-        try:
-            if other.val > 1 or other.val <-1:
-                raise ValueError('please use value between -1 and 1, inclusive')
-            else:
-                new_other = np.arccos(other.val)
-                new_der = -1 / np.sqrt(1 - other.val**2)
-        
-            arccos = DualNum(new_other, new_der)
-            return arccos
-    
-        except AttributeError:
+        if not isinstance(other, DualNum):
             return np.arccos(other)
+        if np.any((other.val > 1) | (other.val < -1)):
+            raise ValueError('please use value between -1 and 1, inclusive')
+        else:
+            new_other = np.arccos(other.val)
+            new_der = -other.der / np.sqrt(1 - other.val**2)
+    
+        arccos = DualNum(new_other, new_der)
+        return arccos
 
     # Overload arctangent
     @staticmethod
@@ -501,16 +775,14 @@ class DualNum:
         ---------------------------------
           DualNum object with updated value and derivative
         """
-        try:
-            new_other = np.arctan(other.val)
-            arctan_deriv = 1 / (1 + np.power(other.val, 2))
-            new_der = other.der * arctan_deriv
-            
-            arctan = DualNum(new_other, new_der)
-            return arctan
-    
-        except AttributeError:
+        if not isinstance(other, DualNum):
             return np.arctan(other)
+        new_other = np.arctan(other.val)
+        arctan_deriv = 1 / (1 + np.power(other.val, 2))
+        new_der = other.der * arctan_deriv
+        
+        arctan = DualNum(new_other, new_der)
+        return arctan
 
 
     # Overload sinh
@@ -528,15 +800,14 @@ class DualNum:
         ---------------------------------
           DualNum object with updated value and derivative
         """
-        try:
-            new_other = np.sinh(other.val)
-            sinh_deriv = np.cosh(other.val)
-            new_der = other.der * sinh_deriv
+        if not isinstance(other, DualNum):
+            return np.sinh(other)
+        new_other = np.sinh(other.val)
+        sinh_deriv = np.cosh(other.val)
+        new_der = other.der * sinh_deriv
  
-            sinh = DualNum(new_other, new_der)
-            return sinh
-        except AttributeError:
-            return np.sinh(other) 
+        sinh = DualNum(new_other, new_der)
+        return sinh
 
     # Overload cosh
     @staticmethod
@@ -553,15 +824,14 @@ class DualNum:
         ---------------------------------
           DualNum object with updated value and derivative
         """
-        try:
-            new_other = np.cosh(other.val)
-            cosh_deriv = np.sinh(other.val)
-            new_der = other.der * cosh_deriv
-            
-            cosh = DualNum(new_other, new_der)
-            return cosh
-        except AttributeError:
+        if not isinstance(other, DualNum):
             return np.cosh(other)
+        new_other = np.cosh(other.val)
+        cosh_deriv = np.sinh(other.val)
+        new_der = other.der * cosh_deriv
+        
+        cosh = DualNum(new_other, new_der)
+        return cosh
 
     # Overload tanh
     @staticmethod
@@ -578,16 +848,14 @@ class DualNum:
         ---------------------------------
           DualNum object with updated value and derivative
         """
-        try:
-            new_other = np.tanh(other.val)
-            tanh_deriv = 1 / np.power(np.cosh(other.val), 2)
-            new_der = other.der * tanh_deriv
-            
-            tanh = DualNum(new_other, new_der)
-            return tanh
-        
-        except AttributeError:
+        if not isinstance(other, DualNum):
             return np.tanh(other)
+        new_other = np.tanh(other.val)
+        tanh_deriv = 1 / np.power(np.cosh(other.val), 2)
+        new_der = other.der * tanh_deriv
+        
+        tanh = DualNum(new_other, new_der)
+        return tanh
 
     # Overload sqrt
     @staticmethod
@@ -604,12 +872,12 @@ class DualNum:
         ---------------------------------
           DualNum object with updated value and derivative
         """
+        if np.any((other.val if isinstance(other, DualNum) else other) < 0):
+            raise ValueError('Cannot take square roots of negative values')
         if isinstance(other, DualNum):
             new_other = np.sqrt(other.val)
             new_der = 0.5 / np.sqrt(other.val) * other.der
             return DualNum(new_other, new_der)
-        elif other < 0:
-            raise ValueError('Cannot take square roots of negative values')
         else:
             return np.sqrt(other)
 
@@ -658,10 +926,20 @@ class DualNumVec(DualNum):
     >>> y=DualNumVec([x1*x2+DualNum.exp(x1*x2), x1+x2**2,x1/x2+15])
     >>> grad[:,i:i+1]=np.array([y.getgrad()]).T
     >>> print(grad)
+    [[16.7781122  8.3890561]
+     [ 1.         4.       ]
+     [ 0.5       -0.25     ]]
+
+    # Multi-directional --> the whole Jacobian in one pass
+    >>> x1, x2=DualNum.variables([1, 2])
+    >>> y=DualNumVec([x1*x2+DualNum.exp(x1*x2), x1+x2**2,x1/x2+15])
+    >>> print(y.getjacobian())
     [[16.7781122  8.3890561]
      [ 1.         4.       ]
      [ 0.5       -0.25     ]]
     '''
+    __slots__ = ('vec', 'grad', 'vals')
+
     def __init__(self, vec):
         """
         Constructs the necessary attributes of the class
@@ -697,6 +975,239 @@ class DualNumVec(DualNum):
             self.vals.append(x.val)
         return self.vals
 
+    def getjacobian(self):
+        """
+        Jacobian of the function when its inputs were created with multi-directional seeds (see DualNum.variables)
+
+        Output
+        ------------------
+        np.array of shape (m, k) + shape of the values: row i holds the tangents of entry i of the function,
+        entries that are plain numbers have zero tangents
+        """
+        ders = [x.der for x in self.vec if isinstance(x, DualNum)]
+        if not ders:
+            raise ValueError('the function does not depend on any DualNum')
+        shape = np.broadcast_shapes(*[np.shape(der) for der in ders])
+        jacobian = np.zeros((len(self.vec),) + shape)
+        for i, x in enumerate(self.vec):
+            if isinstance(x, DualNum):
+                jacobian[i] = x.der
+        return jacobian
+
+
+def _toposort(outputs, positions=False):
+  """
+  Sorts the graph leading to outputs topologically with an explicit stack instead of recursion,
+  so that arbitrarily deep graphs can be traversed
+
+  Attributes
+  -----------------------------------
+  outputs: list of Node
+    Nodes from which the graph is explored through their parents
+  positions: bool
+    whether the positions of the Nodes and of their parents in order are also returned
+
+  Returns
+  -----------------------------------
+  order: list of Node
+    every Node of the graph exactly once, each Node appearing after both of its parents
+  position: dict
+    position of each Node in order, only if positions is True
+  parent1, parent2: list of int
+    positions of the parents of each Node, -1 when the parent does not exist, only if positions is True
+  """
+  order=[]
+  parent1=[]
+  parent2=[]
+  # position of each Node in order, -1 until it is emitted
+  visited={}
+  for out in outputs:
+    stack=[(out, False)]
+    while stack:
+      node, expanded=stack.pop()
+      if expanded:
+        visited[node]=len(order)
+        order.append(node)
+        if positions:
+          # the parents are emitted before node, so their positions are known
+          parent1.append(-1 if node.parent1 is None else visited[node.parent1])
+          parent2.append(-1 if node.parent2 is None else visited[node.parent2])
+        continue
+      if node in visited:
+        continue
+      visited[node]=-1
+      # node is emitted once everything pushed above it, i.e. its parents, has been emitted
+      stack.append((node, True))
+      if node.parent2 is not None:
+        stack.append((node.parent2, False))
+      if node.parent1 is not None:
+        stack.append((node.parent1, False))
+  if positions:
+    return order, visited, parent1, parent2
+  return order
+
+
+def _adjoints(seeds):
+  """
+  Propagates the adjoints of several Nodes through the graph they share in a single reverse sweep
+
+  Attributes
+  -----------------------------------
+  seeds: dict
+    initial adjoint of each output Node
+
+  Returns
+  -----------------------------------
+  adjoint: dict
+    adjoint of every Node of the graph, the outputs included
+  """
+  adjoint=dict(seeds)
+  for node in reversed(_toposort(list(seeds))):
+    sofar=adjoint[node]
+    if node.parent1 is not None:
+      adjoint[node.parent1]=adjoint.get(node.parent1, 0)+sofar*node.der1
+    if node.parent2 is not None:
+      adjoint[node.parent2]=adjoint.get(node.parent2, 0)+sofar*node.der2
+  return adjoint
+
+
+def _graph_stats(outputs):
+  """
+  Size and shape of the graph reachable from outputs, in one pass over its topological order
+
+  Attributes
+  -----------------------------------
+  outputs: list of Node
+    Nodes from which the graph is explored through their parents
+
+  Returns
+  -----------------------------------
+  stats: dict
+    nodes: number of Nodes
+    edges: number of parent links, x*x counts two
+    leaves: Nodes without parents, i.e. variables and constants
+    variables, constants: leaves created by the user and numbers wrapped by an operation
+    max_depth: longest chain of operations from a leaf to an output
+    fan_out: {number of children: number of Nodes with that many children}
+    shared: Nodes used by more than one operation, whose adjoints are accumulated
+    memory_bytes: estimate of the memory held by the Nodes, their values, partials and gradients
+  """
+  order=_toposort(outputs)
+  depth={}
+  children=dict.fromkeys(order, 0)
+  edges=leaves=constants=memory=0
+  for node in order:
+    memory+=_getsizeof(node)+_getsizeof(node.val)
+    if node._grad is not None:
+      memory+=_getsizeof(node._grad)
+    if node.parent1 is None:
+      leaves+=1
+      constants+=node.op=='const'
+      depth[node]=0
+      continue
+    memory+=_getsizeof(node.der1)
+    edges+=1
+    children[node.parent1]+=1
+    d=depth[node.parent1]
+    if node.parent2 is not None:
+      memory+=_getsizeof(node.der2)
+      edges+=1
+      children[node.parent2]+=1
+      d=max(d, depth[node.parent2])
+    depth[node]=d+1
+  fan_out={}
+  for count in children.values():
+    fan_out[count]=fan_out.get(count, 0)+1
+  return {'nodes': len(order),
+          'edges': edges,
+          'leaves': leaves,
+          'variables': leaves-constants,
+          'constants': constants,
+          'max_depth': max(depth.values(), default=0),
+          'fan_out': dict(sorted(fan_out.items())),
+          'shared': sum(count > 1 for count in children.values()),
+          'memory_bytes': memory}
+
+
+def _index(outputs):
+  """
+  Graph reachable from outputs as flat lists, in topological order
+
+  Attributes
+  -----------------------------------
+  outputs: list of Node
+    Nodes from which the graph is explored through their parents
+
+  Returns
+  -----------------------------------
+  order: list of Node
+    the graph in topological order
+  position: dict
+    position of each Node in order
+  parent1, parent2: list of int
+    positions of the parents of each Node, -1 when the parent does not exist
+  der1, der2: list of float
+    local partial derivatives of each Node, 0.0 when the parent does not exist
+  """
+  order, position, parent1, parent2=_toposort(outputs, positions=True)
+  der1=[0.0 if node.parent1 is None else float(node.der1) for node in order]
+  der2=[0.0 if node.parent2 is None else float(node.der2) for node in order]
+  return order, position, parent1, parent2, der1, der2
+
+
+def _jacobian_array(outputs, variables):
+  """
+  Jacobian of outputs with respect to variables as a dense array. The graph is sorted and indexed once,
+  then each output is swept over flat lists of parent positions and partials, so that no Node is hashed
+  during the sweeps, and its adjoints are gathered into a row of the preallocated array
+
+  Attributes
+  -----------------------------------
+  outputs: list
+    outputs of the function, entries that are not Nodes are constants
+  variables: list of Node
+    Nodes defining the columns, usually created by Node.variables
+
+  Returns
+  -----------------------------------
+  jacobian: np.array of shape (len(outputs), len(variables))
+  order: list of Node
+    the graph in topological order
+  """
+  order, position, parent1, parent2, der1, der2=_index([y for y in outputs if isinstance(y, Node)])
+  columns=[position.get(v, -1) for v in variables]
+  jacobian=np.zeros((len(outputs), len(variables)))
+  for i, y in enumerate(outputs):
+    if not isinstance(y, Node):
+      continue
+    # nodes after the output in the order cannot be its ancestors
+    k=position[y]
+    adjoint=[0.0]*(k+1)
+    adjoint[k]=1.0
+    _sweep(adjoint, parent1, parent2, der1, der2, stop=k+1)
+    row=jacobian[i]
+    for j, c in enumerate(columns):
+      if 0 <= c <= k:
+        row[j]=adjoint[c]
+  return jacobian, order
+
+
+def _is_variable(node):
+  """
+  whether node is a variable of its graph: a Node without parents that is not a constant wrapped by an
+  operation. Nodes released by reverse(retain_graph=False) become variables
+  """
+  return node.parent1 is None and node.op != 'const'
+
+
+def _release(order):
+  """
+  Drops the parents and local partials of the Nodes in order, so that the graph they formed can be freed
+  """
+  for node in order:
+    node.parent1=node.parent2=None
+    node.der1=node.der2=None
+
 
 class Node:
   """
@@ -707,11 +1218,18 @@ class Node:
   Attributes
   -----------------------------------
   val: int
-    value of the variable/number
+    value of the variable/number, a DualNum value makes the local partials DualNum as well,
+    so that the reverse pass also carries their directional derivatives (forward-over-reverse)
   parent1, panrent2: Node
     Current Node is the result of an operation on previous Node(s), called the parents
+  der1, der2: float
+    local partial derivatives of the Node with respect to parent1 and parent2
   der: dict
-    local partial derivatives of the Nodes in function of their parent(s)
+    the same partial derivatives, labelled "1" and "2"
+  op: str
+    name of the operation that produced the Node, used to replay the graph
+  grad: dict
+    gradient computed by the last reverse, only allocated on the Nodes it is requested from
   
   Methods
   ----------------------------------
@@ -726,8 +1244,14 @@ class Node:
 
   getgrad(self, var)
   outputs the value of the gradient of the function with respect to the variable 'var'
+
+  stats
+  size and shape of the graph leading to the Node
   """
-  def __init__(self,val, parent1=None, parent2=None, der={}):
+  # no per instance __dict__, graphs hold one Node per operation
+  __slots__=('val', 'parent1', 'parent2', 'der1', 'der2', 'op', '_grad')
+
+  def __init__(self,val, parent1=None, parent2=None, der1=None, der2=None, der=None, op=None):
     """
     Constructs the necessary attributes for Node
     Attributes
@@ -736,14 +1260,73 @@ class Node:
      value of the variable/number
     parent1, panrent2: Node
       Current Node is the result of an operation on previous Node(s), called the parents
+    der1, der2: float
+      local partial derivatives of the Node with respect to parent1 and parent2
     der: dict
-      local partial derivatives of the Nodes in function of their parent(s)   
+      alternatively, local partial derivatives labelled "1" and "2"
+    op: str
+      name of the operation that produced the Node, 'const' for numbers wrapped by an operation,
+      None for variables
     """
+    if der is not None:
+      der1=der.get("1")
+      der2=der.get("2")
     self.val=val
     self.parent1=parent1
     self.parent2=parent2
-    self.der=der
-    self.grad={}
+    self.der1=der1
+    self.der2=der2
+    self.op=op
+    self._grad=None
+
+  @property
+  def der(self):
+    """
+    local partial derivatives of the Node labelled "1" and "2", for the parents that exist
+    """
+    der={}
+    if self.parent1 is not None:
+      der["1"]=self.der1
+    if self.parent2 is not None:
+      der["2"]=self.der2
+    return der
+
+  @property
+  def grad(self):
+    """
+    gradient of the function computed by reverse, entries are labelled by variables
+    """
+    if self._grad is None:
+      self._grad={}
+    return self._grad
+
+  @grad.setter
+  def grad(self, grad):
+    self._grad=grad
+
+  @staticmethod
+  def variables(vals):
+    """
+    Creates one Node per input variable, whose positions index the gradient arrays returned by
+    reverse(variables=...)
+
+    Attributes
+    -----------------------------------
+    vals: list or np.array
+      values of the input variables
+
+    Returns
+    -----------------------------------
+      list of Node objects
+    """
+    return [Node(val) for val in np.asarray(vals, dtype=float).ravel().tolist()]
+
+  def __array_ufunc__(self, ufunc, method, *inputs, **kwargs):
+    """
+    Lets np.exp, np.sin, ... apply the Node elementary functions and NumPy scalars and arrays
+    on the left of an operator defer to the Node operators
+    """
+    return _array_ufunc(Node, ufunc, method, inputs, kwargs)
 
   #Overload add
   def __add__(self,other):
@@ -759,11 +1342,11 @@ class Node:
     ---------------------------------
       Node object with updated value and derivative, parents of this new node are self and other
     """
-    try:
-      return Node(self.val+other.val, parent1=self, parent2=other, der={"1": 1, "2": 1})
-    except:
-      aux=Node(other)
-      return Node(self.val+aux.val,parent1=self, parent2=aux, der={"1": 1, "2": 1})
+    if isinstance(other, Node):
+      return Node(self.val+other.val, parent1=self, parent2=other, der1=1, der2=1, op='add')
+    if _is_object_array(other):
+      return NotImplemented
+    return Node(self.val+other, parent1=self, parent2=Node(other, op='const'), der1=1, der2=1, op='add')
   
   # Overload radd
   def __radd__(self, other):
@@ -795,11 +1378,11 @@ class Node:
     ---------------------------------
       Node object with updated value and derivative, parents of this new node are self and other
     """
-    try:
-      return Node(self.val*other.val, parent1=self, parent2=other, der={"1":other.val, "2":self.val})
-    except:
-      aux=Node(other)
-      return Node(self.val*aux.val, parent1=self, parent2=aux, der={"1":aux.val, "2":self.val})
+    if isinstance(other, Node):
+      return Node(self.val*other.val, parent1=self, parent2=other, der1=other.val, der2=self.val, op='mul')
+    if _is_object_array(other):
+      return NotImplemented
+    return Node(self.val*other, parent1=self, parent2=Node(other, op='const'), der1=other, der2=self.val, op='mul')
 
   #Overload rmul
   def __rmul__(self,other):
@@ -831,11 +1414,9 @@ class Node:
     ---------------------------------
       Node object with updated value and derivative, parents of this new node are self and other
     """
-    try:
-      aux=Node(-other.val,parent1=other.parent1, parent2=other.parent2, der=other.der)
-      return self.__add__(aux)
-    except:
-      return self.__add__(Node(-other))
+    if _is_object_array(other):
+      return NotImplemented
+    return self.__add__(-other)
 
   #Overload rsub
   def __rsub__(self,other):
@@ -851,8 +1432,9 @@ class Node:
     ---------------------------------
       Node object with updated value and derivative, parents of this new node are self and other
     """
-    aux=Node(-self.val,parent1=self.parent1, parent2=self.parent2, der=self.der)
-    return aux.__add__(other)
+    if _is_object_array(other):
+      return NotImplemented
+    return (-self).__add__(other)
   
   #Overload negation
   def __neg__(self):
@@ -863,7 +1445,7 @@ class Node:
     ---------------------------------
       Node object with updated value
     """
-    return Node(-self.val,parent1=self.parent1, parent2=self.parent2, der=self.der)
+    return Node(-self.val, parent1=self, der1=-1, op='neg')
 
   #Overload power
   def __pow__(self, exponent):
@@ -879,12 +1461,14 @@ class Node:
     ---------------------------------
       Node object with updated value and derivative, parents of this new node are self and other
     """
+    if _is_object_array(exponent):
+      return NotImplemented
+    if not isinstance(exponent, Node):
+      # constant exponent: no log of the base is needed, so negative bases are fine
+      aux=Node(exponent, op='const')
+      return Node(self.val**exponent, parent1=self, parent2=aux, der1=exponent*self.val**(exponent-1), der2=0, op='pow')
     assert self.val>0, 'cannot have negative value for x in x**y as encounter log(x) in derivative'
-    try:
-      return Node(self.val**exponent.val, parent1=self, parent2=exponent, der={"1": exponent.val*self.val**(exponent.val-1), "2": self.val**exponent.val*np.log(self.val)})
-    except:
-      aux=Node(exponent)
-      return Node(self.val**aux.val, parent1=self, parent2=aux, der={"1": aux.val*self.val**(aux.val-1), "2": self.val**aux.val*np.log(self.val)})
+    return Node(self.val**exponent.val, parent1=self, parent2=exponent, der1=exponent.val*self.val**(exponent.val-1), der2=self.val**exponent.val*np.log(self.val), op='pow')
 
   #Overload rpow
   def __rpow__(self,other):
@@ -900,13 +1484,11 @@ class Node:
     ---------------------------------
       Node object with updated value and derivative, parents of this new node are self and other
     """
-    try: 
-      test=other.val
-    except:
-      aux=Node(other)
-      return aux.__pow__(self)
-    else:
-      return other.__pow__(self)
+    if _is_object_array(other):
+      return NotImplemented
+    if not isinstance(other, Node):
+      other=Node(other, op='const')
+    return other.__pow__(self)
 
   #Overload division
   def __truediv__(self, other):
@@ -922,11 +1504,11 @@ class Node:
     ---------------------------------
       Node object with updated value and derivative, parents of this new node are self and other
     """
-    try: 
-      return Node(self.val/other.val, parent1=self, parent2=other, der={"1": 1/other.val, "2": -self.val/(other.val)**2})
-    except:
-      aux=Node(other)
-      return Node(self.val/aux.val, parent1=self, parent2=aux, der={"1": 1/aux.val, "2": -self.val/(aux.val)**2})
+    if isinstance(other, Node):
+      return Node(self.val/other.val, parent1=self, parent2=other, der1=1/other.val, der2=-self.val/(other.val)**2, op='div')
+    if _is_object_array(other):
+      return NotImplemented
+    return Node(self.val/other, parent1=self, parent2=Node(other, op='const'), der1=1/other, der2=-self.val/other**2, op='div')
 
   #Overload rtruediv
   def __rtruediv__(self, other):
@@ -942,13 +1524,11 @@ class Node:
     ---------------------------------
       Node object with updated value and derivative, parents of this new node are self and other
     """
-    try: 
-      test=other.val
-    except:
-      aux=Node(other)
-      return aux.__truediv__(self)
-    else:
-      return other.__truediv__(self)
+    if _is_object_array(other):
+      return NotImplemented
+    if not isinstance(other, Node):
+      other=Node(other, op='const')
+    return other.__truediv__(self)
   
   @staticmethod
   def exp(other, base=np.e):
@@ -966,10 +1546,12 @@ class Node:
     ---------------------------------
       Node object with updated value and derivative, parents of this new node is other
     """
-    try:
-      return Node(base**other.val, parent1=other, parent2=None, der={"1": base**other.val })
-    except:
+    if not isinstance(other, Node):
       return base**other
+    if base!=np.e:
+      # base**x=e**(x*log(base)), so that only the natural exponential is recorded in the graph
+      return Node.exp(other*np.log(base))
+    return Node(np.exp(other.val), parent1=other, der1=np.exp(other.val), op='exp')
   
   @staticmethod
   def sin(other):
@@ -985,10 +1567,9 @@ class Node:
     ---------------------------------
       Node object with updated value and derivative, parents of this new node is other
     """
-    try:
-      return Node(np.sin(other.val), parent1=other, der={"1": np.cos(other.val)})
-    except:
+    if not isinstance(other, Node):
       return np.sin(other)
+    return Node(np.sin(other.val), parent1=other, der1=np.cos(other.val), op='sin')
   
   @staticmethod
   def cos(other):
@@ -1004,10 +1585,30 @@ class Node:
     ---------------------------------
       Node object with updated value and derivative, parents of this new node is other
     """
-    try:
-      return Node(np.cos(other.val), parent1=other, der={"1": -np.sin(other.val)})
-    except:
+    if not isinstance(other, Node):
       return np.cos(other)
+    return Node(np.cos(other.val), parent1=other, der1=-np.sin(other.val), op='cos')
+
+  @staticmethod
+  def tan(other):
+    """
+    tangent of other
+
+    Attributes
+    ----------------------------------
+    other: Node
+      argument of tangent function
+
+    Returns
+    ---------------------------------
+      Node object with updated value and derivative, parents of this new node is other
+    """
+    if not isinstance(other, Node):
+      return np.tan(other)
+    # under forward-over-reverse the value is a DualNum, whose == also compares derivatives
+    if DualNum._value(other.val) % np.pi == (np.pi/2):
+      raise ValueError('Cannot take tangents of multiples of pi/2 + (pi * n), where n is a positive integer')
+    return Node(np.tan(other.val), parent1=other, der1=1/np.cos(other.val)**2, op='tan')
 
   @staticmethod
   def log(other, base=np.e):
@@ -1025,10 +1626,11 @@ class Node:
     ---------------------------------
       Node object with updated value and derivative, parents of this new node is other
     """
-    try: 
-      return Node(np.log(other.val)/np.log(base), parent1=other, der={"1": 1/other.val/np.log(base)})
-    except:
+    if not isinstance(other, Node):
       return np.log(other)/np.log(base)
+    if base!=np.e:
+      return Node.log(other)/np.log(base)
+    return Node(np.log(other.val), parent1=other, der1=1/other.val, op='log')
 
   @staticmethod
   def arcsin(other):
@@ -1044,17 +1646,16 @@ class Node:
     ---------------------------------
       Node object with updated value and derivative, parents of this new node is other
     """
-    try:
-      if other.val > 1 or other.val <-1:
-        raise ValueError('please use value between -1 and 1, inclusive')
-      else:
-        new_other = np.arcsin(other.val)
-        new_der = 1 / np.sqrt(1 - other.val**2)
-        
-        arcsin = Node(new_other, parent1=other, der={"1": new_der})
-      return arcsin
-    except AttributeError:
+    if not isinstance(other, Node):
       return np.arcsin(other)
+    if other.val > 1 or other.val <-1:
+      raise ValueError('please use value between -1 and 1, inclusive')
+    else:
+      new_other = np.arcsin(other.val)
+      new_der = 1 / np.sqrt(1 - other.val**2)
+      
+      arcsin = Node(new_other, parent1=other, der1=new_der, op='arcsin')
+    return arcsin
 
   @staticmethod
   def arccos(other):
@@ -1070,17 +1671,16 @@ class Node:
     ---------------------------------
       Node object with updated value and derivative, parents of this new node is other
     """
-    try:
-      if other.val > 1 or other.val <-1:
-        raise ValueError('please use value between -1 and 1, inclusive')
-      else:
-        new_other = np.arccos(other.val)
-        new_der =  -1 / np.sqrt(1 - other.val**2)
-        
-        arcsin = Node(new_other, parent1=other, der={"1": new_der})
-      return arcsin
-    except AttributeError:
-      return np.arcsin(other)
+    if not isinstance(other, Node):
+      return np.arccos(other)
+    if other.val > 1 or other.val <-1:
+      raise ValueError('please use value between -1 and 1, inclusive')
+    else:
+      new_other = np.arccos(other.val)
+      new_der =  -1 / np.sqrt(1 - other.val**2)
+      
+      arccos = Node(new_other, parent1=other, der1=new_der, op='arccos')
+    return arccos
 
   @staticmethod
   def arctan(other):
@@ -1096,14 +1696,13 @@ class Node:
     ---------------------------------
       Node object with updated value and derivative, parents of this new node is other
     """
-    try:
-      new_other = np.arctan(other.val)
-      new_der = 1 / (1 + np.power(other.val, 2))
-        
-      arctan = Node(new_other, parent1=other, der={"1": new_der})
-      return arctan
-    except AttributeError:
+    if not isinstance(other, Node):
       return np.arctan(other)
+    new_other = np.arctan(other.val)
+    new_der = 1 / (1 + np.power(other.val, 2))
+      
+    arctan = Node(new_other, parent1=other, der1=new_der, op='arctan')
+    return arctan
 
   @staticmethod
   def sinh(other):
@@ -1190,56 +1789,63 @@ class Node:
 
 
 
-  def reverse(self):
+  def reverse(self, retain_graph=True, variables=None):
     """
     computes the reverse pass, i.e. goes through the tree in reverse and computes the gradient of the function
+    The graph is sorted topologically once, so every node and every edge is visited exactly once,
+    even when intermediate Nodes are shared by several operations
+    No recursion is involved, so there is no limit on the depth of the graph
+    Every call sweeps into its own buffers and only reads the parents and partials of the graph (unless
+    retain_graph is False), so calling it again gives the same gradient, and graphs sharing Nodes can be
+    differentiated concurrently from several threads, each using the gradient returned to it.
+    The gradient is also stored as the grad of this Node by a single assignment: when several threads sweep
+    from the same Node, grad holds the gradient of whichever call finished last
+
+    Attributes
+    ---------------------
+    retain_graph: bool
+      with False, the gradient only holds the variables, and the parents and partials of every Node of the
+      graph are dropped after the sweep, so that the intermediate Nodes are freed as soon as the caller
+      releases them. The Nodes of the graph then behave as variables, and the graph cannot be swept again
+    variables: list of Node
+      if given, the gradient with respect to these Nodes is returned as an array instead of being added to
+      the grad dict, adjoints are then accumulated by position rather than in a dict keyed by Node.
+      The values of the graph must be numbers
 
     Return
     ---------------------
     grad: dict
-    the updated gradient of the function, entries are labelled by variables
-    """
-    grad=self.grad
-    def _in(node, sofar):
-      """
-      inner function called recursively to go through the tree
-
-      Attributes:
-      -------------------
-      node: Node
-        Node visited
-      sofar: float
-        value of the partial derivative computed so far
-
-      Output
-      -----------------
-      None
-      """
-      par1=node.parent1
-      par2=node.parent2
-      der=node.der
-      # print('-in is running')
-      if par2!=None:
-        try:
-          grad[par1]+=sofar*der["1"]
-        except:
-          grad[par1]=sofar*der["1"]
-        _in(par1,sofar*der["1"])
-        try:
-          grad[par2]+=sofar*der["2"]
-        except:
-          grad[par2]=sofar*der["2"]
-        _in(par2,sofar*der["2"])
-
-      if par1!=None and par2==None:
-        try:
-          grad[par1]+=sofar*der["1"]
-        except:
-          grad[par1]=sofar*der["1"]
-        _in(par1,sofar*der["1"])
+    the gradient of the function, entries are labelled by variables, also stored as the grad of the Node
+    or np.array of shape (len(variables),) when variables are given
 
-    _in(self, 1)
-    return grad
+    Examples
+    ========
+    >>> x=Node.variables([1, 2])
+    >>> y=x[0]*x[1]+Node.exp(x[0]*x[1])
+    >>> y.reverse(variables=x)
+    array([16.7781122,  8.3890561])
+    """
+    if variables is not None:
+      jacobian, order=_jacobian_array([self], variables)
+      if not retain_graph:
+        _release(order)
+      return jacobian[0]
+    order=_toposort([self])
+    # adjoints of every node, propagated from children to parents in reverse topological order
+    adjoint={self: 1}
+    for node in reversed(order):
+      sofar=adjoint[node]
+      if node.parent1 is not None:
+        adjoint[node.parent1]=adjoint.get(node.parent1, 0)+sofar*node.der1
+      if node.parent2 is not None:
+        adjoint[node.parent2]=adjoint.get(node.parent2, 0)+sofar*node.der2
+
+    del adjoint[self]
+    if not retain_graph:
+      adjoint={node: value for node, value in adjoint.items() if _is_variable(node)}
+      _release(order)
+    self._grad=adjoint
+    return adjoint
 
   def getgrad(self,var):
     """
@@ -1261,6 +1867,24 @@ class Node:
     except:
       raise KeyError('this is not a valid variable')
 
+  def stats(self):
+    """
+    Size and shape of the graph leading to the Node, to size jobs and catch graphs growing faster than expected
+
+    Returns
+    ---------------------
+    dict with the number of nodes, edges, leaves, variables and constants, the maximum depth, the fan-out
+    distribution, the number of shared Nodes and an estimate of the memory footprint in bytes
+
+    Examples
+    ========
+    >>> x1, x2=Node(1), Node(2)
+    >>> y=x1*x2+Node.exp(x1*x2)
+    >>> y.stats()
+    {'nodes': 6, 'edges': 7, 'leaves': 2, 'variables': 2, 'constants': 0, 'max_depth': 3, 'fan_out': {0: 1, 1: 3, 2: 2}, 'shared': 2, 'memory_bytes': 904}
+    """
+    return _graph_stats([self])
+
 
 
 class NodeVec(Node):
@@ -1281,7 +1905,13 @@ class NodeVec(Node):
 
   getgrad
     get entry in Jacobian of function, labeled by the entry of the function and the variable against which it is derived
+
+  stats
+    size and shape of the graph shared by the entries, see Node.stats
   """
+  # jacobian and the variables of its columns are stored as one tuple, so that they are replaced together
+  __slots__=('vals', '_result')
+
   def __init__(self,vals):
     """
     Constructs the necessary attributes of the class
@@ -1292,16 +1922,52 @@ class NodeVec(Node):
       entries of list are entries of the function
     """
     self.vals=vals
-    self.jacobian={}
+    self._result=({}, None)
+
+  @property
+  def jacobian(self):
+    """
+    jacobian of the function computed by the last call to reverse
+    """
+    return self._result[0]
+
+  @jacobian.setter
+  def jacobian(self, jacobian):
+    self._result=(jacobian, None)
 
-  def reverse(self):
+  def reverse(self, retain_graph=True, variables=None):
     """
     Computes reverse pass of reverse mode of automatic differentiation for each entry in vector function
-    Updates the attribute jacobian of the class
+    Updates the attribute jacobian of the class, together with the variables of its columns, by a single
+    assignment: when several threads call it on the same NodeVec, jacobian holds the result of whichever
+    call finished last, and the grad of each entry follows Node.reverse
+
+    Attributes
+    -----------------
+    retain_graph: bool
+      with False, the graph shared by the entries is released once every entry has been swept, see Node.reverse
+    variables: list of Node
+      if given, jacobian is filled as an np.array of shape (number of entries, len(variables)) and returned,
+      the graph shared by the entries is indexed once for all the sweeps, see Node.reverse. Each sweep runs
+      over every Node before its entry, so for many entries each depending on few Nodes the default dicts
+      or sparse_jacobian are faster
     """
+    if variables is not None:
+      variables=list(variables)
+      jacobian, order=_jacobian_array(self.vals, variables)
+      if not retain_graph:
+        _release(order)
+      self._result=(jacobian, variables)
+      return jacobian
+    jacobian={}
     for i,x in enumerate(self.vals):
-      self.vals[i].reverse()
-      self.jacobian[i]=self.vals[i].grad
+      jacobian[i]=self.vals[i].reverse()
+    if not retain_graph:
+      for i, grad in jacobian.items():
+        jacobian[i]={node: value for node, value in grad.items() if _is_variable(node)}
+        self.vals[i].grad=jacobian[i]
+      _release(_toposort([x for x in self.vals if isinstance(x, Node)]))
+    self._result=(jacobian, None)
 
   def getgrad(self, idx, var):
     """
@@ -1320,15 +1986,28 @@ class NodeVec(Node):
     value of the entry of interest in the Jacobian 
 
     """
-    if idx>0 and idx<=len(self.vals):
+    jacobian, variables=self._result
+    if idx>0 and idx<=len(self.vals) and isinstance(jacobian, np.ndarray):
+      for j, v in enumerate(variables):
+        if v is var:
+          return jacobian[idx-1, j]
+      raise KeyError('the given variable is not valid')
+    elif idx>0 and idx<=len(self.vals):
       try: 
-        dic=self.jacobian[idx-1]
+        dic=jacobian[idx-1]
         return dic[var]
       except:
         raise KeyError('the given variable is not valid')
     else:
       raise KeyError('the index is out of range')
 
+  def stats(self):
+    """
+    Size and shape of the graph leading to the entries of the function, Nodes shared by several entries
+    are counted once, see Node.stats
+    """
+    return _graph_stats([x for x in self.vals if isinstance(x, Node)])
+
 
 '''
 # Presentation Tests
@@ -0,0 +1,121 @@
+import math
+
+import numpy as np
+
+from .autodiff import Node, _adjoints
+from .drivers import _as_objects, _outputs
+
+__all__ = ['checkpoint_schedule', 'checkpointed_gradient']
+
+
+def checkpoint_schedule(nsteps, checkpoints=None):
+    """
+    Steps at which the state of an iterative computation is stored during the forward pass
+
+    The checkpoints are evenly spaced. With c checkpoints, the forward pass keeps c states, the reverse pass
+    records at most ceil(nsteps/c) steps at a time and every step is computed twice. The default
+    c = ceil(sqrt(nsteps)) balances both, so memory grows like sqrt(nsteps) instead of nsteps
+
+    Attributes
+    ----------------------------------
+    nsteps: int
+      number of steps of the computation
+    checkpoints: int
+      number of stored states, between 1 (recompute everything from the start) and nsteps (store every step)
+
+    Returns
+    ---------------------------------
+      list of int, increasing steps starting with 0
+
+    Examples
+    ========
+    >>> checkpoint_schedule(10)
+    [0, 2, 5, 7]
+    """
+    if checkpoints is None:
+        checkpoints = max(math.ceil(math.sqrt(nsteps)), 1)
+    if checkpoints < 1:
+        raise ValueError('please use at least one checkpoint')
+    checkpoints = min(checkpoints, max(nsteps, 1))
+    return sorted({k * nsteps // checkpoints for k in range(checkpoints)})
+
+
+def _record(step, state, start, stop):
+    """
+    Node graph of steps start to stop-1 from a stored state, returns the input Nodes and the final entries
+    """
+    inputs = [Node(v) for v in state]
+    x = _as_objects(inputs)
+    for k in range(start, stop):
+        x = _as_objects(_outputs(step(x, k)))
+        if len(x) != len(inputs):
+            raise ValueError('step %d returned %d entries, expected %d' % (k, len(x), len(inputs)))
+    return inputs, x
+
+
+def checkpointed_gradient(step, x0, nsteps, loss=None, checkpoints=None):
+    """
+    Gradient of loss(x_N) with respect to x_0 for the iteration x_{k+1} = step(x_k, k), k < N, in reverse mode
+    with checkpointing: only the states of checkpoint_schedule are kept during the forward pass, and the
+    reverse pass recomputes and records one segment of steps at a time, from the last one to the first,
+    so that the whole graph never has to be held in memory
+
+    Parameters that the steps depend on can be differentiated by carrying them unchanged in the state
+
+    Attributes
+    ----------------------------------
+    step: callable
+      step(x, k) takes the 1-D state and the step number and returns the next state, with the same length.
+      It is evaluated on floats and on arrays of Node, so elementary functions should be called through NumPy
+    x0: array-like of shape (n,)
+      initial state
+    nsteps: int
+      number of steps N
+    loss: callable
+      scalar function of the final state, by default the final state must be a single number
+    checkpoints: int
+      number of stored states, see checkpoint_schedule
+
+    Returns
+    ---------------------------------
+      np.array of shape (n,)
+
+    Examples
+    ========
+    >>> step=lambda x, k: [x[0]+0.1*x[1], x[1]-0.1*np.sin(x[0])]
+    >>> checkpointed_gradient(step, [1.0, 0.0], 100, loss=lambda x: x[0]**2)
+    array([ 0.49692551, -1.96513471])
+    """
+    state = np.asarray(x0, dtype=float).ravel()
+    n = len(state)
+    starts = checkpoint_schedule(nsteps, checkpoints)
+    stored = {0: state}
+    # set lookup, the schedule is a list of about sqrt(N) steps
+    stored_steps = set(starts)
+    for k in range(nsteps):
+        if k in stored_steps:
+            stored[k] = state
+        state = np.array(_outputs(step(state, k)), dtype=float)
+        if len(state) != n:
+            raise ValueError('step %d returned %d entries, expected %d' % (k, len(state), n))
+
+    if loss is None:
+        if len(state) != 1:
+            raise ValueError('the final state has %d entries, please give a scalar loss' % len(state))
+        cotangent = [1.0]
+    else:
+        inputs = [Node(v) for v in state]
+        y = loss(_as_objects(inputs))
+        adjoint = _adjoints({y: 1.0}) if isinstance(y, Node) else {}
+        cotangent = [adjoint.get(v, 0.0) for v in inputs]
+
+    stops = starts[1:] + [nsteps]
+    for start, stop in zip(reversed(starts), reversed(stops)):
+        inputs, x = _record(step, stored.pop(start), start, stop)
+        seeds = {}
+        for v, c in zip(x, cotangent):
+            if isinstance(v, Node):
+                seeds[v] = seeds.get(v, 0.0) + c
+        adjoint = _adjoints(seeds)
+        cotangent = [adjoint.get(v, 0.0) for v in inputs]
+    return np.array(cotangent, dtype=float)
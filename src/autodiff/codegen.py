@@ -0,0 +1,380 @@
+import hashlib
+import importlib.util
+import math
+import os
+import types
+
+import numpy as np
+
+from .plan import Plan
+from .tape import OPNAMES
+
+__all__ = ['generate_source', 'graph_hash', 'function_key', 'CompiledFunction', 'compile_plan', 'compile_function']
+
+# bump when the generated source changes, so that stale files in the cache are not reused
+_CODEGEN_VERSION = 2
+
+# expression of the value of each operation, from the names of its parents a and b
+_VALUE = {
+    'add': '{a} + {b}', 'sub': '{a} - {b}', 'mul': '{a} * {b}', 'div': '{a} / {b}', 'pow': '{a} ** {b}',
+    'neg': '-{a}', 'exp': 'np.exp({a})', 'log': 'np.log({a})', 'sin': 'np.sin({a})', 'cos': 'np.cos({a})',
+    'tan': 'np.tan({a})', 'arcsin': 'np.arcsin({a})', 'arccos': 'np.arccos({a})', 'arctan': 'np.arctan({a})',
+    'sinh': 'np.sinh({a})', 'cosh': 'np.cosh({a})', 'tanh': 'np.tanh({a})', 'logistic': '1 / (1 + np.exp(-{a}))',
+    'sqrt': 'np.sqrt({a})',
+}
+
+# expressions of the local partial derivatives with respect to the parents, v is the value of the operation,
+# None means that the partial derivative is 1
+_PARTIALS = {
+    'add': (None, None), 'sub': (None, '-1'), 'mul': ('{b}', '{a}'), 'div': ('1 / {b}', '-{v} / {b}'),
+    'pow': ('{b} * {a} ** ({b} - 1)', '{v} * np.log({a})'), 'neg': ('-1', None), 'exp': ('{v}', None),
+    'log': ('1 / {a}', None), 'sin': ('np.cos({a})', None), 'cos': ('-np.sin({a})', None),
+    'tan': ('1 / np.cos({a}) ** 2', None), 'arcsin': ('1 / np.sqrt(1 - {a} ** 2)', None),
+    'arccos': ('-1 / np.sqrt(1 - {a} ** 2)', None), 'arctan': ('1 / (1 + {a} ** 2)', None),
+    'sinh': ('np.cosh({a})', None), 'cosh': ('np.sinh({a})', None), 'tanh': ('1 - {v} ** 2', None),
+    'logistic': ('{v} * (1 - {v})', None), 'sqrt': ('0.5 / {v}', None),
+}
+
+
+def generate_source(plan):
+    """
+    Generates straight-line Python/NumPy source computing the values and the Jacobian of a traced function
+    Every entry of the plan becomes a local variable, constants are inlined as literals and
+    the adjoint sweep is unrolled, so no Node, dict or dispatch is involved at run time
+
+    Attributes
+    ----------------------------------
+    plan: Plan
+      traced function
+
+    Returns
+    ---------------------------------
+      str, source of a module defining forward(x) -> list of values
+      and jacobian(x) -> (list of values, list of rows of the Jacobian)
+    """
+    tape = plan.tape
+    size = len(plan)
+    ops = [OPNAMES[o] for o in tape.op[:size].tolist()]
+    parents = list(zip(tape.parent1[:size].tolist(), tape.parent2[:size].tolist()))
+    vals = tape.val[:size].tolist()
+
+    def name(i):
+        if ops[i] != 'const':
+            return 'v%d' % i
+        # the repr of inf and nan is not a Python literal
+        return '(%r)' % vals[i] if math.isfinite(vals[i]) else "float('%r')" % vals[i]
+
+    forward = []
+    var = 0
+    for i, op in enumerate(ops):
+        if op == 'var':
+            forward.append('    v%d = x[%d]' % (i, var))
+            var += 1
+        elif op != 'const':
+            p1, p2 = parents[i]
+            forward.append('    v%d = %s' % (i, _VALUE[op].format(a=name(p1), b=name(p2) if p2 >= 0 else None)))
+    values = '[%s]' % ', '.join(name(i) for i in plan.outputs)
+
+    lines = ['# generated by autodiff.codegen, do not edit', 'import numpy as np', '', '',
+             'def forward(x):'] + forward + ['    return %s' % values, '', '', 'def jacobian(x):'] + forward
+    rows = []
+    for out in plan.outputs:
+        # adjoints are created when first reached, so only the ancestors of the output take part in its sweep
+        assigned = set()
+        if ops[out] != 'const':
+            lines.append('    g%d = 1.0' % out)
+            assigned.add(out)
+        for i in range(out, -1, -1):
+            if i not in assigned or ops[i] in ('var', 'const'):
+                continue
+            p1, p2 = parents[i]
+            for p, partial in zip((p1, p2), _PARTIALS[ops[i]]):
+                if p < 0 or ops[p] == 'const':
+                    continue
+                term = 'g%d' % i
+                if partial is not None:
+                    term += ' * (%s)' % partial.format(a=name(p1), b=name(p2) if p2 >= 0 else None, v=name(i))
+                if p in assigned:
+                    lines.append('    g%d = g%d + %s' % (p, p, term))
+                else:
+                    lines.append('    g%d = %s' % (p, term))
+                    assigned.add(p)
+        lines.append('    row%d = [%s]' % (len(rows), ', '.join('g%d' % j if j in assigned else '0.0' for j in range(plan.n))))
+        rows.append('row%d' % len(rows))
+    lines.append('    return %s, [%s]' % (values, ', '.join(rows)))
+    return '\n'.join(lines) + '\n'
+
+
+def graph_hash(plan):
+    """
+    Hash of the structure of a plan: operations, parents, constants and outputs
+    """
+    tape = plan.tape
+    size = len(plan)
+    h = hashlib.sha256(('%d %d %r' % (_CODEGEN_VERSION, plan.n, plan.outputs)).encode())
+    for column in (tape.op, tape.parent1, tape.parent2):
+        h.update(np.ascontiguousarray(column[:size]).tobytes())
+    h.update(np.where(tape.op[:size] == OPNAMES.index('const'), tape.val[:size], 0.0).tobytes())
+    return h.hexdigest()
+
+
+def _code_fingerprint(code, h):
+    """
+    feeds the parts of a code object that define its behaviour to the hash h, nested code objects included
+    """
+    h.update(code.co_code)
+    h.update(repr((code.co_names, code.co_varnames, code.co_freevars)).encode())
+    for const in code.co_consts:
+        if hasattr(const, 'co_code'):
+            _code_fingerprint(const, h)
+        else:
+            h.update(repr(const).encode())
+
+
+def _names(code):
+    """
+    names read by a code object and the code objects nested in it
+    """
+    names = set(code.co_names)
+    for const in code.co_consts:
+        if hasattr(const, 'co_code'):
+            names |= _names(const)
+    return names
+
+
+def _value_fingerprint(value, h, seen):
+    """
+    feeds value to the hash h so that two values with the same fingerprint behave the same, returns False
+    when value cannot be fingerprinted exactly, e.g. an arbitrary object whose repr does not identify it
+    """
+    if value is None or isinstance(value, (bool, int, float, complex, str, bytes)):
+        # repr of these types round-trips exactly
+        h.update(('%s %r;' % (type(value).__name__, value)).encode())
+        return True
+    if isinstance(value, (np.ndarray, np.generic)):
+        if value.dtype.hasobject:
+            return False
+        # repr of large arrays is truncated, the raw bytes are not
+        h.update(('array %s %r;' % (value.dtype.str, np.shape(value))).encode())
+        h.update(np.ascontiguousarray(value).tobytes())
+        return True
+    if isinstance(value, types.ModuleType):
+        h.update(('module %s;' % value.__name__).encode())
+        return True
+    if isinstance(value, (types.BuiltinFunctionType, np.ufunc, type)):
+        h.update(('builtin %s %s;' % (getattr(value, '__module__', None), getattr(value, '__qualname__', value.__name__))).encode())
+        return True
+    if isinstance(value, (tuple, list, frozenset, set, dict)):
+        if id(value) in seen:
+            return True
+        seen.add(id(value))
+        items = sorted(value, key=repr) if isinstance(value, (set, frozenset)) else value
+        if isinstance(value, dict):
+            items = [part for item in value.items() for part in item]
+        h.update(('%s %d;' % (type(value).__name__, len(items))).encode())
+        return all(_value_fingerprint(item, h, seen) for item in items)
+    if isinstance(value, types.FunctionType):
+        return _function_fingerprint(value, h, seen)
+    return False
+
+
+def _function_fingerprint(f, h, seen):
+    """
+    feeds the code of f, its default arguments, the values of its closure and the globals it reads to the
+    hash h, functions among them included, returns False when one of them cannot be fingerprinted exactly
+    """
+    if id(f) in seen:
+        return True
+    seen.add(id(f))
+    h.update(('function %s %s;' % (getattr(f, '__module__', ''), f.__qualname__)).encode())
+    _code_fingerprint(f.__code__, h)
+    if not _value_fingerprint(f.__defaults__, h, seen) or not _value_fingerprint(f.__kwdefaults__, h, seen):
+        return False
+    for cell in f.__closure__ or ():
+        try:
+            contents = cell.cell_contents
+        except ValueError:
+            # cell not assigned yet
+            contents = None
+        if not _value_fingerprint(contents, h, seen):
+            return False
+    for name in sorted(_names(f.__code__)):
+        if name in f.__globals__:
+            h.update(('global %s;' % name).encode())
+            if not _value_fingerprint(f.__globals__[name], h, seen):
+                return False
+    return True
+
+
+def function_key(f, shape):
+    """
+    Key identifying a function and an input shape across processes, used to find the generated
+    source without tracing. It covers the code of f, its default arguments, the values captured by its
+    closure and the globals it reads, recursively for the functions among them
+
+    Returns
+    ---------------------------------
+      str, hexadecimal digest, or None when a value f depends on cannot be fingerprinted exactly
+      (an object other than numbers, strings, arrays, containers of them, modules and functions)
+    """
+    h = hashlib.sha256(('%d %r;' % (_CODEGEN_VERSION, tuple(shape))).encode())
+    if not isinstance(f, types.FunctionType) or not _function_fingerprint(f, h, set()):
+        return None
+    return h.hexdigest()
+
+
+def _cache_dir(cache_dir):
+    """
+    directory of the generated sources: cache_dir, $AUTODIFF_CACHE_DIR or ~/.cache/autodiff
+    """
+    if cache_dir is None:
+        cache_dir = os.environ.get('AUTODIFF_CACHE_DIR', os.path.join(os.path.expanduser('~'), '.cache', 'autodiff'))
+    os.makedirs(cache_dir, exist_ok=True)
+    return cache_dir
+
+
+def _write(path, text):
+    """
+    writes text to path atomically, so that concurrent processes never read a partial file
+    """
+    tmp = '%s.%d.tmp' % (path, os.getpid())
+    with open(tmp, 'w') as fh:
+        fh.write(text)
+    os.replace(tmp, path)
+
+
+class CompiledFunction:
+    '''
+    Function and Jacobian of a traced function, executed by generated straight-line code
+
+    Attributes
+    ------------------
+    key: str
+      hash of the graph structure the code was generated from
+    path: str
+      generated source file
+    n: int
+      number of inputs
+
+    Methods
+    -----------------
+    __call__, gradient, jacobian
+      values, gradient and Jacobian at x
+    '''
+    def __init__(self, key, path, n):
+        """
+        Loads the generated module at path, Python reuses its cached bytecode when it exists
+        """
+        spec = importlib.util.spec_from_file_location('autodiff_generated_%s' % key, path)
+        module = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(module)
+        self.key = key
+        self.path = path
+        self.n = n
+        self._forward = module.forward
+        self._jacobian = module.jacobian
+
+    @property
+    def source(self):
+        """
+        the generated source code
+        """
+        with open(self.path) as fh:
+            return fh.read()
+
+    def _check(self, x):
+        if len(x) != self.n:
+            raise ValueError('expected %d input values, got %d' % (self.n, len(x)))
+        return x
+
+    def __call__(self, x):
+        """
+        values of the outputs at x, np.array of shape (m,)
+        """
+        return np.array(self._forward(self._check(x)))
+
+    def jacobian(self, x):
+        """
+        Jacobian at x, np.array of shape (m, n)
+        """
+        return np.array(self._jacobian(self._check(x))[1], dtype=float).reshape(-1, self.n)
+
+    def gradient(self, x):
+        """
+        gradient of a scalar function at x, np.array of shape (n,)
+        """
+        jac = self.jacobian(x)
+        if jac.shape[0] != 1:
+            raise ValueError('gradient requires a scalar function, use jacobian for vector functions')
+        return jac[0]
+
+
+def compile_plan(plan, cache_dir=None):
+    """
+    Generates, caches on disk and loads the code of a plan
+
+    Attributes
+    ----------------------------------
+    plan: Plan
+      traced function
+    cache_dir: str
+      directory of the generated sources, defaults to $AUTODIFF_CACHE_DIR or ~/.cache/autodiff
+
+    Returns
+    ---------------------------------
+      CompiledFunction
+    """
+    cache_dir = _cache_dir(cache_dir)
+    key = graph_hash(plan)
+    path = os.path.join(cache_dir, 'plan_%s.py' % key)
+    if not os.path.exists(path):
+        _write(path, generate_source(plan))
+    return CompiledFunction(key, path, plan.n)
+
+
+def compile_function(f, x, cache_dir=None, key=None):
+    """
+    Traces f at x and compiles it to straight-line code. A warm cache skips both tracing and code generation:
+    the function key of f (see function_key) points to the graph hash of its generated source
+
+    Since the plan replays the recorded operations, control flow of f must not depend on the input values.
+    When f depends on a value function_key cannot fingerprint, the function cache is skipped and f is traced
+    on every call (the generated source is still reused), unless key is passed explicitly
+
+    Attributes
+    ----------------------------------
+    f: callable
+      function of a 1-D array, see Plan.from_function
+    x: array-like of shape (n,)
+      point at which f is traced on a cold cache
+    cache_dir: str
+      directory of the generated sources, defaults to $AUTODIFF_CACHE_DIR or ~/.cache/autodiff
+    key: str
+      identifies f and the shape of its input in the cache, defaults to function_key(f, np.shape(x)).
+      It must change whenever the behaviour of f does
+
+    Returns
+    ---------------------------------
+      CompiledFunction
+
+    Examples
+    ========
+    >>> g=compile_function(lambda x: x[0]*x[1]+np.exp(x[0]*x[1]), [1, 2])
+    >>> print(g.gradient([1, 2]))
+    [16.7781122   8.3890561]
+    """
+    cache_dir = _cache_dir(cache_dir)
+    if key is None:
+        key = function_key(f, np.shape(x))
+    if key is None:
+        return compile_plan(Plan.from_function(f, x), cache_dir)
+    index = os.path.join(cache_dir, 'function_%s.key' % key)
+    if os.path.exists(index):
+        with open(index) as fh:
+            graph, n = fh.read().split()
+        path = os.path.join(cache_dir, 'plan_%s.py' % graph)
+        if os.path.exists(path):
+            return CompiledFunction(graph, path, int(n))
+    compiled = compile_plan(Plan.from_function(f, x), cache_dir)
+    _write(index, '%s %d' % (compiled.key, compiled.n))
+    return compiled
@@ -0,0 +1,296 @@
+import numpy as np
+
+from .autodiff import DualNum, Node, NodeVec, _adjoints, _index, _is_variable
+from .tape import _sweep
+
+__all__ = ['choose_mode', 'jacobian', 'gradient', 'jvp', 'hvp', 'vjp']
+
+
+def _as_objects(values):
+    """
+    1-D object array holding the entries of values, so that the callable can index and slice its input
+    like a NumPy vector
+    """
+    out = np.empty(len(values), dtype=object)
+    for i, v in enumerate(values):
+        out[i] = v
+    return out
+
+
+def _outputs(y):
+    """
+    entries of the output of a callable as a flat list, whether it returned a scalar or a sequence
+    """
+    if isinstance(y, (DualNum, Node)) or np.ndim(y) == 0:
+        return [y]
+    return list(np.ravel(np.asarray(y, dtype=object)))
+
+
+def _forward(f, x):
+    """
+    Jacobian of f at x from one multi-directional forward pass (DualNum seeded with the identity)
+    """
+    n = len(x)
+    outs = _outputs(f(_as_objects(DualNum.variables(x))))
+    jac = np.zeros((len(outs), n))
+    for i, y in enumerate(outs):
+        if isinstance(y, DualNum):
+            jac[i] = y.der
+    return jac
+
+
+def _reverse(f, x):
+    """
+    Jacobian of f at x from one Node graph and one reverse pass per output
+    """
+    xs = [Node(v) for v in x]
+    outs = _outputs(f(_as_objects(xs)))
+    jac = np.zeros((len(outs), len(x)))
+    for i, y in enumerate(outs):
+        if not isinstance(y, Node):
+            continue
+        grad = y.reverse()
+        for j, v in enumerate(xs):
+            jac[i, j] = 1.0 if v is y else grad.get(v, 0.0)
+    return jac
+
+
+def choose_mode(n, m):
+    """
+    Picks the cheaper mode for a function with n inputs and m outputs
+
+    Forward mode carries n tangents through every operation, reverse mode records the graph once and
+    sweeps it once per output, so forward mode wins when n <= m
+
+    Returns
+    ---------------------------------
+      'forward' or 'reverse'
+    """
+    return 'forward' if n <= m else 'reverse'
+
+
+def jacobian(f, x, mode='auto'):
+    """
+    Jacobian of a vector function at x
+
+    Attributes
+    ----------------------------------
+    f: callable
+      takes a 1-D array of n inputs and returns a number or a sequence of m numbers. It is evaluated on
+      arrays of DualNum or Node, so elementary functions should be called through NumPy (np.exp, np.sin, ...),
+      which dispatches to DualNum and Node
+    x: array-like of shape (n,)
+      point at which the Jacobian is evaluated
+    mode: str
+      'forward', 'reverse', or 'auto' to pick the cheaper one from the input and output dimensions.
+      In auto mode f is first evaluated on plain floats to find m
+
+    Returns
+    ---------------------------------
+      np.array of shape (m, n)
+
+    Examples
+    ========
+    >>> jacobian(lambda x: [x[0]*x[1]+np.exp(x[0]*x[1]), x[0]+x[1]**2], [1, 2])
+    array([[16.7781122,  8.3890561],
+           [ 1.       ,  4.       ]])
+    """
+    x = np.asarray(x, dtype=float).ravel()
+    if mode == 'auto':
+        mode = choose_mode(len(x), len(_outputs(f(x.copy()))))
+    if mode == 'forward':
+        return _forward(f, x)
+    if mode == 'reverse':
+        return _reverse(f, x)
+    raise ValueError("mode must be 'auto', 'forward' or 'reverse'")
+
+
+def gradient(f, x, mode='auto'):
+    """
+    Gradient of a scalar function at x
+
+    Attributes
+    ----------------------------------
+    f: callable
+      takes a 1-D array of n inputs and returns a number, see jacobian
+    x: array-like of shape (n,)
+      point at which the gradient is evaluated
+    mode: str
+      'forward', 'reverse', or 'auto', in which case reverse mode is used unless f has a single input
+
+    Returns
+    ---------------------------------
+      np.array of shape (n,)
+
+    Examples
+    ========
+    >>> gradient(lambda x: x[0]*x[1]+np.exp(x[0]*x[1]), [1, 2])
+    array([16.7781122,  8.3890561])
+    """
+    x = np.asarray(x, dtype=float).ravel()
+    if mode == 'auto':
+        mode = choose_mode(len(x), 1)
+    jac = jacobian(f, x, mode)
+    if jac.shape[0] != 1:
+        raise ValueError('gradient requires a scalar function, use jacobian for vector functions')
+    return jac[0]
+
+
+def jvp(f, x, v, out=None):
+    """
+    Jacobian-vector product of a vector function at x in forward mode: the inputs are seeded with the
+    entries of v, so a single pass of f returns its value together with its derivative along v, without
+    forming the Jacobian. A block of k directions is carried through the same pass
+
+    Attributes
+    ----------------------------------
+    f: callable
+      takes a 1-D array of n inputs and returns a number or a sequence of m numbers, see jacobian
+    x: array-like of shape (n,)
+      point at which the Jacobian is evaluated
+    v: array-like of shape (n,) or (n, k)
+      direction, or k directions
+    out: tuple of np.array
+      arrays of shape (m,) and (m,) or (m, k) that receive the value and the product, so that iterative
+      solvers calling jvp at every step do not allocate new results
+
+    Returns
+    ---------------------------------
+    value: np.array of shape (m,)
+    jv: np.array of shape (m,) or (m, k)
+
+    Examples
+    ========
+    >>> jvp(lambda x: [x[0]*x[1]+np.exp(x[0]*x[1]), x[0]+x[1]**2], [1, 2], [1, 0])
+    (array([9.3890561, 5.       ]), array([16.7781122,  1.       ]))
+    """
+    x = np.asarray(x, dtype=float).ravel()
+    v = np.asarray(v, dtype=float)
+    if len(v) != len(x):
+        raise ValueError('expected a direction with %d entries, got %d' % (len(x), len(v)))
+    if v.ndim == 1:
+        # scalar tangents, the pass does plain float arithmetic
+        xs = [DualNum(val, der) for val, der in zip(x.tolist(), v.tolist())]
+    else:
+        xs = DualNum.variables(x, v.reshape(len(x), -1))
+    outs = _outputs(f(_as_objects(xs)))
+    if out is None:
+        value, jv = np.empty(len(outs)), np.empty((len(outs),) + v.shape[1:])
+    else:
+        value, jv = out
+        if value.shape != (len(outs),) or jv.shape != (len(outs),) + v.shape[1:]:
+            raise ValueError('expected out arrays of shapes %s and %s' % ((len(outs),), (len(outs),) + v.shape[1:]))
+    for i, y in enumerate(outs):
+        if isinstance(y, DualNum):
+            value[i] = y.val
+            jv[i] = y.der
+        else:
+            value[i] = y
+            jv[i] = 0.0
+    return value, jv
+
+
+def hvp(f, x, v):
+    """
+    Hessian-vector product of a scalar function at x, by forward-over-reverse: the Node graph of f is built
+    on DualNum values seeded with v, so its local partials are DualNum and a single reverse sweep returns
+    the gradient together with its directional derivative along v, i.e. H.v, at a small multiple of the
+    cost of f
+
+    Attributes
+    ----------------------------------
+    f: callable
+      takes a 1-D array of n inputs and returns a number, see jacobian
+    x: array-like of shape (n,)
+      point at which the Hessian is evaluated
+    v: array-like of shape (n,) or (n, k)
+      direction, or k directions carried through the same sweep
+
+    Returns
+    ---------------------------------
+      np.array of the shape of v
+
+    Examples
+    ========
+    >>> hvp(lambda x: x[0]**2*x[1]+np.exp(x[1]), [1, 2], [1, 0])
+    array([4., 2.])
+    """
+    x = np.asarray(x, dtype=float).ravel()
+    v = np.asarray(v, dtype=float)
+    if len(v) != len(x):
+        raise ValueError('expected a direction with %d entries, got %d' % (len(x), len(v)))
+    xs = [Node(d) for d in DualNum.variables(x, v.reshape(len(x), -1))]
+    y = f(_as_objects(xs))
+    if not isinstance(y, (DualNum, Node)) and np.ndim(y) != 0:
+        raise ValueError('hvp requires a scalar function')
+    hv = np.zeros((len(x), v.size // len(x)))
+    if isinstance(y, Node):
+        adjoint = _adjoints({y: 1.0})
+        for i, node in enumerate(xs):
+            # partials that do not depend on the inputs leave plain numbers as adjoints
+            hv[i] = getattr(adjoint.get(node, 0.0), 'der', 0.0)
+    return hv.reshape(v.shape)
+
+
+def vjp(outputs, cotangent, variables=None):
+    """
+    Vector-Jacobian product of a Node graph: every output is seeded with its weight in cotangent and the
+    adjoints of all the outputs are accumulated in a single reverse sweep over the graph they share,
+    instead of one sweep per output. With k cotangents, every adjoint is a vector of k weights, so
+    vjp(outputs, np.eye(m), xs) is the transposed Jacobian in one sweep. Each edge then costs one NumPy
+    operation on k weights, which pays off for many outputs sharing their graph, while a few outputs are
+    faster swept one by one
+
+    Attributes
+    ----------------------------------
+    outputs: Node, list of Node or NodeVec
+      m outputs of the function, entries that are not Nodes are constants. Their values must be numbers
+    cotangent: number or array-like of shape (m,) or (m, k)
+      weight of each output, or k vectors of weights, a single output takes a number
+    variables: list of Node
+      Nodes to return the adjoints of, e.g. created by Node.variables
+
+    Returns
+    ---------------------------------
+      np.array of shape (n,) or (n, k) holding the adjoints of the n variables when variables are given,
+      otherwise a dict of the adjoints of the variables of the graph, labelled by Node
+
+    Examples
+    ========
+    >>> x=Node.variables([1, 2])
+    >>> vjp([x[0]*x[1], x[0]+x[1]**2], [1, 0.5], x)
+    array([2.5, 3. ])
+    """
+    if isinstance(outputs, NodeVec):
+        outputs = outputs.vals
+    outputs = _outputs(outputs)
+    cotangent = np.atleast_1d(np.asarray(cotangent, dtype=float))
+    if len(cotangent) != len(outputs):
+        raise ValueError('expected a cotangent with %d entries, got %d' % (len(outputs), len(cotangent)))
+    order, position, parent1, parent2, der1, der2 = _index([y for y in outputs if isinstance(y, Node)])
+    if cotangent.ndim == 1:
+        adjoint = [0.0] * len(order)
+        for y, w in zip(outputs, cotangent.tolist()):
+            if isinstance(y, Node):
+                adjoint[position[y]] += w
+        _sweep(adjoint, parent1, parent2, der1, der2)
+    else:
+        # one row of k adjoints per Node, the rows of the leaves are never read back into the sweep
+        adjoint = np.zeros((len(order), cotangent.shape[1]))
+        for y, w in zip(outputs, cotangent):
+            if isinstance(y, Node):
+                adjoint[position[y]] += w
+        for i in range(len(order) - 1, -1, -1):
+            if parent1[i] < 0:
+                continue
+            a = adjoint[i]
+            adjoint[parent1[i]] += der1[i] * a
+            if parent2[i] >= 0:
+                adjoint[parent2[i]] += der2[i] * a
+    if variables is None:
+        return {node: adjoint[i] for i, node in enumerate(order) if _is_variable(node)}
+    result = np.zeros((len(variables),) + cotangent.shape[1:])
+    for j, v in enumerate(variables):
+        if v in position:
+            result[j] = adjoint[position[v]]
+    return result
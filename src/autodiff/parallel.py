@@ -0,0 +1,128 @@
+import math
+import os
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+import numpy as np
+
+from .autodiff import DualNum
+from .drivers import _as_objects, _outputs, gradient
+
+__all__ = ['parallel_jacobian', 'grad_map']
+
+
+def _forward_block(f, x, cols):
+    """
+    columns cols of the Jacobian of f at x, from one forward pass seeded with the matching unit vectors
+    """
+    seeds = np.zeros((len(x), len(cols)))
+    seeds[cols, np.arange(len(cols))] = 1
+    outs = _outputs(f(_as_objects(DualNum.variables(x, seeds))))
+    block = np.zeros((len(outs), len(cols)))
+    for i, y in enumerate(outs):
+        if isinstance(y, DualNum):
+            block[i] = y.der
+    return block
+
+
+def _gradient_rows(f, X):
+    """
+    gradients of f at the rows of X, one Node graph and one reverse pass per row
+    """
+    return np.array([gradient(f, x, mode='reverse') for x in X]).reshape(len(X), X.shape[1])
+
+
+def _blocks(n, workers, chunk_size):
+    """
+    consecutive ranges of chunk_size indices covering range(n), by default one per worker
+    """
+    if workers is None:
+        workers = os.cpu_count() or 1
+    if workers < 1:
+        raise ValueError('please use at least one worker')
+    if chunk_size is None:
+        chunk_size = max(math.ceil(n / workers), 1)
+    if chunk_size < 1:
+        raise ValueError('please use a positive chunk size')
+    return workers, [np.arange(start, min(start + chunk_size, n)) for start in range(0, n, chunk_size)]
+
+
+def parallel_jacobian(f, x, workers=None, chunk_size=None):
+    """
+    Jacobian of f at x in forward mode, with the seed directions split into blocks of columns that are
+    computed by a pool of processes and stitched together
+
+    f is sent to the worker processes, so it must be picklable, e.g. defined at the top level of a module.
+    Each block costs one pass of f carrying chunk_size tangents, so blocks should be large enough for the
+    pass to outweigh the cost of sending f, x and the block back
+
+    Attributes
+    ----------------------------------
+    f: callable
+      takes a 1-D array of n inputs and returns a number or a sequence of m numbers, see jacobian
+    x: array-like of shape (n,)
+      point at which the Jacobian is evaluated
+    workers: int
+      number of processes, defaults to the number of CPUs. With 1 the blocks are computed in this process
+    chunk_size: int
+      number of columns per block, defaults to n divided evenly among the workers
+
+    Returns
+    ---------------------------------
+      np.array of shape (m, n)
+    """
+    x = np.asarray(x, dtype=float).ravel()
+    workers, blocks = _blocks(len(x), workers, chunk_size)
+    if not blocks:
+        # no column to compute, f on plain floats gives the number of outputs
+        return np.zeros((len(_outputs(f(x.copy()))), 0))
+    if workers == 1 or len(blocks) == 1:
+        parts = [_forward_block(f, x, cols) for cols in blocks]
+    else:
+        with ProcessPoolExecutor(max_workers=min(workers, len(blocks))) as pool:
+            parts = list(pool.map(_forward_block, [f] * len(blocks), [x] * len(blocks), blocks))
+    return np.concatenate(parts, axis=1)
+
+
+def grad_map(f, X, workers=None, chunk_size=None, pool='process'):
+    """
+    Gradients of a scalar function at many independent points, in reverse mode. The points are split into
+    chunks of consecutive rows that are handed to a pool of workers, and the results are stitched in the
+    order of the rows whatever order the workers finish in
+
+    Attributes
+    ----------------------------------
+    f: callable
+      takes a 1-D array of n inputs and returns a number, see gradient. With a process pool it must be
+      picklable, e.g. defined at the top level of a module
+    X: array-like of shape (N, n)
+      one point per row
+    workers: int
+      number of workers, defaults to the number of CPUs. With 1 the chunks are computed in this thread
+    chunk_size: int
+      number of rows per chunk, defaults to N divided evenly among the workers
+    pool: str
+      'process' or 'thread'. Threads accept any callable and share memory, but they only run in parallel
+      for the time f spends outside of the interpreter
+
+    Returns
+    ---------------------------------
+      np.array of shape (N, n)
+
+    Examples
+    ========
+    >>> grad_map(rosenbrock, np.random.rand(10000, 4), chunk_size=500)
+    """
+    X = np.asarray(X, dtype=float)
+    if X.ndim != 2:
+        raise ValueError('expected an (N, n) array of points, got shape %s' % (X.shape,))
+    if pool not in ('process', 'thread'):
+        raise ValueError("pool must be 'process' or 'thread'")
+    workers, blocks = _blocks(len(X), workers, chunk_size)
+    chunks = [X[rows] for rows in blocks]
+    if workers == 1 or len(chunks) <= 1:
+        parts = [_gradient_rows(f, chunk) for chunk in chunks]
+    else:
+        executor = ProcessPoolExecutor if pool == 'process' else ThreadPoolExecutor
+        with executor(max_workers=min(workers, len(chunks))) as running:
+            parts = list(running.map(_gradient_rows, [f] * len(chunks), chunks))
+    return np.concatenate(parts) if parts else np.zeros(X.shape)
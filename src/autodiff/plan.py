@@ -0,0 +1,383 @@
+import math
+
+import numpy as np
+
+from .autodiff import Node, _toposort
+from .tape import OPNAMES, Tape, _EVAL, _OP, _replay, _sweep
+
+__all__ = ['Plan', 'optimize', 'TracedFunction', 'trace']
+
+
+class Plan:
+    '''
+    Frozen evaluation plan of a Node graph
+    The graph is recorded once, in topological order, on a Tape (opcodes, parent indices and constants).
+    The plan can then be re-executed forward and in reverse on new input values without building any Node.
+
+    A plan replays the operations that were recorded, so functions whose control flow depends on the
+    input values (if, while, ...) are only valid for inputs that take the same branches as the traced point.
+    Nodes created outside of the traced function are treated as constants.
+
+    Attributes
+    ------------------
+    tape: Tape
+      recorded operations, the first n entries are the input variables
+    n: int
+      number of inputs
+    outputs: list of int
+      positions of the outputs on the tape
+
+    Methods
+    -----------------
+    from_function
+      traces a function at a point and returns its plan
+    forward, gradient, jacobian
+      values, gradient and Jacobian of the traced function at new input values
+    stats
+      size of the recorded graph
+
+    Examples
+    ========
+    >>> plan=Plan.from_function(lambda x: x[0]*x[1]+np.exp(x[0]*x[1]), [1, 2])
+    >>> print(plan.gradient([1, 2]), plan.gradient([2, 1]))
+    [16.7781122   8.3890561] [ 8.3890561 16.7781122]
+    '''
+    def __init__(self, inputs, outputs):
+        """
+        Records the graph leading from inputs to outputs
+
+        Parameters
+        -------------------
+        inputs: list of Node
+          variables of the function
+        outputs: list of Node or numbers
+          entries of the function
+        """
+        order = _toposort([y for y in outputs if isinstance(y, Node)])
+        self.tape = tape = Tape(capacity=len(order) + len(inputs) + len(outputs) + 1)
+        self.n = len(inputs)
+        index = {}
+        for v in inputs:
+            index[v] = tape.var(v.val).index
+        for node in order:
+            if node in index:
+                continue
+            if node.parent1 is None:
+                index[node] = tape.push('const', node.val).index
+            elif node.op is None:
+                raise ValueError('the graph contains a Node without recorded operation')
+            else:
+                parent2 = -1 if node.parent2 is None else index[node.parent2]
+                index[node] = tape.push(node.op, node.val, index[node.parent1], node.der1,
+                                        parent2, node.der2 if node.parent2 is not None else 0.0).index
+        self.outputs = [index[y] if isinstance(y, Node) else tape.push('const', y).index for y in outputs]
+        self._freeze()
+
+    @staticmethod
+    def _from_tape(tape, n, outputs):
+        """
+        plan of a tape whose first n entries are the variables
+        """
+        plan = Plan.__new__(Plan)
+        plan.tape = tape
+        plan.n = n
+        plan.outputs = list(outputs)
+        plan._freeze()
+        return plan
+
+    def _freeze(self):
+        """
+        the structure is fixed, keep it as lists for the replay and sweep loops
+        """
+        n = self.tape.size
+        self._op = self.tape.op[:n].tolist()
+        self._parent1 = self.tape.parent1[:n].tolist()
+        self._parent2 = self.tape.parent2[:n].tolist()
+        self._val = self.tape.val[:n].tolist()
+        # constants have no derivatives, the sweep does not propagate adjoints into them
+        const = _OP['const']
+        self._sweep1 = [-1 if p < 0 or self._op[p] == const else p for p in self._parent1]
+        self._sweep2 = [-1 if p < 0 or self._op[p] == const else p for p in self._parent2]
+
+    @staticmethod
+    def from_function(f, x):
+        """
+        Traces f once at x on Node inputs and freezes the resulting graph
+
+        Attributes
+        ----------------------------------
+        f: callable
+          takes a 1-D array of n inputs and returns a number or a sequence of numbers, elementary functions
+          called through NumPy (np.exp, np.sin, ...) or Node
+        x: array-like of shape (n,)
+          point at which f is traced
+
+        Returns
+        ---------------------------------
+          Plan of f
+        """
+        x = np.asarray(x, dtype=float).ravel()
+        inputs = [Node(v) for v in x]
+        args = np.empty(len(inputs), dtype=object)
+        for i, v in enumerate(inputs):
+            args[i] = v
+        y = f(args)
+        if isinstance(y, Node) or np.ndim(y) == 0:
+            outputs = [y]
+        else:
+            outputs = list(np.ravel(np.asarray(y, dtype=object)))
+        return Plan(inputs, outputs)
+
+    def __len__(self):
+        return len(self._op)
+
+    def stats(self):
+        """
+        Size of the recorded graph
+
+        Returns
+        ---------------------------------
+        dict with the number of nodes, variables, constants and operations, the number of edges (parent links)
+        and of edges visited by the adjoint sweep, i.e. not leading to a constant
+        """
+        const = _OP['const']
+        return {'nodes': len(self._op),
+                'variables': self.n,
+                'constants': self._op.count(const),
+                'operations': len(self._op) - self.n - self._op.count(const),
+                'edges': sum(p >= 0 for p in self._parent1) + sum(p >= 0 for p in self._parent2),
+                'sweep_edges': sum(p >= 0 for p in self._sweep1) + sum(p >= 0 for p in self._sweep2)}
+
+    def _evaluate(self, x):
+        x = np.asarray(x, dtype=float).ravel()
+        if len(x) != self.n:
+            raise ValueError('expected %d input values, got %d' % (self.n, len(x)))
+        return _replay(self._op, self._parent1, self._parent2, self._val, x.tolist())
+
+    def _reverse(self, der1, der2, out):
+        """
+        adjoints of the inputs for the output at position out on the tape
+        """
+        adjoint = [0.0] * (out + 1)
+        adjoint[out] = 1.0
+        _sweep(adjoint, self._sweep1, self._sweep2, der1, der2, stop=out + 1)
+        grad = np.zeros(self.n)
+        m = min(self.n, out + 1)
+        grad[:m] = adjoint[:m]
+        return grad
+
+    def forward(self, x):
+        """
+        Values of the outputs at x
+
+        Returns
+        ---------------------------------
+          np.array of shape (m,)
+        """
+        val = self._evaluate(x)[0]
+        return np.array([val[i] for i in self.outputs])
+
+    def jacobian(self, x):
+        """
+        Jacobian of the traced function at x, one forward replay and one sweep per output
+
+        Returns
+        ---------------------------------
+          np.array of shape (m, n)
+        """
+        val, der1, der2 = self._evaluate(x)
+        return np.array([self._reverse(der1, der2, out) for out in self.outputs]).reshape(len(self.outputs), self.n)
+
+    def gradient(self, x):
+        """
+        Gradient of the traced scalar function at x
+
+        Returns
+        ---------------------------------
+          np.array of shape (n,)
+        """
+        if len(self.outputs) != 1:
+            raise ValueError('gradient requires a scalar function, use jacobian for vector functions')
+        val, der1, der2 = self._evaluate(x)
+        return self._reverse(der1, der2, self.outputs[0])
+
+
+def _fold(op, a, b):
+    """
+    value of an operation on constant operands
+    """
+    if op == _OP['pow']:
+        return math.pow(a, b)
+    return _EVAL[op](a, b)[0]
+
+
+def optimize(plan):
+    """
+    Simplifies a plan: merges structurally identical operations (common subexpression elimination),
+    folds operations whose operands are all constants, merges equal constants and drops the entries
+    that no output depends on
+
+    Attributes
+    ----------------------------------
+    plan: Plan
+      plan to simplify, it is not modified
+
+    Returns
+    ---------------------------------
+    optimized: Plan
+      equivalent plan
+    report: dict
+      'before' and 'after': Plan.stats of both plans, 'merged': operations merged with an identical one,
+      'folded': operations replaced by constants, 'removed': entries dropped as unused
+
+    Examples
+    ========
+    >>> plan=Plan.from_function(lambda x: x[0]*x[1]+np.exp(x[0]*x[1]), [1, 2])
+    >>> optimized, report=optimize(plan)
+    >>> print(report['before']['nodes'], report['after']['nodes'], report['merged'])
+    6 5 1
+    """
+    var, const = _OP['var'], _OP['const']
+    ops, parent1, parent2, vals = plan._op, plan._parent1, plan._parent2, plan._val
+    tape = Tape(capacity=len(ops) + 1)
+    remap = [0] * len(ops)
+    constants = {}
+    operations = {}
+    merged = folded = 0
+
+    def constant(value):
+        key = repr(float(value))
+        if key not in constants:
+            constants[key] = tape.push('const', value).index
+        return constants[key]
+
+    for i, op in enumerate(ops):
+        if op == var:
+            remap[i] = tape.push('var', vals[i]).index
+            continue
+        if op == const:
+            remap[i] = constant(vals[i])
+            continue
+        a = remap[parent1[i]]
+        b = remap[parent2[i]] if parent2[i] >= 0 else -1
+        if tape.op[a] == const and (b < 0 or tape.op[b] == const):
+            try:
+                remap[i] = constant(_fold(op, tape.val[a], tape.val[b] if b >= 0 else 0.0))
+                folded += 1
+                continue
+            except (ValueError, ZeroDivisionError, OverflowError):
+                # left in the plan, the error is raised again when the plan is evaluated
+                pass
+        if op in (_OP['add'], _OP['mul']) and 0 <= b < a:
+            a, b = b, a
+        key = (op, a, b)
+        if key in operations:
+            remap[i] = operations[key]
+            merged += 1
+        else:
+            operations[key] = remap[i] = tape.push(OPNAMES[op], vals[i], a, 0.0, b, 0.0).index
+
+    # dead code elimination, the variables are always kept
+    size = tape.size
+    live = [False] * size
+    for out in plan.outputs:
+        live[remap[out]] = True
+    for i in range(size - 1, -1, -1):
+        if live[i] or tape.op[i] == var:
+            live[i] = True
+            for p in (tape.parent1[i], tape.parent2[i]):
+                if p >= 0:
+                    live[p] = True
+    compact = Tape(capacity=sum(live) + 1)
+    index = [-1] * size
+    for i in range(size):
+        if live[i]:
+            p1, p2 = tape.parent1[i], tape.parent2[i]
+            index[i] = compact.push(OPNAMES[tape.op[i]], tape.val[i], index[p1] if p1 >= 0 else -1, 0.0,
+                                    index[p2] if p2 >= 0 else -1, 0.0).index
+    optimized = Plan._from_tape(compact, plan.n, [index[remap[out]] for out in plan.outputs])
+    return optimized, {'before': plan.stats(), 'after': optimized.stats(), 'merged': merged,
+                       'folded': folded, 'removed': size - compact.size}
+
+
+class TracedFunction:
+    '''
+    Function that is traced once per input structure, later calls replay the cached plan,
+    so that the graph is not rebuilt at every iteration of an optimization loop
+
+    Attributes
+    ------------------
+    f: callable
+      function of a 1-D array, see Plan.from_function
+    plans: dict
+      cached Plan objects, keyed by the shape of the input
+    optimize: bool
+      whether the plans are simplified with optimize after tracing
+
+    Examples
+    ========
+    >>> f=trace(lambda x: np.sum(100*(x[1:]-x[:-1]**2)**2+(1-x[:-1])**2))
+    >>> for it in range(3):
+    >>>     x=np.array([1.0, 2.0, 3.0])*it
+    >>>     g=f.gradient(x)   # traced at the first call only
+    '''
+    def __init__(self, f, optimize=False):
+        """
+        Constructs the necessary attributes of the class
+
+        Parameters
+        -------------------
+        f: callable
+          function of a 1-D array, see Plan.from_function
+        optimize: bool
+          simplify the plans with optimize after tracing
+        """
+        self.f = f
+        self.plans = {}
+        self.optimize = optimize
+
+    def plan(self, x):
+        """
+        Plan for inputs shaped like x, traced at x the first time
+        """
+        key = np.shape(x)
+        if key not in self.plans:
+            plan = Plan.from_function(self.f, x)
+            self.plans[key] = optimize(plan)[0] if self.optimize else plan
+        return self.plans[key]
+
+    def __call__(self, x):
+        """
+        values of the outputs at x, see Plan.forward
+        """
+        return self.plan(x).forward(x)
+
+    def gradient(self, x):
+        """
+        gradient at x, see Plan.gradient
+        """
+        return self.plan(x).gradient(x)
+
+    def jacobian(self, x):
+        """
+        Jacobian at x, see Plan.jacobian
+        """
+        return self.plan(x).jacobian(x)
+
+
+def trace(f, optimize=False):
+    """
+    Wraps f so that its graph is traced once per input shape and replayed afterwards
+
+    Attributes
+    ----------------------------------
+    f: callable
+      function of a 1-D array, see Plan.from_function
+    optimize: bool
+      simplify the plans with optimize after tracing
+
+    Returns
+    ---------------------------------
+      TracedFunction, can also be used as a decorator
+    """
+    return TracedFunction(f, optimize)
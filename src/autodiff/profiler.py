@@ -0,0 +1,168 @@
+from time import perf_counter
+
+from .autodiff import DualNum, Node
+
+__all__ = ['Profiler']
+
+# operators and elementary functions that are timed, reflected operators are reported with the operator
+_OPERATORS = {'__add__': 'add', '__radd__': 'add', '__sub__': 'sub', '__rsub__': 'sub', '__mul__': 'mul',
+              '__rmul__': 'mul', '__truediv__': 'div', '__rtruediv__': 'div', '__pow__': 'pow', '__rpow__': 'pow',
+              '__neg__': 'neg'}
+_FUNCTIONS = ('exp', 'log', 'sin', 'cos', 'tan', 'arcsin', 'arccos', 'arctan', 'sinh', 'cosh', 'tanh', 'logistic',
+              'sqrt')
+
+
+class Profiler:
+    '''
+    Opt-in profiler of DualNum and Node: while it is enabled, the operators and elementary functions of both
+    classes and Node.reverse are replaced by wrappers that count the calls and accumulate their wall time, and
+    the Nodes alive are counted. The original methods are put back when it is disabled, so there is no
+    overhead at all outside of a profiling block
+
+    Times are exclusive: an operation implemented with other operations (e.g. Node.logistic) is only charged
+    for the time not spent in them. Only one profiler can be enabled at a time, and it is not thread-safe
+
+    Methods
+    -----------------
+    enable, disable
+      start and stop profiling, also done by entering and leaving a with block
+    stats
+      results as a dict
+    table
+      results as a printable table
+
+    Examples
+    ========
+    >>> with Profiler() as prof:
+    >>>     x1, x2=Node(1), Node(2)
+    >>>     y=x1*x2+Node.exp(x1*x2)
+    >>>     y.reverse()
+    >>> print(prof.stats()['operations']['Node.mul']['calls'], prof.stats()['peak_live_nodes'])
+    2 6
+    '''
+    _active = None
+
+    def __init__(self):
+        """
+        Constructs the necessary attributes of the class
+        """
+        self._records = {}
+        self._stack = []
+        self._saved = []
+        self._alive = set()
+        self.created = 0
+        self.peak = 0
+
+    def __enter__(self):
+        self.enable()
+        return self
+
+    def __exit__(self, *exc):
+        self.disable()
+
+    def _wrap(self, key, func):
+        """
+        func counting its calls and exclusive time under key, a call made by an operation of the same key
+        (e.g. __radd__ calling __add__) is part of that operation
+        """
+        record = self._records.setdefault(key, [0, 0.0])
+        stack = self._stack
+
+        def timed(*args, **kwargs):
+            if stack and stack[-1][0] == key:
+                return func(*args, **kwargs)
+            stack.append([key, 0.0])
+            start = perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                elapsed = perf_counter() - start
+                record[0] += 1
+                record[1] += elapsed - stack.pop()[1]
+                if stack:
+                    stack[-1][1] += elapsed
+        return timed
+
+    def _patch(self, cls, name, value):
+        self._saved.append((cls, name, cls.__dict__.get(name)))
+        setattr(cls, name, value)
+
+    def enable(self):
+        """
+        Replaces the methods of DualNum and Node by their profiled versions
+        """
+        if Profiler._active is not None:
+            raise ValueError('a profiler is already enabled')
+        Profiler._active = self
+        for cls in (DualNum, Node):
+            for name, op in _OPERATORS.items():
+                if name in cls.__dict__:
+                    self._patch(cls, name, self._wrap('%s.%s' % (cls.__name__, op), cls.__dict__[name]))
+            for name in _FUNCTIONS:
+                if name in cls.__dict__:
+                    func = cls.__dict__[name].__func__
+                    self._patch(cls, name, staticmethod(self._wrap('%s.%s' % (cls.__name__, name), func)))
+        self._patch(Node, 'reverse', self._wrap('reverse', Node.__dict__['reverse']))
+
+        init = Node.__init__
+        alive = self._alive
+
+        def counted_init(node, *args, **kwargs):
+            init(node, *args, **kwargs)
+            alive.add(id(node))
+            self.created += 1
+            if len(alive) > self.peak:
+                self.peak = len(alive)
+
+        def counted_del(node):
+            alive.discard(id(node))
+
+        self._patch(Node, '__init__', counted_init)
+        self._patch(Node, '__del__', counted_del)
+        return self
+
+    def disable(self):
+        """
+        Puts the original methods of DualNum and Node back
+        """
+        for cls, name, value in reversed(self._saved):
+            if value is None:
+                delattr(cls, name)
+            else:
+                setattr(cls, name, value)
+        self._saved = []
+        self._alive.clear()
+        if Profiler._active is self:
+            Profiler._active = None
+
+    def stats(self):
+        """
+        Results of the profiling so far
+
+        Returns
+        ---------------------------------
+        dict with
+          'operations': {'Class.op': {'calls': int, 'seconds': float}}, for the operations that were called
+          'reverse': {'calls': int, 'seconds': float}, reverse sweeps of Node, without the operations they call
+          'nodes_created': number of Nodes built while profiling
+          'peak_live_nodes': largest number of those Nodes alive at the same time
+        """
+        operations = {key: {'calls': calls, 'seconds': seconds}
+                      for key, (calls, seconds) in self._records.items() if calls and key != 'reverse'}
+        calls, seconds = self._records.get('reverse', (0, 0.0))
+        return {'operations': operations, 'reverse': {'calls': calls, 'seconds': seconds},
+                'nodes_created': self.created, 'peak_live_nodes': self.peak}
+
+    def table(self):
+        """
+        Results of the profiling so far as a table, operations sorted by decreasing total time
+        """
+        stats = self.stats()
+        rows = sorted(stats['operations'].items(), key=lambda item: -item[1]['seconds'])
+        rows.append(('reverse sweep', stats['reverse']))
+        lines = ['{:<20} {:>10} {:>12} {:>12}'.format('operation', 'calls', 'total ms', 'per call us')]
+        for key, record in rows:
+            per_call = 1e6 * record['seconds'] / record['calls'] if record['calls'] else 0.0
+            lines.append('{:<20} {:>10} {:>12.3f} {:>12.2f}'.format(key, record['calls'], 1e3 * record['seconds'], per_call))
+        lines.append('Nodes created: %d, peak alive: %d' % (stats['nodes_created'], stats['peak_live_nodes']))
+        return '\n'.join(lines)
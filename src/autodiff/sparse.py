@@ -0,0 +1,132 @@
+import numpy as np
+
+from .autodiff import DualNum, Node, _toposort
+from .drivers import _as_objects, _outputs
+
+__all__ = ['jacobian_sparsity', 'color_columns', 'sparse_jacobian']
+
+
+def jacobian_sparsity(f, x):
+    """
+    Sparsity pattern of the Jacobian of f, found by building the Node graph of f once at x and propagating
+    the set of inputs each Node depends on from the variables to the outputs
+
+    The pattern is structural: an entry is kept whenever the output is connected to the input in the graph,
+    even if the derivative happens to vanish at x. Like plans, it is only valid for inputs that take the same
+    branches as x in the control flow of f
+
+    Attributes
+    ----------------------------------
+    f: callable
+      takes a 1-D array of n inputs and returns a number or a sequence of m numbers, see jacobian
+    x: array-like of shape (n,)
+      point at which f is traced
+
+    Returns
+    ---------------------------------
+    rows, cols: np.array of int
+      positions of the structurally non-zero entries, sorted by row then column
+    """
+    x = np.asarray(x, dtype=float).ravel()
+    xs = [Node(v) for v in x]
+    outs = _outputs(f(_as_objects(xs)))
+    deps = {v: frozenset((j,)) for j, v in enumerate(xs)}
+    empty = frozenset()
+    for node in _toposort([y for y in outs if isinstance(y, Node)]):
+        if node in deps:
+            continue
+        if node.parent2 is None:
+            deps[node] = deps.get(node.parent1, empty)
+        else:
+            deps[node] = deps.get(node.parent1, empty) | deps.get(node.parent2, empty)
+    rows, cols = [], []
+    for i, y in enumerate(outs):
+        if isinstance(y, Node):
+            for j in sorted(deps[y]):
+                rows.append(i)
+                cols.append(j)
+    return np.array(rows, dtype=int), np.array(cols, dtype=int)
+
+
+def color_columns(rows, cols, n):
+    """
+    Groups the columns of a sparse Jacobian into structurally orthogonal sets: columns of the same color never
+    have a non-zero entry in the same row, so they can share one seed direction. Greedy coloring of the
+    column intersection graph, columns with the most neighbours first
+
+    Attributes
+    ----------------------------------
+    rows, cols: array-like of int
+      positions of the non-zero entries
+    n: int
+      number of columns
+
+    Returns
+    ---------------------------------
+      np.array of shape (n,), color of each column, from 0 to the number of colors - 1
+
+    Examples
+    ========
+    >>> color_columns([0, 0, 1, 1, 2, 2], [0, 1, 1, 2, 2, 3], 4)
+    array([1, 0, 1, 0])
+    """
+    by_row = {}
+    for i, j in zip(np.asarray(rows).tolist(), np.asarray(cols).tolist()):
+        by_row.setdefault(i, []).append(j)
+    neighbours = [set() for _ in range(n)]
+    for columns in by_row.values():
+        for j in columns:
+            neighbours[j].update(columns)
+    for j in range(n):
+        neighbours[j].discard(j)
+    colors = np.full(n, -1, dtype=int)
+    for j in sorted(range(n), key=lambda j: -len(neighbours[j])):
+        used = {colors[k] for k in neighbours[j]}
+        color = 0
+        while color in used:
+            color += 1
+        colors[j] = color
+    return colors
+
+
+def sparse_jacobian(f, x, sparsity=None):
+    """
+    Jacobian of f at x in coordinate format, from one forward pass with one seed direction per color of
+    color_columns instead of one per input
+
+    Attributes
+    ----------------------------------
+    f: callable
+      takes a 1-D array of n inputs and returns a number or a sequence of m numbers, see jacobian
+    x: array-like of shape (n,)
+      point at which the Jacobian is evaluated
+    sparsity: tuple (rows, cols)
+      sparsity pattern, by default detected with jacobian_sparsity. Pass the pattern found once to skip
+      the detection when the Jacobian is needed at many points
+
+    Returns
+    ---------------------------------
+    rows, cols: np.array of int
+      positions of the entries
+    vals: np.array
+      values of the entries, so that scipy.sparse.coo_matrix((vals, (rows, cols)), shape=(m, n)) is the Jacobian
+
+    Examples
+    ========
+    >>> f=lambda x: [x[0]*x[1], np.sin(x[1])+x[2], x[2]**2]
+    >>> sparse_jacobian(f, [1, 2, 3])
+    (array([0, 0, 1, 1, 2]), array([0, 1, 1, 2, 2]), array([ 2.        ,  1.        , -0.41614684,  1.        ,  6.        ]))
+    """
+    x = np.asarray(x, dtype=float).ravel()
+    rows, cols = jacobian_sparsity(f, x) if sparsity is None else (np.asarray(s, dtype=int) for s in sparsity)
+    if len(rows) == 0:
+        return rows, cols, np.zeros(0)
+    colors = color_columns(rows, cols, len(x))
+    seeds = np.zeros((len(x), colors.max() + 1))
+    seeds[np.arange(len(x)), colors] = 1
+    outs = _outputs(f(_as_objects(DualNum.variables(x, seeds))))
+    vals = np.zeros(len(rows))
+    for k, (i, j) in enumerate(zip(rows.tolist(), cols.tolist())):
+        if isinstance(outs[i], DualNum):
+            vals[k] = np.asarray(outs[i].der).ravel()[colors[j]]
+    return rows, cols, vals
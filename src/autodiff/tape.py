@@ -0,0 +1,558 @@
+import math
+
+import numpy as np
+
+__all__ = ['OPNAMES', 'Tape', 'TapeNode']
+
+# names of the operations that can be recorded on a Tape, the opcode of an operation is its position
+OPNAMES = ('var', 'const', 'add', 'sub', 'mul', 'div', 'pow', 'neg', 'exp', 'log', 'sin', 'cos', 'tan',
+           'arcsin', 'arccos', 'arctan', 'sinh', 'cosh', 'tanh', 'logistic', 'sqrt')
+_OP = {name: code for code, name in enumerate(OPNAMES)}
+
+# number of entries converted to Python lists at a time during the adjoint sweep
+_SWEEP_BLOCK = 1 << 16
+
+
+def _logistic(a):
+    val = 1 / (1 + math.exp(-a))
+    return val, val * (1 - val), 0.0
+
+
+# value and local partial derivatives (val, der1, der2) of each operation from the values of its parents,
+# used to replay a tape on new inputs. Plain floats and the math module are much faster than NumPy scalars
+_EVAL = {
+    _OP['add']: lambda a, b: (a + b, 1.0, 1.0),
+    _OP['sub']: lambda a, b: (a - b, 1.0, -1.0),
+    _OP['mul']: lambda a, b: (a * b, b, a),
+    _OP['div']: lambda a, b: (a / b, 1 / b, -a / b**2),
+    _OP['neg']: lambda a, b: (-a, -1.0, 0.0),
+    _OP['exp']: lambda a, b: (math.exp(a), math.exp(a), 0.0),
+    _OP['log']: lambda a, b: (math.log(a), 1 / a, 0.0),
+    _OP['sin']: lambda a, b: (math.sin(a), math.cos(a), 0.0),
+    _OP['cos']: lambda a, b: (math.cos(a), -math.sin(a), 0.0),
+    _OP['tan']: lambda a, b: (math.tan(a), 1 / math.cos(a)**2, 0.0),
+    _OP['arcsin']: lambda a, b: (math.asin(a), 1 / math.sqrt(1 - a**2), 0.0),
+    _OP['arccos']: lambda a, b: (math.acos(a), -1 / math.sqrt(1 - a**2), 0.0),
+    _OP['arctan']: lambda a, b: (math.atan(a), 1 / (1 + a**2), 0.0),
+    _OP['sinh']: lambda a, b: (math.sinh(a), math.cosh(a), 0.0),
+    _OP['cosh']: lambda a, b: (math.cosh(a), math.sinh(a), 0.0),
+    _OP['tanh']: lambda a, b: (math.tanh(a), 1 - math.tanh(a)**2, 0.0),
+    _OP['logistic']: lambda a, b: _logistic(a),
+    _OP['sqrt']: lambda a, b: (math.sqrt(a), 0.5 / math.sqrt(a), 0.0),
+}
+
+
+def _replay(op, parent1, parent2, val, x):
+    """
+    Re-evaluates recorded entries with new values of the variables
+
+    Attributes
+    ----------------------------------
+    op, parent1, parent2: list of int
+      opcodes and parent indices of the entries
+    val: list of float
+      recorded values, only the constants are read
+    x: sequence of float
+      new values of the variables, in the order they were recorded
+
+    Returns
+    ---------------------------------
+      lists val, der1, der2 of the new values and local partial derivatives of every entry
+    """
+    n = len(op)
+    val = list(val)
+    der1 = [0.0] * n
+    der2 = [0.0] * n
+    var, const, pow_ = _OP['var'], _OP['const'], _OP['pow']
+    k = 0
+    for i in range(n):
+        o = op[i]
+        if o == var:
+            val[i] = float(x[k])
+            k += 1
+        elif o == pow_:
+            a, j = val[parent1[i]], parent2[i]
+            b = val[j]
+            val[i] = math.pow(a, b)
+            der1[i] = 0.0 if op[parent1[i]] == const else b * math.pow(a, b - 1)
+            if op[j] == const:
+                der2[i] = 0.0
+            elif a <= 0:
+                raise ValueError('cannot have negative value for x in x**y as encounter log(x) in derivative')
+            else:
+                der2[i] = val[i] * math.log(a)
+        elif o != const:
+            j = parent2[i]
+            val[i], der1[i], der2[i] = _EVAL[o](val[parent1[i]], val[j] if j >= 0 else 0.0)
+    if k != len(x):
+        raise ValueError('expected %d input values, got %d' % (k, len(x)))
+    return val, der1, der2
+
+
+def _sweep(adjoint, p1, p2, d1, d2, offset=0, stop=None):
+    """
+    Backward loop of the adjoint sweep over a block of entries
+
+    Attributes
+    ----------------------------------
+    adjoint: list
+      adjoints of all the entries, updated in place
+    p1, p2, d1, d2: list
+      parent indices and local partial derivatives of the entries of the block
+    offset: int
+      position on the tape of the first entry of the block
+    stop: int
+      number of entries of the block that are swept, all of them by default. Sweeping a prefix of shared
+      lists avoids copying them for every output
+    """
+    for k in range((len(p1) if stop is None else stop) - 1, -1, -1):
+        a = adjoint[offset + k]
+        if a == 0.0:
+            continue
+        j = p1[k]
+        if j >= 0:
+            adjoint[j] += a * d1[k]
+        j = p2[k]
+        if j >= 0:
+            adjoint[j] += a * d2[k]
+
+
+class Tape:
+    '''
+    Array backed record (Wengert list) of a computation for reverse mode automatic differentiation
+    Every operation is stored as one entry of contiguous NumPy arrays: its opcode, the indices of its
+    parents on the tape, the local partial derivatives with respect to these parents and its value.
+    Constants are entries without parents. Entries always come after their parents, so the adjoint
+    sweep is a single backward loop over the arrays.
+
+    Attributes
+    ------------------
+    size: int
+      number of entries recorded so far
+    op: np.array of int8
+      opcode of each entry, i.e. its position in OPNAMES
+    parent1, parent2: np.array of int64
+      indices of the parents of each entry, -1 when the parent does not exist
+    der1, der2: np.array of float64
+      local partial derivatives of each entry with respect to its parents
+    val: np.array of float64
+      value of each entry
+
+    Methods
+    -----------------
+    var, variables
+      record new independent variables and return TapeNode handles on them
+    reverse
+      adjoint sweep from an output, returns the adjoints of all entries
+    replay
+      re-executes the recorded operations with new values of the variables
+    gradient
+      adjoints of an output with respect to a list of variables
+
+    Examples
+    ========
+    >>> tape=Tape()
+    >>> x1, x2=tape.variables([1, 2])
+    >>> y=x1*x2+TapeNode.exp(x1*x2)
+    >>> print(tape.gradient(y, [x1, x2]))
+    [16.7781122   8.3890561]
+    '''
+    def __init__(self, capacity=1024):
+        """
+        Constructs an empty tape
+
+        Parameters
+        -------------------
+        capacity: int
+          number of entries allocated up front, the arrays double in size when they are full
+        """
+        self.size = 0
+        self.op = np.empty(capacity, dtype=np.int8)
+        self.parent1 = np.empty(capacity, dtype=np.int64)
+        self.parent2 = np.empty(capacity, dtype=np.int64)
+        self.der1 = np.empty(capacity, dtype=np.float64)
+        self.der2 = np.empty(capacity, dtype=np.float64)
+        self.val = np.empty(capacity, dtype=np.float64)
+
+    def __len__(self):
+        return self.size
+
+    @property
+    def nbytes(self):
+        """
+        memory used by the recorded entries, in bytes
+        """
+        per_entry = sum(a.itemsize for a in (self.op, self.parent1, self.parent2, self.der1, self.der2, self.val))
+        return per_entry * self.size
+
+    def _grow(self):
+        """
+        doubles the capacity of all the arrays of the tape
+        """
+        for name in ('op', 'parent1', 'parent2', 'der1', 'der2', 'val'):
+            old = getattr(self, name)
+            new = np.empty(2 * len(old), dtype=old.dtype)
+            new[:self.size] = old[:self.size]
+            setattr(self, name, new)
+
+    def push(self, op, val, parent1=-1, der1=0.0, parent2=-1, der2=0.0):
+        """
+        Records one entry on the tape
+
+        Attributes
+        ----------------------------------
+        op: str
+          name of the operation, one of OPNAMES
+        val: float
+          value of the entry
+        parent1, parent2: int
+          indices of the parents on the tape, -1 if there is no such parent
+        der1, der2: float
+          local partial derivatives with respect to the parents
+
+        Returns
+        ---------------------------------
+          TapeNode handle on the new entry
+        """
+        i = self.size
+        if i == len(self.val):
+            self._grow()
+        self.op[i] = _OP[op]
+        self.val[i] = val
+        self.parent1[i] = parent1
+        self.der1[i] = der1
+        self.parent2[i] = parent2
+        self.der2[i] = der2
+        self.size = i + 1
+        return TapeNode(self, i)
+
+    def var(self, val):
+        """
+        Records an independent variable
+
+        Returns
+        ---------------------------------
+          TapeNode handle on the variable
+        """
+        return self.push('var', val)
+
+    def variables(self, vals):
+        """
+        Records one independent variable per entry of vals
+
+        Returns
+        ---------------------------------
+          list of TapeNode handles on the variables
+        """
+        return [self.push('var', v) for v in vals]
+
+    def reverse(self, output):
+        """
+        Adjoint sweep: goes backward through the tape from output and accumulates the adjoints of all entries
+
+        Attributes
+        ----------------------------------
+        output: TapeNode or int
+          entry whose derivatives are computed
+
+        Returns
+        ---------------------------------
+        adjoint: np.array
+          derivative of output with respect to every entry recorded up to output
+        """
+        out = output.index if isinstance(output, TapeNode) else int(output)
+        adjoint = [0.0] * (out + 1)
+        adjoint[out] = 1.0
+        stop = out + 1
+        while stop > 0:
+            # columns are converted to lists one block at a time, Python loops over lists are much faster
+            start = max(0, stop - _SWEEP_BLOCK)
+            _sweep(adjoint, self.parent1[start:stop].tolist(), self.parent2[start:stop].tolist(),
+                   self.der1[start:stop].tolist(), self.der2[start:stop].tolist(), start)
+            stop = start
+        return np.array(adjoint)
+
+    def replay(self, x):
+        """
+        Re-executes the recorded operations with new values of the variables, in place
+        Values and local partial derivatives of all entries are updated, so reverse and gradient
+        then differentiate at the new point
+
+        Attributes
+        ----------------------------------
+        x: sequence of float
+          new values of the variables, in the order they were recorded
+        """
+        n = self.size
+        val, der1, der2 = _replay(self.op[:n].tolist(), self.parent1[:n].tolist(), self.parent2[:n].tolist(),
+                                  self.val[:n].tolist(), x)
+        self.val[:n] = val
+        self.der1[:n] = der1
+        self.der2[:n] = der2
+
+    def gradient(self, output, wrt):
+        """
+        Derivatives of output with respect to the variables in wrt
+
+        Attributes
+        ----------------------------------
+        output: TapeNode
+          entry whose derivatives are computed
+        wrt: list of TapeNode
+          variables against which output is derived
+
+        Returns
+        ---------------------------------
+          np.array of the derivatives, in the order of wrt
+        """
+        adjoint = self.reverse(output)
+        return np.array([adjoint[v.index] if v.index < len(adjoint) else 0.0 for v in wrt])
+
+
+class TapeNode:
+    '''
+    Handle on an entry of a Tape, supports the same operations and elementary functions as Node
+    Operations on TapeNodes record new entries on the tape instead of allocating graph objects
+
+    Attributes
+    ------------------
+    tape: Tape
+      tape the entry belongs to
+    index: int
+      position of the entry on the tape
+
+    Examples
+    ========
+    >>> tape=Tape()
+    >>> x=tape.var(0.5)
+    >>> y=TapeNode.sin(x)*x
+    >>> print(y.val, y.reverse()[x.index])
+    0.2397127693021015 0.9182168195493894
+    '''
+    __slots__ = ('tape', 'index')
+
+    def __init__(self, tape, index):
+        self.tape = tape
+        self.index = index
+
+    @property
+    def val(self):
+        """
+        value of the entry
+        """
+        return self.tape.val[self.index]
+
+    def reverse(self):
+        """
+        adjoint sweep from this entry, see Tape.reverse
+        """
+        return self.tape.reverse(self)
+
+    def _operand(self, other):
+        """
+        index and value of the other operand of a binary operation, constants are recorded on the tape
+        """
+        if isinstance(other, TapeNode):
+            if other.tape is not self.tape:
+                raise ValueError('cannot combine entries of different tapes')
+            return other.index, self.tape.val[other.index]
+        return self.tape.push('const', other).index, other
+
+    def __add__(self, other):
+        j, b = self._operand(other)
+        return self.tape.push('add', self.val + b, self.index, 1.0, j, 1.0)
+
+    def __radd__(self, other):
+        return self.__add__(other)
+
+    def __sub__(self, other):
+        j, b = self._operand(other)
+        return self.tape.push('sub', self.val - b, self.index, 1.0, j, -1.0)
+
+    def __rsub__(self, other):
+        j, b = self._operand(other)
+        return self.tape.push('sub', b - self.val, j, 1.0, self.index, -1.0)
+
+    def __mul__(self, other):
+        j, b = self._operand(other)
+        a = self.val
+        return self.tape.push('mul', a * b, self.index, b, j, a)
+
+    def __rmul__(self, other):
+        return self.__mul__(other)
+
+    def __truediv__(self, other):
+        j, b = self._operand(other)
+        a = self.val
+        return self.tape.push('div', a / b, self.index, 1 / b, j, -a / b**2)
+
+    def __rtruediv__(self, other):
+        j, b = self._operand(other)
+        a = self.val
+        return self.tape.push('div', b / a, j, 1 / a, self.index, -b / a**2)
+
+    def __neg__(self):
+        return self.tape.push('neg', -self.val, self.index, -1.0)
+
+    @staticmethod
+    def _pow(base, exponent):
+        """
+        records base**exponent, base and exponent are (index, value, is_constant) triples
+        """
+        (i, a, ca), (j, b, cb) = base, exponent
+        if cb:
+            # constant exponent: the log of the base is not needed, so negative bases are allowed
+            der2 = 0.0
+        elif a <= 0:
+            raise ValueError('cannot have negative value for x in x**y as encounter log(x) in derivative')
+        else:
+            der2 = a**b * np.log(a)
+        der1 = 0.0 if ca else b * a**(b - 1)
+        return (i, j, a**b, der1, der2)
+
+    def __pow__(self, exponent):
+        j, b = self._operand(exponent)
+        i, j, val, der1, der2 = TapeNode._pow((self.index, self.val, False),
+                                              (j, b, not isinstance(exponent, TapeNode)))
+        return self.tape.push('pow', val, i, der1, j, der2)
+
+    def __rpow__(self, other):
+        j, b = self._operand(other)
+        i, j, val, der1, der2 = TapeNode._pow((j, b, True), (self.index, self.val, False))
+        return self.tape.push('pow', val, i, der1, j, der2)
+
+    def _unary(self, op, val, der):
+        return self.tape.push(op, val, self.index, der)
+
+    @staticmethod
+    def exp(other, base=np.e):
+        """
+        exponential of other, base is the base of the exponential
+        """
+        if not isinstance(other, TapeNode):
+            return base**other
+        if base != np.e:
+            return TapeNode.exp(other * np.log(base))
+        val = np.exp(other.val)
+        return other._unary('exp', val, val)
+
+    @staticmethod
+    def log(other, base=np.e):
+        """
+        logarithm of other, base is the base of the logarithm
+        """
+        if not isinstance(other, TapeNode):
+            return np.log(other) / np.log(base)
+        if base != np.e:
+            return TapeNode.log(other) / np.log(base)
+        return other._unary('log', np.log(other.val), 1 / other.val)
+
+    @staticmethod
+    def sin(other):
+        """
+        sine of other
+        """
+        if not isinstance(other, TapeNode):
+            return np.sin(other)
+        return other._unary('sin', np.sin(other.val), np.cos(other.val))
+
+    @staticmethod
+    def cos(other):
+        """
+        cosine of other
+        """
+        if not isinstance(other, TapeNode):
+            return np.cos(other)
+        return other._unary('cos', np.cos(other.val), -np.sin(other.val))
+
+    @staticmethod
+    def tan(other):
+        """
+        tangent of other
+        """
+        if not isinstance(other, TapeNode):
+            return np.tan(other)
+        if other.val % np.pi == (np.pi / 2):
+            raise ValueError('Cannot take tangents of multiples of pi/2 + (pi * n), where n is a positive integer')
+        return other._unary('tan', np.tan(other.val), 1 / np.cos(other.val)**2)
+
+    @staticmethod
+    def arcsin(other):
+        """
+        arcsine of other
+        """
+        if not isinstance(other, TapeNode):
+            return np.arcsin(other)
+        if other.val > 1 or other.val < -1:
+            raise ValueError('please use value between -1 and 1, inclusive')
+        return other._unary('arcsin', np.arcsin(other.val), 1 / np.sqrt(1 - other.val**2))
+
+    @staticmethod
+    def arccos(other):
+        """
+        arccos of other
+        """
+        if not isinstance(other, TapeNode):
+            return np.arccos(other)
+        if other.val > 1 or other.val < -1:
+            raise ValueError('please use value between -1 and 1, inclusive')
+        return other._unary('arccos', np.arccos(other.val), -1 / np.sqrt(1 - other.val**2))
+
+    @staticmethod
+    def arctan(other):
+        """
+        arctan of other
+        """
+        if not isinstance(other, TapeNode):
+            return np.arctan(other)
+        return other._unary('arctan', np.arctan(other.val), 1 / (1 + other.val**2))
+
+    @staticmethod
+    def sinh(other):
+        """
+        sinh of other
+        """
+        if not isinstance(other, TapeNode):
+            return np.sinh(other)
+        return other._unary('sinh', np.sinh(other.val), np.cosh(other.val))
+
+    @staticmethod
+    def cosh(other):
+        """
+        cosh of other
+        """
+        if not isinstance(other, TapeNode):
+            return np.cosh(other)
+        return other._unary('cosh', np.cosh(other.val), np.sinh(other.val))
+
+    @staticmethod
+    def tanh(other):
+        """
+        tanh of other
+        """
+        if not isinstance(other, TapeNode):
+            return np.tanh(other)
+        val = np.tanh(other.val)
+        return other._unary('tanh', val, 1 - val**2)
+
+    @staticmethod
+    def logistic(other):
+        """
+        logistic of other
+        """
+        if not isinstance(other, TapeNode):
+            return 1 / (1 + np.exp(-other))
+        val = 1 / (1 + np.exp(-other.val))
+        return other._unary('logistic', val, val * (1 - val))
+
+    @staticmethod
+    def sqrt(other):
+        """
+        sqrt of other
+        """
+        if (other.val if isinstance(other, TapeNode) else other) < 0:
+            raise ValueError('Cannot take square roots of negative values')
+        if not isinstance(other, TapeNode):
+            return np.sqrt(other)
+        val = np.sqrt(other.val)
+        return other._unary('sqrt', val, 0.5 / val)
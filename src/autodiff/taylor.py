@@ -0,0 +1,466 @@
+import math
+
+import numpy as np
+
+from .autodiff import _array_ufunc
+from .drivers import _as_objects, _outputs
+
+__all__ = ['Jet', 'taylor_derivatives']
+
+
+def _conv(a, b, k, start=0):
+    """
+    coefficient k of the product of two truncated series, sum of a[j]*b[k-j] for j from start to k-start
+    """
+    return sum(a[j] * b[k - j] for j in range(start, k - start + 1))
+
+
+def _integrate(x, y0, g):
+    """
+    Coefficients of y such that y' = g(y) x', from the recurrence y_k = 1/k sum_{j=1..k} j x_j g_{k-j}
+
+    Attributes
+    ----------------------------------
+    x: np.array
+      coefficients of the argument
+    y0: float or np.array
+      value of y
+    g: callable
+      g(y, m) is the coefficient m of g, from the coefficients y[0..m]
+
+    Returns
+    ---------------------------------
+      list of the coefficients of y
+    """
+    y = [y0]
+    gs = []
+    for k in range(1, len(x)):
+        gs.append(g(y, k - 1))
+        y.append(sum(j * x[j] * gs[k - j] for j in range(1, k + 1)) / k)
+    return y
+
+
+class Jet:
+    '''
+    Truncated Taylor polynomial x(t) = x_0 + x_1 t + ... + x_K t^K, propagated through arithmetic and
+    elementary functions with the O(K^2) recurrences of Taylor-mode differentiation, so that derivatives
+    of any order along a direction come out of a single forward pass instead of 2^K nested DualNum passes
+
+    Attributes
+    ------------------
+    coef: np.array
+      Taylor coefficients, coef[k] is the k-th derivative divided by k!. Entries may themselves be
+      np.arrays of batched values, the order is always the first axis
+
+    Methods
+    -----------------
+    __add__, __radd__, __mul__, __rmul__, __sub__, __rsub__, __neg__, __pow__, __rpow__, __truediv__, __rtruediv__
+    dunder methods overloaded to operate on Jet objects
+
+    exp, log, sin, cos, tan, arcsin, arccos, arctan, sinh, cosh, tanh, logistic, sqrt
+    elementary functions, also called by np.exp, np.sin, ...
+
+    derivatives
+    derivatives of order 0 to K
+
+    Examples
+    ========
+    >>> x=Jet.variable(0.5, order=4)
+    >>> y=np.exp(x)*np.sin(x)
+    >>> print(y.derivatives())
+    [ 0.79043908  2.23732812  2.89377807  1.31289991 -3.16175633]
+    '''
+    __slots__ = ('coef',)
+
+    def __array_ufunc__(self, ufunc, method, *inputs, **kwargs):
+        '''
+        Lets np.exp, np.sin, ... apply the Jet elementary functions and NumPy scalars and arrays on the left
+        of an operator defer to the Jet operators
+        '''
+        return _array_ufunc(Jet, ufunc, method, inputs, kwargs)
+
+    def __init__(self, coef):
+        '''
+        Constructs a Jet from its Taylor coefficients, order K = len(coef) - 1
+        '''
+        self.coef = np.asarray(coef, dtype=float)
+
+    @staticmethod
+    def variable(val, order, direction=1.0):
+        """
+        Jet of the input x + t * direction, truncated at order
+
+        Attributes
+        ----------------------------------
+        val: float or np.array
+          value of the variable
+        order: int
+          highest order K of the derivatives
+        direction: float or np.array
+          direction of the derivatives
+
+        Returns
+        ---------------------------------
+          Jet object
+        """
+        if order < 1:
+            raise ValueError('please use an order of at least 1')
+        val = np.asarray(val, dtype=float)
+        coef = np.zeros((order + 1,) + val.shape)
+        coef[0] = val
+        coef[1] = direction
+        return Jet(coef)
+
+    @property
+    def val(self):
+        """
+        value of the Jet, coefficient 0
+        """
+        return self.coef[0]
+
+    @property
+    def order(self):
+        """
+        highest order K of the Jet
+        """
+        return len(self.coef) - 1
+
+    def derivatives(self):
+        """
+        Derivatives of order 0 to K along the direction of the inputs, k! coef[k]
+
+        Returns
+        ---------------------------------
+          np.array of the shape of coef
+        """
+        factorials = np.array([math.factorial(k) for k in range(len(self.coef))], dtype=float)
+        return self.coef * factorials.reshape((-1,) + (1,) * (self.coef.ndim - 1))
+
+    def _lift(self, other):
+        """
+        Jet of a constant, with the order of self
+        """
+        if isinstance(other, Jet):
+            if other.order != self.order:
+                raise ValueError('cannot combine Jets of orders %d and %d' % (self.order, other.order))
+            return other
+        coef = np.zeros((len(self.coef),) + np.shape(other))
+        coef[0] = other
+        return Jet(coef)
+
+    def _pair(self, other):
+        """
+        coefficients of self and other, broadcast against each other with the order kept as first axis
+        """
+        a, b = np.broadcast_arrays(np.moveaxis(self.coef, 0, -1), np.moveaxis(self._lift(other).coef, 0, -1))
+        return np.moveaxis(a, -1, 0), np.moveaxis(b, -1, 0)
+
+    def __add__(self, other):
+        """
+        add two Jet objects together
+
+        Attributes
+        ----------------------------------
+        other: int, float, np.array, or Jet
+          Jet object to add self to
+
+        Returns
+        ---------------------------------
+          Jet object with updated coefficients
+        """
+        a, b = self._pair(other)
+        return Jet(a + b)
+
+    def __radd__(self, other):
+        return self.__add__(other)
+
+    def __neg__(self):
+        return Jet(-self.coef)
+
+    def __sub__(self, other):
+        a, b = self._pair(other)
+        return Jet(a - b)
+
+    def __rsub__(self, other):
+        a, b = self._pair(other)
+        return Jet(b - a)
+
+    def __mul__(self, other):
+        """
+        multiply two Jet objects together, Cauchy product of the series
+
+        Attributes
+        ----------------------------------
+        other: int, float, np.array, or Jet
+          Jet object to multiply self with
+
+        Returns
+        ---------------------------------
+          Jet object with updated coefficients
+        """
+        a, b = self._pair(other)
+        if not isinstance(other, Jet):
+            return Jet(a * b[0])
+        return Jet([_conv(a, b, k) for k in range(len(a))])
+
+    def __rmul__(self, other):
+        return self.__mul__(other)
+
+    def __truediv__(self, other):
+        """
+        divide self by other, c_k = (a_k - sum_{j=1..k} b_j c_{k-j}) / b_0
+
+        Attributes
+        ----------------------------------
+        other: int, float, np.array, or Jet
+          denominator
+
+        Returns
+        ---------------------------------
+          Jet object with updated coefficients
+        """
+        a, b = self._pair(other)
+        if not isinstance(other, Jet):
+            return Jet(a / b[0])
+        c = []
+        for k in range(len(a)):
+            c.append((a[k] - sum(b[j] * c[k - j] for j in range(1, k + 1))) / b[0])
+        return Jet(c)
+
+    def __rtruediv__(self, other):
+        return self._lift(other).__truediv__(self)
+
+    def __pow__(self, exponent):
+        """
+        self to the power exponent. Constant exponents use y_k = 1/(k x_0) sum_{j=1..k} (r j - (k - j)) x_j y_{k-j},
+        non-negative integers repeated multiplication, which is also valid at x_0 = 0
+
+        Attributes
+        ----------------------------------
+        exponent: int, float, or Jet
+          exponent
+
+        Returns
+        ---------------------------------
+          Jet object with updated coefficients
+        """
+        if isinstance(exponent, Jet):
+            return Jet.exp(exponent * Jet.log(self))
+        r = float(exponent)
+        if r.is_integer() and r >= 0:
+            result, base, n = self._lift(1.0), self, int(r)
+            while n:
+                if n & 1:
+                    result = result * base
+                base, n = base * base, n >> 1
+            return result
+        x = self.coef
+        y = [x[0] ** r]
+        for k in range(1, len(x)):
+            y.append(sum((r * j - (k - j)) * x[j] * y[k - j] for j in range(1, k + 1)) / (k * x[0]))
+        return Jet(y)
+
+    def __rpow__(self, base):
+        return Jet.exp(self * np.log(base))
+
+    @staticmethod
+    def exp(other):
+        """
+        exponential of other, y' = y x'
+
+        Attributes
+        ----------------------------------
+        other: Jet
+          argument of exponential function
+
+        Returns
+        ---------------------------------
+          Jet object with updated coefficients
+        """
+        if not isinstance(other, Jet):
+            return np.exp(other)
+        return Jet(_integrate(other.coef, np.exp(other.coef[0]), lambda y, m: y[m]))
+
+    @staticmethod
+    def log(other):
+        """
+        natural logarithm of other, y_k = (x_k - 1/k sum_{j=1..k-1} j y_j x_{k-j}) / x_0
+        """
+        if not isinstance(other, Jet):
+            return np.log(other)
+        x = other.coef
+        y = [np.log(x[0])]
+        for k in range(1, len(x)):
+            y.append((x[k] - sum(j * y[j] * x[k - j] for j in range(1, k)) / k) / x[0])
+        return Jet(y)
+
+    @staticmethod
+    def _sincos(other, sign):
+        """
+        coefficients of s and c with s' = c x' and c' = sign s x', i.e. sin and cos (sign -1) or sinh and cosh (sign 1)
+        """
+        x = other.coef
+        if sign < 0:
+            s, c = [np.sin(x[0])], [np.cos(x[0])]
+        else:
+            s, c = [np.sinh(x[0])], [np.cosh(x[0])]
+        for k in range(1, len(x)):
+            s.append(sum(j * x[j] * c[k - j] for j in range(1, k + 1)) / k)
+            c.append(sign * sum(j * x[j] * s[k - j] for j in range(1, k + 1)) / k)
+        return Jet(s), Jet(c)
+
+    @staticmethod
+    def sin(other):
+        """
+        sine of other, computed together with the cosine
+        """
+        if not isinstance(other, Jet):
+            return np.sin(other)
+        return Jet._sincos(other, -1)[0]
+
+    @staticmethod
+    def cos(other):
+        """
+        cosine of other, computed together with the sine
+        """
+        if not isinstance(other, Jet):
+            return np.cos(other)
+        return Jet._sincos(other, -1)[1]
+
+    @staticmethod
+    def tan(other):
+        """
+        tangent of other, y' = (1 + y^2) x'
+        """
+        if not isinstance(other, Jet):
+            return np.tan(other)
+        if np.any(other.val % np.pi == (np.pi/2)):
+            raise ValueError('Cannot take tangents of multiples of pi/2 + (pi * n), where n is a positive integer')
+        return Jet(_integrate(other.coef, np.tan(other.coef[0]), lambda y, m: (m == 0) + _conv(y, y, m)))
+
+    @staticmethod
+    def sinh(other):
+        """
+        hyperbolic sine of other, computed together with the hyperbolic cosine
+        """
+        if not isinstance(other, Jet):
+            return np.sinh(other)
+        return Jet._sincos(other, 1)[0]
+
+    @staticmethod
+    def cosh(other):
+        """
+        hyperbolic cosine of other, computed together with the hyperbolic sine
+        """
+        if not isinstance(other, Jet):
+            return np.cosh(other)
+        return Jet._sincos(other, 1)[1]
+
+    @staticmethod
+    def tanh(other):
+        """
+        hyperbolic tangent of other, y' = (1 - y^2) x'
+        """
+        if not isinstance(other, Jet):
+            return np.tanh(other)
+        return Jet(_integrate(other.coef, np.tanh(other.coef[0]), lambda y, m: (m == 0) - _conv(y, y, m)))
+
+    @staticmethod
+    def logistic(other):
+        """
+        logistic of other, y' = y (1 - y) x'
+        """
+        if not isinstance(other, Jet):
+            return 1 / (1 + np.exp(-other))
+        return Jet(_integrate(other.coef, 1 / (1 + np.exp(-other.coef[0])), lambda y, m: y[m] - _conv(y, y, m)))
+
+    @staticmethod
+    def sqrt(other):
+        """
+        square root of other, y_k = (x_k - sum_{j=1..k-1} y_j y_{k-j}) / (2 y_0)
+        """
+        if np.any((other.val if isinstance(other, Jet) else other) < 0):
+            raise ValueError('Cannot take square roots of negative values')
+        if not isinstance(other, Jet):
+            return np.sqrt(other)
+        x = other.coef
+        y = [np.sqrt(x[0])]
+        for k in range(1, len(x)):
+            y.append((x[k] - _conv(y, y, k, start=1)) / (2 * y[0]))
+        return Jet(y)
+
+    @staticmethod
+    def arctan(other):
+        """
+        arctan of other, y' = x' / (1 + x^2)
+        """
+        if not isinstance(other, Jet):
+            return np.arctan(other)
+        g = (1 / (1 + other * other)).coef
+        return Jet(_integrate(other.coef, np.arctan(other.coef[0]), lambda y, m: g[m]))
+
+    @staticmethod
+    def arcsin(other):
+        """
+        arcsine of other, y' = x' / sqrt(1 - x^2)
+        """
+        if not isinstance(other, Jet):
+            return np.arcsin(other)
+        if np.any(other.val > 1) or np.any(other.val < -1):
+            raise ValueError('please use value between -1 and 1, inclusive')
+        g = (1 / Jet.sqrt(1 - other * other)).coef
+        return Jet(_integrate(other.coef, np.arcsin(other.coef[0]), lambda y, m: g[m]))
+
+    @staticmethod
+    def arccos(other):
+        """
+        arccos of other, y' = -x' / sqrt(1 - x^2)
+        """
+        if not isinstance(other, Jet):
+            return np.arccos(other)
+        if np.any(other.val > 1) or np.any(other.val < -1):
+            raise ValueError('please use value between -1 and 1, inclusive')
+        g = (-1 / Jet.sqrt(1 - other * other)).coef
+        return Jet(_integrate(other.coef, np.arccos(other.coef[0]), lambda y, m: g[m]))
+
+
+def taylor_derivatives(f, x, v, order):
+    """
+    Derivatives of order 0 to K of t -> f(x + t v) at t = 0, from one Taylor-mode pass
+
+    Attributes
+    ----------------------------------
+    f: callable
+      takes a 1-D array of n inputs and returns a number or a sequence of m numbers, elementary functions
+      called through NumPy (np.exp, np.sin, ...) or Jet
+    x: array-like of shape (n,)
+      point at which the derivatives are evaluated
+    v: array-like of shape (n,)
+      direction of the derivatives
+    order: int
+      highest order K
+
+    Returns
+    ---------------------------------
+      np.array of shape (K+1,) for scalar functions, (K+1, m) otherwise
+
+    Examples
+    ========
+    >>> taylor_derivatives(lambda x: np.exp(x[0]*x[1]), [0, 1], [1, 1], 4)
+    array([ 1.,  1.,  3.,  7., 25.])
+    """
+    x = np.asarray(x, dtype=float).ravel()
+    v = np.asarray(v, dtype=float).ravel()
+    if len(v) != len(x):
+        raise ValueError('expected a direction with %d entries, got %d' % (len(x), len(v)))
+    y = f(_as_objects([Jet.variable(a, order, d) for a, d in zip(x, v)]))
+    outs = _outputs(y)
+    result = np.zeros((order + 1, len(outs)))
+    for i, out in enumerate(outs):
+        if isinstance(out, Jet):
+            result[:, i] = out.derivatives()
+        else:
+            result[0, i] = out
+    if isinstance(y, Jet) or np.ndim(y) == 0:
+        return result[:, 0]
+    return result
@@ -2,6 +2,15 @@
 
 tests=(
     test_AutoDiff.py
+    test_tape.py
+    test_drivers.py
+    test_plan.py
+    test_codegen.py
+    test_checkpoint.py
+    test_taylor.py
+    test_sparse.py
+    test_parallel.py
+    test_profiler.py
 )
 
 
@@ -36,6 +36,12 @@ def test_eq():
     y3 = 10/DualNum(1,1)
     print(y1 == y2, y1 != y3, y1 == 1)
 
+def test_dualnum_ordering():
+    x=DualNum(2.0, 1.0)
+    assert x > 1 and x >= 2 and x < 3 and x <= DualNum(2.0, 5.0) and not x < DualNum(1.0, 0.0)
+    y=DualNum(7.0, 3.0) % 5
+    assert y.val == 2 and y.der == 3
+
 def test_ne():
     y1=2*DualNum.sin(DualNum(0,1))+3
     y3 = 10/DualNum(1,1)
@@ -97,6 +103,16 @@ def test_radd_rmul_rsub_rpow():
     y4=2**x2
     assert y1.val == 4 and y2.val == 4 and y3.val == 0 and y4.val == 4
 
+def test_node_subtraction():
+    x1=Node(2)
+    x2=Node(3)
+    y=x1-x2*x1-(-x2)
+    y.reverse()
+    assert y.val == -1 and y.getgrad(x1) == -2 and y.getgrad(x2) == -1
+    z=5-x1*x2
+    z.reverse()
+    assert z.val == -1 and z.getgrad(x1) == -3
+
 def test_pow(): 
     x1=Node(1)
     x2=Node(2)
@@ -173,3 +189,276 @@ def test_sqrt2():
         x1=Node(-1)
         y1=4*Node.sqrt(x1)
 
+
+def test_reverse_shared_subexpressions():
+    # exponential number of paths through the graph, linear number of nodes
+    x=Node(0.01)
+    y=x
+    for _ in range(30):
+        y=y*y+y
+    y.reverse()
+    xd=DualNum(0.01,1)
+    yd=xd
+    for _ in range(30):
+        yd=yd*yd+yd
+    assert np.isclose(y.val, yd.val) and np.isclose(y.getgrad(x), yd.der)
+
+def test_reverse_same_parent_twice():
+    x1=Node(3)
+    y=x1*x1+Node.sin(x1)
+    y.reverse()
+    assert np.isclose(y.getgrad(x1), 2*3+np.cos(3))
+
+def test_reverse_deep_chain():
+    # far deeper than the interpreter recursion limit
+    x=Node(0.1)
+    y=x
+    for _ in range(50000):
+        y=y*1+0.5
+    y.reverse()
+    assert y.getgrad(x) == 1 and y.val == 0.1+25000
+
+class _DictNode:
+    # layout of Node before __slots__: instance __dict__, der dict and grad dict on every Node
+    def __init__(self, val, parent1=None, parent2=None, der={}):
+        self.val=val
+        self.parent1=parent1
+        self.parent2=parent2
+        self.der=der
+        self.grad={}
+
+def _bytes_per_node(make, n=20000):
+    import tracemalloc
+    tracemalloc.start()
+    before=tracemalloc.get_traced_memory()[0]
+    nodes=make(n)
+    after=tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return (after-before)/len(nodes)
+
+def test_node_memory():
+    def dict_nodes(n):
+        x=_DictNode(0.5)
+        nodes=[x]
+        for i in range(n):
+            nodes.append(_DictNode(1.5, parent1=nodes[-1], parent2=x, der={"1": 0.5, "2": 1.5}))
+        return nodes
+    def slot_nodes(n):
+        x=Node(0.5)
+        nodes=[x]
+        for i in range(n):
+            nodes.append(nodes[-1]*x)
+        return nodes
+    before=_bytes_per_node(dict_nodes)
+    after=_bytes_per_node(slot_nodes)
+    print('bytes per Node: %.0f with __dict__, %.0f with __slots__' % (before, after))
+    assert after < before/2
+    x=Node(2)
+    y=x*3
+    assert y.der == {"1": 3, "2": 2} and x.der == {}
+    with pytest.raises(AttributeError):
+        y.other=1
+
+def _dual_all_functions(x):
+    return (DualNum.sin(x)*DualNum.cos(x)+DualNum.tan(x)/2+DualNum.exp(x)-DualNum.log(x+2)
+            +DualNum.arcsin(x/2)*DualNum.arccos(x/3)+DualNum.arctan(x)+DualNum.sinh(x)-DualNum.cosh(x)
+            +DualNum.tanh(x)+DualNum.logistic(x)+DualNum.sqrt(x+1)+(x+1)**3/(1+x**2)+2**x)
+
+def test_dual_batch_matches_scalar():
+    points=np.linspace(-0.9, 0.9, 101)
+    batch=_dual_all_functions(DualNum(points, 1))
+    assert batch.val.shape == (101,) and batch.der.shape == (101,)
+    for i in [0, 17, 50, 100]:
+        y=_dual_all_functions(DualNum(points[i], 1))
+        assert np.isclose(batch.val[i], y.val) and np.isclose(batch.der[i], y.der)
+
+def test_dual_chain_rule_arc():
+    x=DualNum(0.25, 2)
+    assert np.isclose(DualNum.arcsin(x).der, 2/np.sqrt(1-0.25**2))
+    assert np.isclose(DualNum.arccos(x).der, -2/np.sqrt(1-0.25**2))
+    assert np.isclose(DualNum.tan(x).der, 2/np.cos(0.25)**2)
+
+def test_dual_batch_broadcast_and_domain():
+    x=DualNum([1.0, 2.0, 3.0], 1)
+    y=np.array([2.0, 2.0, 2.0])*x+np.ones(3)
+    assert isinstance(y, DualNum) and np.array_equal(y.val, [3, 5, 7]) and np.array_equal(y.der, [2, 2, 2])
+    assert y == 2*x+1
+    with pytest.raises(ValueError):
+        DualNum.arcsin(DualNum([0.5, 1.5], 1))
+    with pytest.raises(ValueError):
+        DualNum.sqrt(DualNum([1.0, -1.0], 1))
+    with pytest.raises(ValueError):
+        DualNum.tan(DualNum([0, np.pi/2], 1))
+
+def test_dual_multidirectional_gradient():
+    def f(x):
+        return [x[0]*x[1]+DualNum.exp(x[0]*x[2]), x[0]+x[1]**2-DualNum.sin(x[2]), x[0]/x[1]+15]
+    point=[1.0, 2.0, 0.5]
+    jac=DualNumVec(f(DualNum.variables(point))).getjacobian()
+    for i in range(3):
+        seed=np.eye(1, 3, i)[0]
+        y=DualNumVec(f([DualNum(point[j], seed[j]) for j in range(3)]))
+        assert np.allclose(jac[:, i], y.getgrad())
+    # block of two directions
+    seeds=np.array([[1, 1], [0, 2], [1, 0]])
+    x=DualNum.variables(point, seeds)
+    assert np.allclose(DualNumVec(f(x)).getjacobian(), jac @ seeds)
+
+def test_dual_seed_batched():
+    x1=DualNum([1.0, 2.0, 3.0], 1, seed=[1, 0])
+    x2=DualNum([4.0, 5.0, 6.0], 1, seed=[0, 1])
+    y=x1*x2+3
+    assert y.der.shape == (2, 3)
+    assert np.array_equal(y.der[0], [4, 5, 6]) and np.array_equal(y.der[1], [1, 2, 3])
+    assert DualNumVec([y, 2]).getjacobian().shape == (2, 2, 3)
+
+def test_dual_batch_and_directions():
+    # a batch of N values with k directions: der keeps the k directions in front for any N
+    x1, x2, x3=DualNum.variables([1., 2., 3.])
+    y=(x1+np.array([10., 20., 30.]))*x2
+    assert np.array_equal(y.val, [22, 42, 62])
+    assert np.array_equal(y.der, [[2, 2, 2], [11, 21, 31], [0, 0, 0]])
+    c=np.array([1., 2., 3., 4.])
+    x1, x2=DualNum.variables([0.5, 2.])
+    for y, der in [(x1*c+x2, [c, np.ones(4)]), (c-x1/x2, [-np.ones(4)/2, np.full(4, 0.125)]),
+                   (c**x1*x2, [np.log(c)*c**0.5*2, c**0.5]), (x2**c, [np.zeros(4), c*2**(c-1)])]:
+        assert y.der.shape == (2, 4) and np.allclose(y.der, der)
+    # batched variables of different shapes broadcast their value axes, not the directions
+    x1=DualNum([1., 2.], 1, seed=[1, 0])
+    x2=DualNum([[3.], [4.], [5.]], 1, seed=[0, 1])
+    y=x1*x2
+    assert y.der.shape == (2, 3, 2)
+    assert np.array_equal(y.der[0], np.broadcast_to([[3.], [4.], [5.]], (3, 2)))
+    assert np.array_equal(y.der[1], np.broadcast_to([1., 2.], (3, 2)))
+
+def test_dual_constant_operands():
+    x=DualNum(1.5, 2.0)
+    for c in [3, 2.5, np.float64(0.5), np.array(4.0)]:
+        for y, val, der in [(x+c, 1.5+c, 2), (c+x, 1.5+c, 2), (x-c, 1.5-c, 2), (c-x, c-1.5, -2),
+                            (x*c, 1.5*c, 2*c), (c*x, 1.5*c, 2*c), (x/c, 1.5/c, 2/c), (c/x, c/1.5, -2*c/1.5**2),
+                            (x**c, 1.5**c, 2*c*1.5**(c-1)), (c**x, c**1.5, 2*c**1.5*np.log(c))]:
+            assert isinstance(y, DualNum) and np.isclose(y.val, val) and np.isclose(y.der, der)
+    y=DualNum([1.0, 2.0], 1)+[1, 2]
+    assert np.array_equal(y.val, [2, 4])
+    # other operands are left to their own class
+    assert isinstance(x*Node(2.0), Node) and isinstance(Node(2.0)-x, Node)
+    with pytest.raises(TypeError):
+        x+'a'
+    # arrays of DualNum are not constants, they are left to NumPy to apply elementwise
+    objects=np.empty(2, dtype=object)
+    objects[:]=[DualNum(1.0, 1.0), DualNum(2.0, 0.0)]
+    for op in ['__add__', '__sub__', '__rsub__', '__mul__', '__truediv__', '__rtruediv__', '__pow__', '__rpow__']:
+        assert getattr(x, op)(objects) is NotImplemented
+    assert x.__add__(list(objects)) is NotImplemented
+
+def test_node_constant_operands():
+    x=Node(1.5)
+    for c in [3, 2.5, np.float64(0.5)]:
+        for y, der in [(x+c, 1), (c+x, 1), (x-c, 1), (c-x, -1), (x*c, c), (c*x, c), (x/c, 1/c),
+                       (c/x, -c/1.5**2), (x**c, c*1.5**(c-1)), (c**x, c**1.5*np.log(c))]:
+            y.reverse()
+            assert np.isclose(y.getgrad(x), der)
+        assert (x*c).parent2.op == 'const' and (x*c).parent2.val == c
+
+def test_node_stats():
+    x1, x2=Node(1), Node(2)
+    stats=(x1*x2+Node.exp(x1*x2)).stats()
+    assert (stats['nodes'], stats['edges'], stats['leaves'], stats['max_depth'], stats['shared']) == (6, 7, 2, 3, 2)
+    assert stats['fan_out'] == {0: 1, 1: 3, 2: 2} and stats['memory_bytes'] > 0
+    # unrolled loop, depth grows linearly and constants are counted
+    y=x1
+    for _ in range(50):
+        y=0.5*y+1
+    stats=y.stats()
+    assert stats['max_depth'] == 100 and stats['constants'] == 100 and stats['variables'] == 1
+    # entries sharing a graph count it once
+    xs=[Node(v) for v in range(5)]
+    s=sum(xs[1:], xs[0])
+    stats=NodeVec([s*x for x in xs]).stats()
+    assert stats['nodes'] == 5+4+5 and stats['fan_out'][0] == 5 and stats['shared'] == 6
+    assert Node(3).stats()['nodes'] == 1
+
+def test_node_reverse_release_graph():
+    x1, x2=Node(1), Node(2)
+    z=x1*x2
+    y=z+Node.exp(z)+3
+    grad=y.reverse(retain_graph=False)
+    assert set(grad) == {x1, x2}
+    assert np.isclose(y.getgrad(x1), 2+2*np.exp(2)) and np.isclose(y.getgrad(x2), 1+np.exp(2))
+    assert y.parent1 is None and z.parent1 is None and z.der1 is None
+    assert y.stats()['nodes'] == 1
+    # released Nodes keep their values and can start a new graph
+    w=z*x1
+    w.reverse()
+    assert w.getgrad(z) == 1 and w.getgrad(x1) == 2
+    # entries of a vector function share their graph
+    s=x1*x2
+    f=NodeVec([s+x1, s*x2])
+    f.reverse(retain_graph=False)
+    assert f.getgrad(1, x1) == 3 and f.getgrad(2, x2) == 4 and set(f.jacobian[1]) == {x1, x2}
+    assert s.parent1 is None
+
+def test_node_reverse_variables_array():
+    xs=Node.variables(np.array([[1.0], [2.0]]))
+    assert len(xs) == 2 and all(x.parent1 is None and x.op is None for x in xs)
+    x1, x2=xs
+    y=x1*x2+Node.exp(x1*x2)
+    g=y.reverse(variables=xs)
+    assert g.dtype == np.float64 and np.allclose(g, [2+2*np.exp(2), 1+np.exp(2)])
+    # the grad dict is not touched and repeated calls do not accumulate
+    assert y._grad is None and np.allclose(y.reverse(variables=xs), g)
+    # variables the output does not depend on get zeros
+    z=Node(5.0)
+    assert np.array_equal((x1*3).reverse(variables=[x1, z, x2]), [3, 0, 0])
+    f=NodeVec([y, x1+x2**2, x1/x2+15, 3.0])
+    J=f.reverse(variables=xs)
+    assert J.shape == (4, 2) and f.jacobian is J
+    assert np.allclose(J, [[2+2*np.exp(2), 1+np.exp(2)], [1, 4], [0.5, -0.25], [0, 0]])
+    assert f.getgrad(2, x2) == 4
+    with pytest.raises(KeyError):
+        f.getgrad(1, z)
+    # same Jacobian as the dict path
+    g=NodeVec([y, x1+x2**2, x1/x2+15])
+    g.reverse()
+    assert all(np.isclose(g.getgrad(i+1, v), J[i, j]) for i in range(3) for j, v in enumerate(xs))
+    f.reverse(retain_graph=False, variables=xs)
+    assert y.parent1 is None
+
+def test_node_reverse_reentrant():
+    x1, x2=Node(1.0), Node(2.0)
+    y=x1*x2+Node.exp(x1*x2)
+    first=y.reverse()
+    second=y.reverse()
+    assert first is not second and second[x1] == first[x1] == 2+2*np.exp(2) and y.getgrad(x1) == first[x1]
+    # an output listed twice gets the same row twice
+    assert np.allclose(jacobian(lambda x: [x[0]*x[1]]*2, [1.0, 2.0], mode='reverse'), [[2, 1], [2, 1]])
+    f=NodeVec([y, y])
+    f.reverse()
+    f.reverse()
+    assert f.getgrad(1, x2) == f.getgrad(2, x2) == 1+np.exp(2)
+
+def test_node_reverse_threads():
+    from concurrent.futures import ThreadPoolExecutor
+    xs=[Node(0.1*i) for i in range(1, 21)]
+    # graphs sharing leaves and intermediates, swept many times concurrently
+    s=sum(x*x for x in xs)
+    outs=[s*x+Node.sin(x) for x in xs]
+    expected=[out.reverse() for out in outs]
+    def sweep(k):
+        return outs[k % len(outs)].reverse()
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        results=list(pool.map(sweep, range(200)))
+    for k, grad in enumerate(results):
+        ref=expected[k % len(outs)]
+        assert all(grad[x] == ref[x] for x in xs)
+    # the last sweep wins, the grad of a Node is always one complete gradient
+    assert all(outs[k].grad[x] == expected[k][x] for k in range(len(outs)) for x in xs)
+    # jacobian and its columns are replaced together, whatever the order of the variables of each call
+    f=NodeVec(outs[:3])
+    def sweep_vec(k):
+        f.reverse(variables=xs if k % 2 else xs[::-1])
+        return [f.getgrad(i+1, x) for i in range(3) for x in xs]
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        results=list(pool.map(sweep_vec, range(100)))
+    ref=[expected[i][x] for i in range(3) for x in xs]
+    assert all(np.allclose(row, ref) for row in results)
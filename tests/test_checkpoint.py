@@ -0,0 +1,54 @@
+from src.autodiff import *
+import pytest
+import tracemalloc
+
+
+def step(x, k):
+    # damped pendulum, the parameter x[2] is carried unchanged
+    return [x[0]+0.01*x[1], x[1]-0.01*(np.sin(x[0])+x[2]*x[1]), x[2]]
+
+def unrolled(nsteps):
+    def f(x):
+        for k in range(nsteps):
+            x=step(x, k)
+        return x[0]**2+np.exp(x[1])
+    return f
+
+def test_checkpoint_schedule():
+    assert checkpoint_schedule(10) == [0, 2, 5, 7]
+    assert checkpoint_schedule(10, 1) == [0]
+    assert checkpoint_schedule(10, 50) == list(range(10))
+    assert checkpoint_schedule(0) == [0]
+    with pytest.raises(ValueError):
+        checkpoint_schedule(10, 0)
+
+def test_checkpointed_gradient():
+    x0=[0.8, -0.3, 0.2]
+    expected=gradient(unrolled(60), x0)
+    for checkpoints in [None, 1, 7, 60, 100]:
+        grad=checkpointed_gradient(step, x0, 60, loss=lambda x: x[0]**2+np.exp(x[1]), checkpoints=checkpoints)
+        assert np.allclose(grad, expected)
+
+def test_checkpointed_gradient_scalar_state():
+    grad=checkpointed_gradient(lambda x, k: [x[0]*(k+1.0)], [2.0], 5)
+    assert np.allclose(grad, [120])
+    assert np.allclose(checkpointed_gradient(lambda x, k: x, [2.0], 0), [1])
+    # entries that do not depend on the state have no derivative
+    assert np.allclose(checkpointed_gradient(lambda x, k: [1.0, x[0]], [2.0, 3.0], 3, loss=lambda x: x[0]*x[1]), [0, 0])
+    with pytest.raises(ValueError):
+        checkpointed_gradient(step, [0.8, -0.3, 0.2], 5)
+    with pytest.raises(ValueError):
+        checkpointed_gradient(lambda x, k: [x[0]], [0.8, -0.3], 5, loss=np.sum)
+
+def test_checkpointed_gradient_memory():
+    x0=[0.8, -0.3, 0.2]
+    loss=lambda x: x[0]**2+np.exp(x[1])
+    def peak(run):
+        tracemalloc.start()
+        run()
+        peak=tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        return peak
+    full=peak(lambda: gradient(unrolled(2000), x0, mode='reverse'))
+    checkpointed=peak(lambda: checkpointed_gradient(step, x0, 2000, loss=loss))
+    assert checkpointed < full/5
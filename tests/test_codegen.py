@@ -0,0 +1,77 @@
+from src.autodiff import *
+import pytest
+
+
+def f_all(x):
+    return [x[0]*x[1]-np.exp(x[0]*x[1])+np.sin(x[2])/x[1]-2**x[0],
+            np.log(x[0])-np.cos(x[1])*np.tan(x[2])+np.sqrt(x[0])-3/x[1],
+            np.arcsin(x[2])-np.arccos(x[2]/2)+np.arctan(x[1])+x[1]**x[0],
+            np.sinh(x[0])-np.cosh(x[1])+np.tanh(x[2])-x[2]**2+1/(1+np.exp(-x[0])),
+            x[1],
+            7]
+
+def test_compiled_matches_plan(tmp_path):
+    plan=Plan.from_function(f_all, [1.2, 0.7, 0.3])
+    compiled=compile_plan(plan, cache_dir=str(tmp_path))
+    for x in ([1.2, 0.7, 0.3], [0.5, 1.5, -0.4]):
+        assert np.allclose(compiled(x), plan.forward(x))
+        assert np.allclose(compiled.jacobian(x), plan.jacobian(x))
+    assert 'Node' not in compiled.source and 'def jacobian(x):' in compiled.source
+
+def _count_traces(monkeypatch):
+    # values read by the traced function are part of its key, so traces are counted from outside
+    calls=[]
+    trace=Plan.from_function
+    monkeypatch.setattr(Plan, 'from_function', lambda f, x: calls.append(1) or trace(f, x))
+    return calls
+
+def test_compile_function_warm_cache(tmp_path, monkeypatch):
+    calls=_count_traces(monkeypatch)
+    def rosenbrock(x):
+        return np.sum(100*(x[1:]-x[:-1]**2)**2+(1-x[:-1])**2)
+    x=np.array([-1.2, 1.0, 0.5, 2.0])
+    cold=compile_function(rosenbrock, x, cache_dir=str(tmp_path))
+    warm=compile_function(rosenbrock, 2*x, cache_dir=str(tmp_path))
+    assert len(calls) == 1 and warm.path == cold.path
+    assert np.allclose(warm.gradient(2*x), gradient(rosenbrock, 2*x))
+    with pytest.raises(ValueError):
+        warm.gradient([1, 2])
+
+def test_graph_hash():
+    p1=Plan.from_function(lambda x: x[0]*2+x[1], [1, 2])
+    p2=Plan.from_function(lambda x: x[0]*2+x[1], [3, 4])
+    p3=Plan.from_function(lambda x: x[0]*3+x[1], [1, 2])
+    assert graph_hash(p1) == graph_hash(p2) != graph_hash(p3)
+    assert function_key(lambda x: x[0]*2, (2,)) != function_key(lambda x: x[0]*3, (2,))
+
+def test_function_key_defaults_and_arrays(tmp_path, monkeypatch):
+    calls=_count_traces(monkeypatch)
+    cache=str(tmp_path)
+    g2=compile_function(lambda x, a=2.0: a*x[0], [1.0], cache_dir=cache)
+    g3=compile_function(lambda x, a=3.0: a*x[0], [1.0], cache_dir=cache)
+    assert len(calls) == 2 and g2.gradient([1.0]) == 2 and g3.gradient([1.0]) == 3
+    # arrays whose repr is truncated
+    def weighted(w):
+        return lambda x: np.sum(w*x)
+    w=np.ones(5000)
+    v=w.copy()
+    v[2500]=7.0
+    assert repr(w) == repr(v)
+    gw=compile_function(weighted(w), np.ones(5000), cache_dir=cache)
+    gv=compile_function(weighted(v), np.ones(5000), cache_dir=cache)
+    assert len(calls) == 4 and gv.gradient(np.ones(5000))[2500] == 7 and gw.gradient(np.ones(5000))[2500] == 1
+    compile_function(weighted(v.copy()), np.ones(5000), cache_dir=cache)
+    assert len(calls) == 4
+    # values that cannot be fingerprinted skip the function cache
+    scale=Node(2.0)
+    assert function_key(lambda x: scale.val*x[0], (1,)) is None
+    compile_function(lambda x: scale.val*x[0], [1.0], cache_dir=cache)
+    compile_function(lambda x: scale.val*x[0], [1.0], cache_dir=cache)
+    assert len(calls) == 6
+
+def test_non_finite_constants(tmp_path):
+    f=lambda x: [x[0]+np.inf, x[1]*np.nan, x[0]-np.inf]
+    compiled=compile_plan(Plan.from_function(f, [1.0, 2.0]), cache_dir=str(tmp_path))
+    values=compiled([1.0, 2.0])
+    assert values[0] == np.inf and np.isnan(values[1]) and values[2] == -np.inf
+    assert compiled.jacobian([1.0, 2.0])[0, 0] == 1
@@ -0,0 +1,149 @@
+from src.autodiff import *
+import pytest
+
+
+def f_all(x):
+    return [x[0]*x[1]-np.exp(x[0]*x[1])+np.sin(x[2])/x[1],
+            np.log(x[0])-np.cos(x[1])*np.tan(x[2])+np.sqrt(x[0]),
+            np.arcsin(x[2])-np.arccos(x[2]/2)+np.arctan(x[1]),
+            np.sinh(x[0])-np.cosh(x[1])+np.tanh(x[2])-x[2]**2,
+            5-x[0],
+            7]
+
+def f_all_jacobian(x):
+    a, b, c=x
+    return np.array([
+        [b-b*np.exp(a*b), a-a*np.exp(a*b)-np.sin(c)/b**2, np.cos(c)/b],
+        [1/a+0.5/np.sqrt(a), np.sin(b)*np.tan(c), -np.cos(b)/np.cos(c)**2],
+        [0, 1/(1+b**2), 1/np.sqrt(1-c**2)+0.5/np.sqrt(1-c**2/4)],
+        [np.cosh(a), -np.sinh(b), 1-np.tanh(c)**2-2*c],
+        [-1, 0, 0],
+        [0, 0, 0]])
+
+@pytest.mark.parametrize('mode', ['forward', 'reverse', 'auto'])
+def test_jacobian_modes(mode):
+    x=np.array([1.2, 0.7, 0.3])
+    assert np.allclose(jacobian(f_all, x, mode=mode), f_all_jacobian(x))
+
+@pytest.mark.parametrize('mode', ['forward', 'reverse', 'auto'])
+def test_gradient_modes(mode):
+    def rosenbrock(x):
+        return np.sum(100*(x[1:]-x[:-1]**2)**2+(1-x[:-1])**2)
+    x=np.array([-1.2, 1.0, 0.5, 2.0])
+    expected=np.array([-215.6, 112, -451, 350])
+    assert np.allclose(gradient(rosenbrock, x, mode=mode), expected)
+
+def test_identity_output():
+    assert np.array_equal(jacobian(lambda x: [x[1], x[0]], [1, 2], mode='reverse'), [[0, 1], [1, 0]])
+    assert np.array_equal(jacobian(lambda x: [x[1], x[0]], [1, 2], mode='forward'), [[0, 1], [1, 0]])
+
+def test_choose_mode():
+    assert choose_mode(2, 5) == 'forward' and choose_mode(50, 1) == 'reverse'
+
+def test_driver_errors():
+    with pytest.raises(ValueError):
+        gradient(lambda x: [x[0], x[1]], [1, 2])
+    with pytest.raises(ValueError):
+        jacobian(lambda x: x[0], [1], mode='sideways')
+
+def test_hvp():
+    f=lambda x: np.exp(x[0]*x[1])*np.sin(x[2])+np.log(x[0])*x[2]**3-x[1]/x[2]+np.sqrt(x[1])
+    x=np.array([0.7, 1.3, 0.4])
+    H=np.zeros((3, 3))
+    for j in range(3):
+        e=np.eye(3)[j]*1e-6
+        H[:, j]=(gradient(f, x+e)-gradient(f, x-e))/2e-6
+    v=np.array([0.3, -1.0, 2.0])
+    assert np.allclose(hvp(f, x, v), H@v, atol=1e-5)
+    V=np.random.default_rng(0).normal(size=(3, 4))
+    assert hvp(f, x, V).shape == (3, 4)
+    assert np.allclose(hvp(f, x, V), H@V, atol=1e-5)
+
+def test_hvp_domains_and_constants():
+    # branches and domain checks of Node compare DualNum values
+    f=lambda x: np.arcsin(x[0]/2)+np.arccos(x[1]/3)+np.tan(x[0])+x[0]**x[1]+x[1]**0.5
+    x=np.array([0.6, 1.2])
+    v=np.array([1.0, 0.5])
+    e=1e-6*v
+    assert np.allclose(hvp(f, x, v), (gradient(f, x+e)-gradient(f, x-e))/2e-6, atol=1e-5)
+    assert np.allclose(hvp(lambda x: 3*x[0]-x[1], x, v), 0)
+    assert np.allclose(hvp(lambda x: 2.0, x, v), 0)
+    with pytest.raises(ValueError):
+        hvp(lambda x: [x[0], x[1]], x, v)
+    with pytest.raises(ValueError):
+        hvp(f, x, [1.0])
+    with pytest.raises(ValueError):
+        hvp(lambda x: np.tan(x[0]), [np.pi/2], [1.0])
+
+def test_vjp():
+    x=np.array([0.7, 1.3, 0.4])
+    J=jacobian(f_all, x)
+    xs=Node.variables(x)
+    outs=f_all(xs)
+    w=np.array([0.5, -2.0, 3.0, 1.0, -1.0, 2.0])
+    assert np.allclose(vjp(outs, w, xs), w@J)
+    W=np.random.default_rng(1).normal(size=(len(outs), 4))
+    assert vjp(outs, W, xs).shape == (3, 4)
+    assert np.allclose(vjp(NodeVec(outs), W, xs), J.T@W)
+    assert np.allclose(vjp(outs, np.eye(len(outs)), xs), J.T)
+    # dict of the variables, constants outputs and unused variables
+    z=Node(1.0)
+    grad=vjp([xs[0]*xs[1], 4.0, xs[0]], [2.0, 5.0, 1.0])
+    assert set(grad) == {xs[0], xs[1]} and grad[xs[0]] == 2*1.3+1
+    assert np.array_equal(vjp(xs[2]*3, [2.0], [xs[2], z]), [6, 0])
+    with pytest.raises(ValueError):
+        vjp(outs, [1.0], xs)
+
+def test_jvp():
+    x=np.array([0.7, 1.3, 0.4])
+    J=jacobian(f_all, x)
+    v=np.array([0.3, -1.0, 2.0])
+    value, jv=jvp(f_all, x, v)
+    assert np.allclose(value, [float(y) for y in f_all(x)]) and np.allclose(jv, J@v)
+    V=np.random.default_rng(2).normal(size=(3, 5))
+    value, jv=jvp(f_all, x, V)
+    assert jv.shape == (6, 5) and np.allclose(jv, J@V)
+    # results written into the given buffers
+    out=(np.empty(6), np.empty(6))
+    value, jv=jvp(f_all, x, v, out=out)
+    assert value is out[0] and jv is out[1] and np.allclose(jv, J@v)
+    # Newton iteration solving f(x)=0 with the products only, Jacobian columns from unit directions
+    f=lambda x: [x[0]**2+x[1]-3, x[0]-np.exp(x[1])+1]
+    x=np.array([1.0, 0.5])
+    buffers=(np.empty(2), np.empty(2))
+    for _ in range(20):
+        fx=jvp(f, x, np.zeros(2), out=buffers)[0].copy()
+        J=np.column_stack([jvp(f, x, e)[1] for e in np.eye(2)])
+        x=x-np.linalg.solve(J, fx)
+    assert np.allclose(jvp(f, x, [1.0, 0.0])[0], 0)
+    with pytest.raises(ValueError):
+        jvp(f_all, x, [1.0])
+    with pytest.raises(ValueError):
+        jvp(f_all, [0.7, 1.3, 0.4], v, out=(np.empty(2), np.empty(2)))
+
+def test_vjp_single_output_and_leaves():
+    x1, x2=Node(1.5), Node(2.0)
+    y=(x1*3+2)*x2
+    grad=vjp(y, 1.0)
+    assert np.isclose(grad[x1], 6) and np.isclose(grad[x2], 6.5)
+    assert np.allclose(vjp(y, 2.0, [x1, x2]), [12, 13])
+    # same variables as a released reverse sweep, constants excluded from both
+    assert grad == y.reverse(retain_graph=False)
+    # Nodes released by a previous sweep are variables for both
+    w=y*x1+4
+    grad=vjp(w, 1.0)
+    assert set(grad) == {y, x1} and grad == w.reverse(retain_graph=False)
+
+def test_array_scalar_mixing():
+    # entries of the input vector combined with the whole vector, NumPy style
+    f=lambda x: x*x[0]-x[1]/x+x**x[0]+2**x[1]*x+(x[0]-x)
+    x=np.array([1.3, 0.7, 2.1])
+    J=np.zeros((3, 3))
+    for j in range(3):
+        e=np.eye(3)[j]*1e-6
+        J[:, j]=(np.array(f(x+e))-np.array(f(x-e)))/2e-6
+    for mode in ['forward', 'reverse']:
+        assert np.allclose(jacobian(lambda x: x[0]+x, [1.0, 2.0], mode=mode), [[2, 0], [1, 1]])
+        assert np.allclose(jacobian(lambda x: x[0]*x, [1.0, 2.0], mode=mode), [[2, 0], [2, 1]])
+        assert np.allclose(jacobian(f, x, mode=mode), J, atol=1e-5)
+        assert np.allclose(gradient(lambda x: np.sum(x[0]*x), [1.0, 2.0], mode=mode), [4, 1])
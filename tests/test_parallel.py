@@ -0,0 +1,42 @@
+from src.autodiff import *
+import pytest
+
+
+def f_vec(x):
+    return [np.sum(x*x), np.exp(x[0])*np.sin(x[-1]), 3.0, x[1]/x[2]]
+
+def test_parallel_jacobian():
+    x=np.linspace(0.5, 2, 7)
+    expected=jacobian(f_vec, x)
+    for workers, chunk_size in [(1, None), (2, None), (3, 2), (4, 1), (2, 100)]:
+        J=parallel_jacobian(f_vec, x, workers=workers, chunk_size=chunk_size)
+        assert J.shape == (4, 7)
+        assert np.allclose(J, expected)
+    # no input
+    assert parallel_jacobian(lambda x: [1.0, 2.0, 3.0], np.zeros(0), workers=2).shape == (3, 0)
+
+def test_parallel_jacobian_errors():
+    with pytest.raises(ValueError):
+        parallel_jacobian(f_vec, [1, 2, 3], workers=0)
+    with pytest.raises(ValueError):
+        parallel_jacobian(f_vec, [1, 2, 3], chunk_size=0)
+
+def rosenbrock(x):
+    return np.sum(100*(x[1:]-x[:-1]**2)**2+(1-x[:-1])**2)
+
+def test_grad_map():
+    X=np.random.default_rng(1).normal(size=(23, 4))
+    expected=np.array([gradient(rosenbrock, x) for x in X])
+    for workers, chunk_size, pool in [(1, None, 'process'), (3, 4, 'process'), (2, None, 'thread'), (4, 1, 'thread')]:
+        G=grad_map(rosenbrock, X, workers=workers, chunk_size=chunk_size, pool=pool)
+        assert G.shape == (23, 4)
+        assert np.allclose(G, expected)
+    # threads accept callables that cannot be pickled
+    assert np.allclose(grad_map(lambda x: x[0]*x[1], X[:, :2], workers=2, pool='thread'), X[:, 1::-1])
+    assert grad_map(rosenbrock, np.zeros((0, 4))).shape == (0, 4)
+
+def test_grad_map_errors():
+    with pytest.raises(ValueError):
+        grad_map(rosenbrock, np.ones(4))
+    with pytest.raises(ValueError):
+        grad_map(rosenbrock, np.ones((2, 4)), pool='gpu')
@@ -0,0 +1,101 @@
+from src.autodiff import *
+import pytest
+
+
+def f_all(x):
+    return [x[0]*x[1]-np.exp(x[0]*x[1])+np.sin(x[2])/x[1]-2**x[0],
+            np.log(x[0])-np.cos(x[1])*np.tan(x[2])+np.sqrt(x[0])-3/x[1],
+            np.arcsin(x[2])-np.arccos(x[2]/2)+np.arctan(x[1])+x[1]**x[0],
+            np.sinh(x[0])-np.cosh(x[1])+np.tanh(x[2])-x[2]**2+1/(1+np.exp(-x[0])),
+            5-x[0],
+            7]
+
+def test_plan_matches_fresh_graph():
+    plan=Plan.from_function(f_all, [1.2, 0.7, 0.3])
+    for x in ([1.2, 0.7, 0.3], [0.5, 1.5, -0.4], [2.0, 0.2, 0.9]):
+        assert np.allclose(plan.forward(x), [y.val if isinstance(y, Node) else y for y in f_all([Node(v) for v in x])])
+        assert np.allclose(plan.jacobian(x), jacobian(f_all, x, mode='forward'))
+
+def test_traced_function_cache():
+    calls=[]
+    def f(x):
+        return np.sum(100*(x[1:]-x[:-1]**2)**2+(1-x[:-1])**2)
+    @trace
+    def rosenbrock(x):
+        calls.append(len(x))
+        return f(x)
+    for scale in [1.0, -0.5, 2.0]:
+        x=np.array([-1.2, 1.0, 0.5, 2.0])*scale
+        assert np.allclose(rosenbrock.gradient(x), gradient(f, x))
+    rosenbrock.gradient(np.ones(6))
+    assert calls == [4, 6] and len(rosenbrock.plans) == 2
+    assert np.isclose(rosenbrock(np.ones(6))[0], 0)
+
+def test_plan_errors():
+    plan=Plan.from_function(lambda x: [x[0]*x[1], x[0]], [1, 2])
+    with pytest.raises(ValueError):
+        plan.forward([1, 2, 3])
+    with pytest.raises(ValueError):
+        plan.gradient([1, 2])
+    plan=Plan.from_function(lambda x: x[1]**x[0], [1, 2])
+    with pytest.raises(ValueError):
+        plan.gradient([1, -2])
+
+def test_tape_replay():
+    def f(x1, x2):
+        return (TapeNode.sinh(x1)*TapeNode.logistic(x2)-3**x1/x2+TapeNode.sqrt(x2)
+                -TapeNode.cosh(x2)+TapeNode.tanh(x1)-x1**3)
+    tape=Tape()
+    x1, x2=tape.variables([0.3, 1.2])
+    y=f(x1, x2)
+    tape.replay([-0.7, 2.5])
+    fresh=Tape()
+    z1, z2=fresh.variables([-0.7, 2.5])
+    z=f(z1, z2)
+    assert np.isclose(y.val, z.val)
+    assert np.allclose(tape.gradient(y, [x1, x2]), fresh.gradient(z, [z1, z2]))
+
+def test_node_exp_log_base():
+    x=Node(1.5)
+    y=Node.exp(x, base=2)+Node.log(x, base=10)
+    y.reverse()
+    assert np.isclose(y.val, 2**1.5+np.log10(1.5))
+    assert np.isclose(y.getgrad(x), 2**1.5*np.log(2)+1/(1.5*np.log(10)))
+
+def test_optimize_cse():
+    f=lambda x: [x[0]*x[1]+np.exp(x[1]*x[0]), np.sin(x[0]*x[1])]
+    plan=Plan.from_function(f, [1, 2])
+    optimized, report=optimize(plan)
+    assert report['merged'] == 2
+    assert report['after']['operations'] == report['before']['operations']-2
+    for x in ([1, 2], [-0.3, 0.7]):
+        assert np.allclose(optimized.forward(x), plan.forward(x))
+        assert np.allclose(optimized.jacobian(x), plan.jacobian(x))
+
+def test_optimize_fold_and_dce():
+    def f(x):
+        c=Node(2.0)
+        unused=np.exp(x[0])
+        return x[0]*np.sin(c)*np.sin(c)+x[1]**2
+    plan=Plan.from_function(f, [1, 2])
+    optimized, report=optimize(plan)
+    assert report['folded'] == 2 and report['merged'] == 0
+    assert report['after']['constants'] == 2
+    assert np.allclose(optimized.gradient([0.5, 3]), [np.sin(2)**2, 6])
+    # unused operations are never recorded, only unreachable constants are left to remove
+    y=Plan.from_function(lambda x: x[0]*(Node(1.0)+Node(1.0))+0*x[1], [1, 2])
+    assert optimize(y)[1]['removed'] == 1
+    assert np.allclose(optimize(y)[0].gradient([3, 4]), [2, 0])
+
+def test_plan_stats():
+    plan=Plan.from_function(lambda x: 3*x[0]**2+x[1], [1, 2])
+    stats=plan.stats()
+    assert stats['variables'] == 2 and stats['constants'] == 2 and stats['operations'] == 3
+    assert stats['edges'] == 6 and stats['sweep_edges'] == 4
+
+def test_trace_optimize():
+    f=lambda x: np.sum(x*x)+np.sum(x*x)
+    traced=trace(f, optimize=True)
+    x=np.array([1.0, -2.0, 0.5])
+    assert np.allclose(traced.gradient(x), 4*x)
+    assert len(traced.plan(x)) < len(trace(f).plan(x))
@@ -0,0 +1,37 @@
+from src.autodiff import *
+import pytest
+
+
+def test_profiler_counts():
+    originals=(Node.__dict__['__mul__'], Node.__dict__['exp'], DualNum.__dict__['__add__'], Node.__init__)
+    with Profiler() as prof:
+        x1, x2=Node(1), Node(2)
+        y=x1*x2+np.exp(x1*x2)
+        y.reverse()
+        z=2+DualNum.sin(DualNum(1.0, 1.0))
+    stats=prof.stats()
+    ops=stats['operations']
+    assert ops['Node.mul']['calls'] == 2 and ops['Node.add']['calls'] == 1 and ops['Node.exp']['calls'] == 1
+    assert ops['DualNum.add']['calls'] == 1 and ops['DualNum.sin']['calls'] == 1
+    assert all(record['seconds'] >= 0 for record in ops.values())
+    assert stats['reverse']['calls'] == 1
+    assert stats['nodes_created'] == 6 and stats['peak_live_nodes'] == 6
+    assert 'Node.mul' in prof.table() and 'reverse sweep' in prof.table()
+    # the methods are restored and results unchanged
+    assert (Node.__dict__['__mul__'], Node.__dict__['exp'], DualNum.__dict__['__add__'], Node.__init__) == originals
+    assert '__del__' not in Node.__dict__
+    assert y.getgrad(x1) == pytest.approx(2+2*np.exp(2))
+
+def test_profiler_peak_and_nesting():
+    with Profiler() as prof:
+        for _ in range(5):
+            x=Node(0.5)
+            y=Node.logistic(x)
+    stats=prof.stats()
+    assert stats['nodes_created'] > stats['peak_live_nodes']
+    # logistic is built from other operations, which are counted on their own
+    assert stats['operations']['Node.logistic']['calls'] == 5
+    assert stats['operations']['Node.exp']['calls'] == 5
+    with pytest.raises(ValueError):
+        with prof:
+            Profiler().enable()
@@ -0,0 +1,53 @@
+from src.autodiff import *
+import pytest
+
+
+def banded(x):
+    # discretized 1-D reaction-diffusion, output i depends on x[i-1], x[i], x[i+1]
+    y=[2*x[0]-x[1]+np.exp(x[0])]
+    for i in range(1, len(x)-1):
+        y.append(-x[i-1]+2*x[i]-x[i+1]+np.exp(x[i])*np.sin(x[i+1]))
+    y.append(-x[-2]+2*x[-1]+np.exp(x[-1]))
+    return y
+
+def dense(rows, cols, vals, shape):
+    J=np.zeros(shape)
+    J[rows, cols]=vals
+    return J
+
+def test_jacobian_sparsity():
+    rows, cols=jacobian_sparsity(banded, np.linspace(0, 1, 6))
+    assert len(rows) == 3*6-2
+    assert np.all(np.abs(rows-cols) <= 1)
+    # constants and outputs that are inputs
+    rows, cols=jacobian_sparsity(lambda x: [3.0, x[1], x[0]*0+x[2]], [1, 2, 3])
+    assert rows.tolist() == [1, 2, 2] and cols.tolist() == [1, 0, 2]
+
+def test_color_columns():
+    n=30
+    rows, cols=jacobian_sparsity(banded, np.ones(n))
+    colors=color_columns(rows, cols, n)
+    assert colors.max()+1 == 3
+    for i in range(n):
+        in_row=colors[cols[rows == i]]
+        assert len(set(in_row.tolist())) == len(in_row)
+    # a dense row forces one color per column
+    assert sorted(color_columns([0, 0, 0, 1], [0, 1, 2, 2], 3).tolist()) == [0, 1, 2]
+
+def test_sparse_jacobian():
+    x=np.linspace(-1, 1, 25)
+    rows, cols, vals=sparse_jacobian(banded, x)
+    assert np.allclose(dense(rows, cols, vals, (25, 25)), jacobian(banded, x))
+    # the pattern is reused at other points
+    pattern=(rows, cols)
+    x2=np.cos(x)
+    assert np.allclose(dense(*sparse_jacobian(banded, x2, sparsity=pattern), (25, 25)), jacobian(banded, x2))
+    rows, cols, vals=sparse_jacobian(lambda x: [1.0, 2.0], [1, 2])
+    assert len(rows) == len(cols) == len(vals) == 0
+
+def test_sparse_jacobian_scipy():
+    sparse=pytest.importorskip('scipy.sparse')
+    x=np.linspace(-1, 1, 10)
+    rows, cols, vals=sparse_jacobian(banded, x)
+    J=sparse.coo_matrix((vals, (rows, cols)), shape=(10, 10))
+    assert np.allclose(J.toarray(), jacobian(banded, x))
@@ -0,0 +1,71 @@
+from src.autodiff import *
+import pytest
+
+
+def test_tape_documented_example():
+    tape=Tape()
+    x1, x2=tape.variables([1, 2])
+    y=x1*x2+TapeNode.exp(x1*x2)
+    assert np.allclose(tape.gradient(y, [x1, x2]), [2+2*np.exp(2), 1+np.exp(2)])
+
+def test_tape_matches_finite_differences():
+    def f(x1, x2, cls):
+        y1=4*x1*cls.cos(x2)*cls.exp(x1)-cls.sin(x1)*cls.log(x2)+cls.arctan(x1/3)
+        y2=5*x1**2/x2+2+3**x1/1-x2
+        y3=cls.arcsin(x1/4)+cls.arccos(x2/4)+cls.sqrt(x1)+cls.logistic(x2)
+        y4=cls.sinh(x1)*cls.tanh(x2)-cls.cosh(x1)/x2
+        return y1*y2+y3/y4
+    # on plain floats the elementary functions fall back to NumPy, used for central differences
+    def value(a, b):
+        return f(a, b, TapeNode)
+    tape=Tape()
+    t1, t2=tape.variables([1.5, 0.7])
+    yt=f(t1, t2, TapeNode)
+    h=1e-6
+    fd=[(value(1.5+h, 0.7)-value(1.5-h, 0.7))/(2*h), (value(1.5, 0.7+h)-value(1.5, 0.7-h))/(2*h)]
+    assert np.isclose(yt.val, value(1.5, 0.7))
+    assert np.allclose(tape.gradient(yt, [t1, t2]), fd)
+
+def test_tape_shared_and_deep():
+    tape=Tape(capacity=4)
+    x=tape.var(0.1)
+    y=x
+    for _ in range(100000):
+        y=y*1+0.5
+    assert len(tape) == 400001
+    assert tape.gradient(y, [x])[0] == 1.0
+    tape=Tape()
+    x=tape.var(0.01)
+    y=x
+    for _ in range(30):
+        y=y*y+y
+    xd=DualNum(0.01, 1)
+    for _ in range(30):
+        xd=xd*xd+xd
+    assert np.isclose(tape.gradient(y, [x])[0], xd.der)
+
+def test_tape_tan():
+    tape=Tape()
+    x=tape.var(0.3)
+    y=TapeNode.tan(x)
+    assert np.isclose(tape.gradient(y, [x])[0], 1/np.cos(0.3)**2)
+
+def test_tape_negative_base_constant_exponent():
+    tape=Tape()
+    x=tape.var(-2)
+    y=x**2-x
+    assert y.val == 6 and tape.gradient(y, [x])[0] == -5
+
+def test_tape_domain_errors():
+    tape=Tape()
+    with pytest.raises(ValueError):
+        TapeNode.sqrt(tape.var(-1))
+    with pytest.raises(ValueError):
+        TapeNode.arcsin(tape.var(2))
+    with pytest.raises(ValueError):
+        tape.var(-1)**tape.var(2)
+    with pytest.raises(ValueError):
+        tape.var(1)+Tape().var(1)
+
+def test_tape_scalar_fallback():
+    assert TapeNode.exp(0) == 1 and TapeNode.sin(0) == 0 and TapeNode.sqrt(4) == 2
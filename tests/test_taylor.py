@@ -0,0 +1,77 @@
+from src.autodiff import *
+import pytest
+import math
+
+
+def close(a, b):
+    return np.allclose(a.coef if isinstance(a, Jet) else a, b.coef if isinstance(b, Jet) else b, atol=1e-9)
+
+def test_jet_identities():
+    x=Jet.variable(0.3, order=7, direction=1.5)
+    one=np.zeros(8)
+    one[0]=1
+    assert close(np.sin(x)**2+np.cos(x)**2, one)
+    assert close(np.cosh(x)*np.cosh(x)-np.sinh(x)*np.sinh(x), one)
+    assert close(np.exp(np.log(x+1)), x+1)
+    assert close(np.tan(x), np.sin(x)/np.cos(x))
+    assert close(np.tanh(x), np.sinh(x)/np.cosh(x))
+    assert close(Jet.logistic(x), 1/(1+np.exp(-x)))
+    assert close(np.arcsin(np.sin(x)), x)
+    assert close(np.arccos(x/2), np.pi/2-np.arcsin(x/2))
+    assert close(np.arctan(np.tan(x)), x)
+    assert close(np.sqrt(x)*np.sqrt(x), x)
+    assert close(x**2.5, np.exp(2.5*np.log(x)))
+    assert close(x**x, np.exp(x*np.log(x)))
+    assert close(2**x, np.exp(x*np.log(2)))
+    assert close(x**3, x*x*x)
+    assert close((x*x)/x, x)
+    assert close(1-x-(2-x), -1+0*x)
+
+def test_jet_derivatives():
+    # exp(sin(t)) has derivatives 1, 1, 1, 0, -3, -8 at 0
+    y=np.exp(np.sin(Jet.variable(0.0, order=5)))
+    assert np.allclose(y.derivatives(), [1, 1, 1, 0, -3, -8])
+    # powers at zero, where the recurrence for non-integer exponents does not apply
+    assert np.allclose((Jet.variable(0.0, order=4)**3).derivatives(), [0, 0, 0, 6, 0])
+    assert np.allclose((1/(1-Jet.variable(0.0, order=6))).derivatives(), [math.factorial(k) for k in range(7)])
+
+def test_jet_batched():
+    x=Jet.variable(np.array([0.1, 0.5, 0.9]), order=3)
+    y=np.arcsin(x)*np.exp(x)
+    for i, v in enumerate([0.1, 0.5, 0.9]):
+        assert np.allclose(y.derivatives()[:, i], (np.arcsin(Jet.variable(v, 3))*np.exp(Jet.variable(v, 3))).derivatives())
+
+def test_taylor_derivatives():
+    f=lambda x: [x[0]**2*np.log(x[1])+np.arctan(x[0]*x[1]), np.tanh(x[1])*np.sqrt(x[0]), 4.0]
+    x=np.array([0.7, 1.3])
+    v=np.array([0.4, -1.1])
+    d=taylor_derivatives(f, x, v, 4)
+    assert d.shape == (5, 3)
+    assert np.allclose(d[0], [f(x)[0], f(x)[1], 4])
+    assert np.allclose(d[1], jacobian(f, x)@v)
+    assert np.allclose(d[2, 0], v@hvp(lambda x: f(x)[0], x, v))
+    assert np.allclose(d[1:, 2], 0)
+    # higher orders against central differences of the second derivative along v
+    g=lambda t: taylor_derivatives(f, x+t*v, v, 2)[2, 0]
+    assert np.isclose(d[3, 0], (g(1e-5)-g(-1e-5))/2e-5, rtol=1e-5)
+    assert np.allclose(taylor_derivatives(lambda x: np.exp(x[0]*x[1]), [0, 1], [1, 1], 4), [1, 1, 3, 7, 25])
+
+def test_jet_errors():
+    x=Jet.variable(2.0, order=3)
+    with pytest.raises(ValueError):
+        np.arcsin(x)
+    with pytest.raises(ValueError):
+        np.sqrt(-x)
+    with pytest.raises(ValueError):
+        x+Jet.variable(1.0, order=2)
+    with pytest.raises(ValueError):
+        Jet.variable(1.0, order=0)
+    with pytest.raises(ValueError):
+        taylor_derivatives(lambda x: x[0], [1, 2], [1], 3)
+
+def test_jet_broadcast_constants():
+    x=Jet.variable(0.5, order=2)
+    c=np.array([1.0, 2.0, 4.0])
+    assert (x+c).coef.shape == (3, 3)
+    assert np.allclose((c/x).derivatives()[:, 2], [8, -16, 64])
+    assert np.allclose((x*c-c).coef[1], c)